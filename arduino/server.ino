@@ -26,12 +26,31 @@ WiFiEspClient client;
 
 // 서버에서 받은 최종 인원 수
 int serverPeopleCount = 0;
+
+// === [인원 이벤트 묶음 전송] ===
+// 사람이 몰릴 때 이벤트마다 접속하지 않고 모아서 /api/people_events로 한 번에 보냄.
+// seq는 이벤트마다 1씩 증가하고, 전송 실패 시 같은 묶음을 그대로 다시 보내도 서버가 중복을 걸러줌.
+const char SENSOR_ID[] = "door0";
+const int MAX_PENDING = 32;          // 보내지 못한 이벤트 최대 개수
+const long FLUSH_QUIET_MS = 300;     // 마지막 이벤트 후 이 시간 동안 조용하면 전송
+const long RETRY_INTERVAL_MS = 1000; // 전송 실패 후 재시도 간격
+char pendingType[MAX_PENDING];       // 'I' / 'O'
+unsigned long pendingSeq[MAX_PENDING];
+unsigned long pendingTs[MAX_PENDING];
+int pendingCount = 0;
+unsigned long nextSeq = 1;
+long bootId = 0;
+unsigned long lastEventTime = 0;
+unsigned long lastFlushAttempt = 0;
 unsigned long lastDirectionCheckTime = 0;
 const long checkInterval = 1000; // 1초마다 방향 확인 (지금은 생략 가능)
 
 // ---- 함수 선언 ----
 void updateLCD();
 int sendPeopleData(const char *type);
+void queuePeopleEvent(char type);
+int sendPeopleBatch();
+int postForCount(const char *path, const String &payload);
 void resetLEDs();
 void getDirectionData(); // 지금은 안 써도 되지만 유지
 
@@ -83,6 +102,10 @@ void setup()
   lcd.print("People: 0");
 
   counter.begin();
+
+  // 재부팅하면 seq가 1부터 다시 시작하므로, 서버가 이전 부팅의 seq와 구분하도록 boot 값을 새로 정함
+  randomSeed(analogRead(A0) ^ micros());
+  bootId = random(1, 2147483647L);
 }
 
 void loop()
@@ -92,25 +115,54 @@ void loop()
   if (event == 1)
   {
     Serial.println("[EVENT] IN detected (sensor)");
-    int newCount = sendPeopleData("IN");
-    if (newCount >= 0)
-    {
-      serverPeopleCount = newCount; // ✅ 여기서 전역에 넣어주고
-      updateLCD();                  // ✅ 그걸 LCD에 반영
-    }
+    queuePeopleEvent('I');
   }
   else if (event == 2)
   {
     Serial.println("[EVENT] OUT detected (sensor)");
-    int newCount = sendPeopleData("OUT");
+    queuePeopleEvent('O');
+  }
+
+  // 조용해졌거나 버퍼가 찼으면 모아둔 이벤트를 한 번에 전송
+  unsigned long now = millis();
+  if (pendingCount > 0 &&
+      (pendingCount >= MAX_PENDING || now - lastEventTime >= FLUSH_QUIET_MS) &&
+      now - lastFlushAttempt >= RETRY_INTERVAL_MS)
+  {
+    lastFlushAttempt = now;
+    int newCount = sendPeopleBatch();
     if (newCount >= 0)
     {
+      pendingCount = 0; // 서버가 받았음 (중복 포함) -> 버퍼 비움
       serverPeopleCount = newCount;
       updateLCD();
     }
   }
 }
 
+// ---- 이벤트를 버퍼에 추가 (가득 차면 가장 오래된 것부터 밀어냄) ----
+void queuePeopleEvent(char type)
+{
+  if (pendingCount == MAX_PENDING)
+  {
+    for (int i = 1; i < MAX_PENDING; i++)
+    {
+      pendingType[i - 1] = pendingType[i];
+      pendingSeq[i - 1] = pendingSeq[i];
+      pendingTs[i - 1] = pendingTs[i];
+    }
+    pendingCount--;
+    Serial.println("[queuePeopleEvent] buffer full, oldest event dropped");
+  }
+  pendingType[pendingCount] = type;
+  pendingSeq[pendingCount] = nextSeq++;
+  pendingTs[pendingCount] = millis();
+  pendingCount++;
+  lastEventTime = millis();
+  // 새 이벤트가 들어오면 바로 보낼 수 있도록 재시도 대기 해제
+  lastFlushAttempt = 0;
+}
+
 // 2. (선택) 주기적으로 방향 정보 가져오기
 // 나중에 방향 LED까지 붙일 때 다시 활성화하면 됨
 /*
@@ -137,10 +189,36 @@ void updateLCD()
   Serial.println(serverPeopleCount); // 시리얼에도 같은 값 찍기
 }
 
-// ---- 서버로 IN/OUT 보내고 current_count 받기 ----
+// ---- 모아둔 이벤트를 /api/people_events로 보내고 current_count 받기 ----
 // 성공하면 current_count 반환, 실패하면 -1
-// ---- 서버로 IN/OUT 보내고 current_count 받기 ----
+int sendPeopleBatch()
+{
+  String payload = String("{\"sensor_id\":\"") + SENSOR_ID + "\",\"boot\":" + bootId + ",\"events\":[";
+  for (int i = 0; i < pendingCount; i++)
+  {
+    if (i > 0)
+      payload += ",";
+    payload += String("{\"seq\":") + pendingSeq[i] +
+               ",\"type\":\"" + (pendingType[i] == 'I' ? "IN" : "OUT") +
+               "\",\"ts\":" + pendingTs[i] + "}";
+  }
+  payload += "]}";
+
+  Serial.print("[sendPeopleBatch] ");
+  Serial.print(pendingCount);
+  Serial.println(" events");
+  return postForCount("/api/people_events", payload);
+}
+
+// ---- 서버로 IN/OUT 하나 보내고 current_count 받기 (이전 방식) ----
 int sendPeopleData(const char *type)
+{
+  String payload = String("{\"type\":\"") + type + "\"}";
+  return postForCount("/api/people_count", payload);
+}
+
+// ---- JSON을 POST하고 응답의 current_count 반환 (실패하면 -1) ----
+int postForCount(const char *path, const String &payload)
 {
   Serial.print("[sendPeopleData] connect to ");
   Serial.print(server);
@@ -156,8 +234,9 @@ int sendPeopleData(const char *type)
   Serial.println("[sendPeopleData] CONNECT OK");
 
   // JSON payload 전송
-  String payload = String("{\"type\":\"") + type + "\"}";
-  client.println("POST /api/people_count HTTP/1.1");
+  client.print("POST ");
+  client.print(path);
+  client.println(" HTTP/1.1");
   client.print("Host: ");
   client.println(server);
   client.println("Content-Type: application/json");
@@ -0,0 +1,302 @@
+"""
+EvacuationServer용 asyncio HTTP/1.1 백엔드 (EvacuationServer(backend="asyncio")).
+
+- 이벤트 루프 스레드 하나가 모든 연결을 처리하므로 요청마다 스레드를 만들지 않습니다.
+- keep-alive로 연결을 재사용하고, 응답은 StatusSnapshot에 미리 직렬화된 bytes를 그대로 씁니다.
+- 롱폴링(?since=)과 /events는 스레드를 붙잡지 않고 루프 안에서 기다립니다.
+비전 루프와 같은 프로세스에서 돌지만, 요청 하나에 드는 파이썬 작업이 매우 작아서
+프레임 처리에 주는 영향이 Flask 개발 서버보다 훨씬 적습니다.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from metrics import metrics
+from server import Subscriber, sse_event
+
+REASONS = {
+    200: "OK", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+    404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+}
+
+
+class _LoopBridge(Subscriber):
+    """EvacuationServer 구독자로 등록되어 변경 이벤트를 이벤트 루프로 넘김 (게시 스레드는 대기 없음)"""
+    def __init__(self, loop, on_event):
+        super().__init__()
+        self.loop = loop
+        self.on_event = on_event
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self.on_event, event)
+
+
+class AsyncHTTPServer:
+    def __init__(self, evac_server):
+        self.server = evac_server
+
+        self.KEEPALIVE_TIMEOUT = 30.0     # 요청 사이 유휴 연결 유지 시간 (초)
+        self.MAX_HEADER_SIZE = 16 * 1024
+        self.MAX_BODY_SIZE = 1024 * 1024
+
+        self.connections = 0              # 현재 열린 연결 수
+        self.requests = 0                 # 처리한 요청 수 (누적)
+        self._streams = set()             # /events 구독자별 asyncio.Queue
+        self._version_event = None        # 새 버전이 게시되면 set 되고 새 Event로 교체됨
+
+    def serve_forever(self, host, port):
+        asyncio.run(self.serve(host, port))
+
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        self._version_event = asyncio.Event()
+        bridge = _LoopBridge(self.loop, self._on_event)
+        self.server.subscribe(bridge)
+        try:
+            srv = await asyncio.start_server(self._handle_connection, host, port,
+                                             limit=self.MAX_HEADER_SIZE, backlog=1024,
+                                             reuse_address=True)
+            async with srv:
+                await srv.serve_forever()
+        finally:
+            self.server.unsubscribe(bridge)
+
+    # === 변경 이벤트 (루프 스레드에서 실행) ===
+
+    def _on_event(self, event):
+        ev, self._version_event = self._version_event, asyncio.Event()
+        ev.set()
+        for q in self._streams:
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                # 느린 구독자: 밀린 변경분 대신 전체 스냅샷을 다시 보내도록 표시
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(Subscriber.RESYNC)
+
+    async def _wait_until(self, predicate, timeout):
+        """predicate()가 참이 될 때까지 (새 버전이 게시될 때마다 확인) 최대 timeout초 대기"""
+        deadline = self.loop.time() + timeout
+        while not predicate():
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._version_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return predicate()
+        return True
+
+    # === HTTP ===
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    break
+
+                try:
+                    lines = head.decode("latin-1").split("\r\n")
+                    method, target, version = lines[0].split(" ", 2)
+                    headers = {}
+                    for line in lines[1:]:
+                        if ":" in line:
+                            key, value = line.split(":", 1)
+                            headers[key.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._write(writer, 400, b"Bad Request", "text/plain", keep_alive=False)
+                    break
+                if length > self.MAX_BODY_SIZE:
+                    await self._write(writer, 413, b"Payload Too Large", "text/plain", keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = (connection != "close") if version == "HTTP/1.1" else (connection == "keep-alive")
+
+                self.requests += 1
+                keep_alive = await self._dispatch(method, target, headers, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _write(self, writer, code, body, content_type="application/json",
+                     etag=None, keep_alive=True):
+        head = [
+            f"HTTP/1.1 {code} {REASONS.get(code, 'OK')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",
+            "Cache-Control: no-cache",
+            "Connection: " + ("keep-alive" if keep_alive else "close"),
+        ]
+        if etag is not None:
+            head.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _dispatch(self, method, target, headers, body, writer, keep_alive):
+        """요청 하나 처리. 연결을 계속 쓸 수 있으면 True"""
+        url = urlsplit(target)
+        path = url.path
+        query = parse_qs(url.query)
+        if_none_match = headers.get("if-none-match")
+        since = None
+        if "since" in query:
+            try:
+                since = int(query["since"][0])
+            except ValueError:
+                since = None
+
+        if method == "OPTIONS":
+            writer.write(b"HTTP/1.1 204 No Content\r\nAccess-Control-Allow-Origin: *\r\n"
+                         b"Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+                         b"Access-Control-Allow-Headers: Content-Type, If-None-Match\r\n"
+                         b"Content-Length: 0\r\n\r\n")
+            await writer.drain()
+            return keep_alive
+
+        # 1. 상태 조회
+        if path == "/status" and method == "GET":
+            server = self.server
+            if since is not None:
+                if not await self._wait_until(lambda: server.snapshot.version > since,
+                                              server.LONG_POLL_TIMEOUT):
+                    await self._write(writer, 304, b"", etag=server.snapshot.etag, keep_alive=keep_alive)
+                    return keep_alive
+            code, data, etag = server.status_response(if_none_match)
+            await self._write(writer, code, data, etag=etag, keep_alive=keep_alive)
+            return keep_alive
+
+        # 2. 특정 도트 방향 조회
+        if path.startswith("/direction/") and method == "GET":
+            try:
+                dot_id = int(path[len("/direction/"):])
+            except ValueError:
+                await self._write(writer, 404, b"Not Found", "text/plain", keep_alive=keep_alive)
+                return keep_alive
+            server = self.server
+            if since is not None:
+                if not await self._wait_until(lambda: server.snapshot.direction(dot_id)[0] > since,
+                                              server.LONG_POLL_TIMEOUT):
+                    version = server.snapshot.direction(dot_id)[0]
+                    await self._write(writer, 304, b"", etag=f'"{version}"', keep_alive=keep_alive)
+                    return keep_alive
+            code, data, etag = server.direction_response(dot_id, if_none_match)
+            await self._write(writer, code, data, etag=etag, keep_alive=keep_alive)
+            return keep_alive
+
+        # 2-1. 변경 푸시 (Server-Sent Events)
+        if path == "/events" and method == "GET":
+            await self._stream_events(writer)
+            return False
+
+        # 3. 인원수 업데이트
+        if path == "/api/people_count":
+            if method != "POST":
+                await self._write(writer, 405, b"Method Not Allowed", "text/plain", keep_alive=keep_alive)
+                return keep_alive
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                data = None
+            if not data or not isinstance(data, dict):
+                await self._write(writer, 400, b"No Data", "text/plain", keep_alive=keep_alive)
+                return keep_alive
+            count = self.server.people_event(data.get("type"), data.get("sensor_id"))
+            await self._write(writer, 200, json.dumps({"current_count": count}).encode(),
+                              keep_alive=keep_alive)
+            return keep_alive
+
+        # 3-1. 인원수 이벤트 묶음
+        if path == "/api/people_events":
+            if method != "POST":
+                await self._write(writer, 405, b"Method Not Allowed", "text/plain", keep_alive=keep_alive)
+                return keep_alive
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                data = None
+            code, result = self.server.people_batch(data)
+            await self._write(writer, code, json.dumps(result).encode(), keep_alive=keep_alive)
+            return keep_alive
+
+        # 4. 분석 화면 디버그 스트림 (MJPEG)
+        if path == "/debug/stream" and method == "GET":
+            await self._stream_debug(writer)
+            return False
+
+        # 5. 계측값 (Prometheus)
+        if path == "/metrics" and method == "GET":
+            await self._write(writer, 200, metrics.prometheus().encode(), "text/plain; version=0.0.4",
+                              keep_alive=keep_alive)
+            return keep_alive
+
+        await self._write(writer, 404, b"Not Found", "text/plain", keep_alive=keep_alive)
+        return keep_alive
+
+    async def _stream_events(self, writer):
+        """/events: 전체 스냅샷 후 diff를 계속 전송 (연결이 끊길 때까지)"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nAccess-Control-Allow-Origin: *\r\n"
+                     b"Connection: close\r\n\r\n")
+        q = asyncio.Queue(self.server.SUBSCRIBER_QUEUE_SIZE)
+        self._streams.add(q)
+        try:
+            writer.write(self.server.snapshot_event())
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), self.server.STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                else:
+                    if event is Subscriber.RESYNC:
+                        writer.write(self.server.snapshot_event())
+                    else:
+                        writer.write(sse_event("diff", event))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._streams.discard(q)
+
+    async def _stream_debug(self, writer):
+        """/debug/stream: main이 새 분석 화면을 publish 할 때마다 JPEG 한 장씩 전송"""
+        debug = self.server.debug
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=frame\r\n"
+                     b"Cache-Control: no-cache\r\nAccess-Control-Allow-Origin: *\r\n"
+                     b"Connection: close\r\n\r\n")
+        new_frame = asyncio.Event()
+        notify = lambda: self.loop.call_soon_threadsafe(new_frame.set)
+        debug.add_listener(notify)
+        debug.viewers.add(1)
+        try:
+            version = 0
+            while True:
+                if debug.version == version:
+                    new_frame.clear()
+                    await new_frame.wait()
+                    continue
+                if writer.transport.is_closing():
+                    break
+                version, jpeg = debug.version, debug.jpeg
+                writer.write(debug.part(jpeg))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            debug.viewers.add(-1)
+            debug.remove_listener(notify)
@@ -0,0 +1,414 @@
+"""
+재현 가능한 합성 평면도(복도/방/무작위 벽)와 녹화 영상으로
+경로 탐색, 마스크 풀링, 감지 비용을 측정하고 JSON으로 기록합니다.
+
+    python benchmark.py --out bench.json
+    python benchmark.py --compare bench.json        # 이전 결과 대비 느려진 항목 표시
+    python benchmark.py --video session.mp4         # 녹화 영상(또는 recorder.py 녹화 폴더)으로 감지 측정
+    python benchmark.py --astar                     # 기존 A* vs 배열 기반 A*
+"""
+import argparse
+import heapq
+import json
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector import Detector
+from map import GridMap
+from recorder import ReplaySource, is_recording
+
+# 640x480 맵을 grid_size별로 나눈 크기: 32x24 ~ 640x480
+MAP_WIDTH = 640
+MAP_HEIGHT = 480
+ASTAR_GRID_SIZES = [20, 10, 5, 2, 1]
+
+# 합성 장면 기본값
+SCENE_KINDS = ["corridors", "rooms", "random"]
+RESOLUTIONS = [(640, 480), (1280, 960)]
+GRID_SIZES = [20, 10, 5]
+WALL_THICKNESS = 6
+FIRE_SIZE = 16
+EXIT_SIZE = 20
+
+
+def legacy_astar(grid, start, end):
+    """
+    비교 기준용: 배열 기반으로 바꾸기 전의 GridMap._astar (튜플 키 dict + 중복 힙 항목).
+    :return: 그리드 좌표 경로 [(gx, gy), ...]
+    """
+    rows, cols = grid.shape
+    if grid[end[1], end[0]] == 1: return []
+
+    open_set = []
+    heapq.heappush(open_set, (0, start))
+    came_from = {}
+    g_score = {start: 0}
+    f_score = {start: abs(start[0]-end[0]) + abs(start[1]-end[1])}
+
+    while open_set:
+        current = heapq.heappop(open_set)[1]
+        if current == end:
+            path = [current]
+            while current in came_from:
+                current = came_from[current]
+                path.append(current)
+            path.reverse()
+            return path
+
+        for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
+            nx, ny = current[0]+dx, current[1]+dy
+            if 0 <= nx < cols and 0 <= ny < rows:
+                if grid[ny, nx] == 0:
+                    tentative_g = g_score[current] + 1
+                    if (nx, ny) not in g_score or tentative_g < g_score[(nx, ny)]:
+                        came_from[(nx, ny)] = current
+                        g_score[(nx, ny)] = tentative_g
+                        f_score[(nx, ny)] = tentative_g + abs(nx-end[0]) + abs(ny-end[1])
+                        heapq.heappush(open_set, (f_score[(nx, ny)], (nx, ny)))
+    return []
+
+
+def random_grid(rows, cols, density, rng):
+    grid = (rng.random((rows, cols)) < density).astype(np.uint8)
+    return grid
+
+
+def random_free_cell(grid, rng):
+    free = np.flatnonzero(grid.reshape(-1) == 0)
+    idx = int(rng.choice(free))
+    return idx % grid.shape[1], idx // grid.shape[1]
+
+
+def bench_astar(queries=20, density=0.2, seed=0):
+    """
+    grid_size별로 기존 A*와 배열 기반 A*의 시간을 비교하고 결과가 같은지 확인합니다.
+    :return: [{"grid": "32x24", "legacy_ms": ..., "array_ms": ..., "speedup": ..., "identical": bool}, ...]
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for grid_size in ASTAR_GRID_SIZES:
+        grid_map = GridMap(MAP_WIDTH, MAP_HEIGHT, grid_size, path_mode="astar")
+        grid_map.grid[:] = random_grid(grid_map.rows, grid_map.cols, density, rng)
+        pairs = [(random_free_cell(grid_map.grid, rng), random_free_cell(grid_map.grid, rng))
+                 for _ in range(queries)]
+
+        identical = True
+        legacy_time = array_time = 0.0
+        for start, end in pairs:
+            t0 = time.perf_counter()
+            ref = legacy_astar(grid_map.grid, start, end)
+            t1 = time.perf_counter()
+            path = grid_map._astar(start, end)
+            t2 = time.perf_counter()
+            legacy_time += t1 - t0
+            array_time += t2 - t1
+            if [grid_map._to_pixel(gx, gy) for gx, gy in ref] != path:
+                identical = False
+
+        results.append({
+            "grid": f"{grid_map.cols}x{grid_map.rows}",
+            "grid_size": grid_size,
+            "legacy_ms": legacy_time / queries * 1000,
+            "array_ms": array_time / queries * 1000,
+            "speedup": legacy_time / array_time if array_time > 0 else float('inf'),
+            "identical": identical,
+        })
+    return results
+
+
+class SyntheticScene:
+    """
+    검은 바닥 + 흰 벽 + 빨간 불 + 녹색 탈출구로 된 합성 평면도.
+    같은 seed면 항상 같은 장면이 만들어집니다.
+    """
+    def __init__(self, width, height, kind="rooms", fires=2, exits=3, dots=10,
+                 density=0.15, seed=0):
+        self.width = width
+        self.height = height
+        self.kind = kind
+        rng = np.random.default_rng(seed)
+
+        self.wall_mask = np.zeros((height, width), dtype=np.uint8)
+        if kind == "corridors":
+            self._draw_corridors(rng)
+        elif kind == "rooms":
+            self._draw_rooms(rng)
+        elif kind == "random":
+            self._draw_random(rng, density)
+        else:
+            raise ValueError(f"Unknown scene kind ({kind})")
+
+        self.exits = [self._free_point(rng) for _ in range(exits)]
+        self.dots = [self._free_point(rng) for _ in range(dots)]
+        self.fire_boxes = []
+        for _ in range(fires):
+            x, y = self._free_point(rng)
+            self.fire_boxes.append((x, y, FIRE_SIZE, FIRE_SIZE))
+
+        # 카메라 프레임 흉내 (detector 입력용)
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.frame[self.wall_mask > 0] = (255, 255, 255)
+        for x, y, w, h in self.fire_boxes:
+            cv2.rectangle(self.frame, (x, y), (x + w, y + h), (0, 0, 255), -1)
+        for x, y in self.exits:
+            cv2.rectangle(self.frame, (x, y), (x + EXIT_SIZE, y + EXIT_SIZE), (0, 200, 0), -1)
+
+    def _draw_corridors(self, rng):
+        # 가로/세로 복도 격자: 복도 사이 블록을 벽으로 두르고 군데군데 문을 뚫음
+        step = max(self.width, self.height) // 6
+        for y in range(step, self.height, step):
+            cv2.line(self.wall_mask, (0, y), (self.width, y), 255, WALL_THICKNESS)
+        for x in range(step, self.width, step):
+            cv2.line(self.wall_mask, (x, 0), (x, self.height), 255, WALL_THICKNESS)
+        for _ in range(12):
+            x, y = int(rng.integers(self.width)), int(rng.integers(self.height))
+            cv2.rectangle(self.wall_mask, (x - step // 4, y - step // 4), (x + step // 4, y + step // 4), 0, -1)
+
+    def _draw_rooms(self, rng):
+        # 재귀 분할로 방을 만들고 각 벽에 문 하나씩
+        def split(x0, y0, x1, y1, depth):
+            w, h = x1 - x0, y1 - y0
+            if depth == 0 or min(w, h) < 120:
+                return
+            door = 40
+            if w >= h:
+                x = int(rng.integers(x0 + w // 3, x1 - w // 3))
+                d = int(rng.integers(y0, max(y0 + 1, y1 - door)))
+                cv2.line(self.wall_mask, (x, y0), (x, y1), 255, WALL_THICKNESS)
+                cv2.line(self.wall_mask, (x, d), (x, d + door), 0, WALL_THICKNESS + 2)
+                split(x0, y0, x, y1, depth - 1)
+                split(x, y0, x1, y1, depth - 1)
+            else:
+                y = int(rng.integers(y0 + h // 3, y1 - h // 3))
+                d = int(rng.integers(x0, max(x0 + 1, x1 - door)))
+                cv2.line(self.wall_mask, (x0, y), (x1, y), 255, WALL_THICKNESS)
+                cv2.line(self.wall_mask, (d, y), (d + door, y), 0, WALL_THICKNESS + 2)
+                split(x0, y0, x1, y, depth - 1)
+                split(x0, y, x1, y1, depth - 1)
+
+        cv2.rectangle(self.wall_mask, (0, 0), (self.width - 1, self.height - 1), 255, WALL_THICKNESS)
+        split(0, 0, self.width, self.height, 4)
+
+    def _draw_random(self, rng, density):
+        # 전체 면적의 density만큼 무작위 벽 조각
+        seg = max(self.width, self.height) // 10
+        count = int(density * self.width * self.height / (seg * WALL_THICKNESS))
+        for _ in range(count):
+            x, y = int(rng.integers(self.width)), int(rng.integers(self.height))
+            if rng.random() < 0.5:
+                cv2.line(self.wall_mask, (x, y), (x + seg, y), 255, WALL_THICKNESS)
+            else:
+                cv2.line(self.wall_mask, (x, y), (x, y + seg), 255, WALL_THICKNESS)
+
+    def _free_point(self, rng, attempts=1000):
+        """주변 9x9가 비어 있는 점. 무작위로 찾다가 안 되면 빈 칸 전체에서 고름 (없으면 ValueError)"""
+        margin = EXIT_SIZE
+        if self.width <= 2 * margin or self.height <= 2 * margin:
+            raise ValueError(f"장면이 너무 작습니다 ({self.width}x{self.height})")
+        for _ in range(attempts):
+            x = int(rng.integers(margin, self.width - margin))
+            y = int(rng.integers(margin, self.height - margin))
+            if not self.wall_mask[y - 4:y + 5, x - 4:x + 5].any():
+                return x, y
+
+        # 벽을 4px 넓힌 마스크의 빈 칸 = 주변 9x9에 벽이 없는 점
+        blocked = cv2.dilate(self.wall_mask, np.ones((9, 9), np.uint8))
+        free = np.argwhere(blocked[margin:self.height - margin, margin:self.width - margin] == 0)
+        if len(free) == 0:
+            raise ValueError(f"빈 자리가 없는 장면입니다 ({self.kind}, {self.width}x{self.height})")
+        y, x = free[int(rng.integers(len(free)))]
+        return int(x) + margin, int(y) + margin
+
+    def build_grid(self, grid_map):
+        """main.plan_stage와 같은 순서로 GridMap을 채웁니다."""
+        grid_map.reset()
+        grid_map.update_obstacles_from_mask(self.wall_mask)
+        for fx, fy, fw, fh in self.fire_boxes:
+            grid_map.set_obstacle_rect(fx - 20, fy - 20, fw + 40, fh + 40, fire=True)
+        for ex, ey in self.exits:
+            grid_map.add_exit(ex, ey, EXIT_SIZE, EXIT_SIZE)
+
+
+def _timeit(fn, repeat):
+    """fn을 repeat번 실행한 시간(ms)의 중앙값/최소값"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": float(np.median(times)), "min_ms": float(np.min(times))}
+
+
+def bench_scene(scene, grid_size, repeat):
+    """한 장면 + grid_size에 대해 경로 탐색(모드별, 캐시 전/후)과 마스크 풀링 시간 측정"""
+    results = []
+    base = {"kind": scene.kind, "resolution": f"{scene.width}x{scene.height}",
+            "grid_size": grid_size, "fires": len(scene.fire_boxes),
+            "exits": len(scene.exits), "dots": len(scene.dots)}
+
+    pool_map = GridMap(scene.width, scene.height, grid_size)
+    results.append(dict(base, case="mask_pooling",
+                        **_timeit(lambda: pool_map.update_obstacles_from_mask(scene.wall_mask), repeat)))
+
+    for mode in ("flow", "hazard", "hpa", "astar"):
+        grid_map = GridMap(scene.width, scene.height, grid_size, path_mode=mode)
+
+        def cold():
+            # 매 프레임 전체 재계산되는 상황 (캐시 무효화)
+            scene.build_grid(grid_map)
+            grid_map._synced_grid = None
+            for x, y in scene.dots:
+                grid_map.get_shortest_path(x, y)
+
+        def warm():
+            # 장면이 그대로인 프레임 (main처럼 매번 reset 후 다시 채움)
+            scene.build_grid(grid_map)
+            for x, y in scene.dots:
+                grid_map.get_shortest_path(x, y)
+
+        # A*는 큰 그리드에서 매우 느리므로 반복 횟수를 줄임
+        n = repeat if mode != "astar" or grid_map.grid.size <= 5000 else max(1, repeat // 5)
+        results.append(dict(base, case=f"path_{mode}_cold", **_timeit(cold, n)))
+        warm()
+        results.append(dict(base, case=f"path_{mode}_warm", **_timeit(warm, n)))
+    return results
+
+
+def bench_detection(frames, label, repeat):
+    """Detector.analyze (일반 / 셀 변화 게이팅) 시간 측정"""
+    results = []
+    h, w = frames[0].shape[:2]
+    for gated in (False, True):
+        detector = Detector()
+        if gated:
+            detector.enable_change_gating(20)
+        idx = [0]
+
+        def step():
+            detector.analyze(frames[idx[0] % len(frames)], walls=True)
+            idx[0] += 1
+
+        step()  # 버퍼 할당은 제외
+        results.append({"kind": label, "resolution": f"{w}x{h}",
+                        "case": "detect_gated" if gated else "detect",
+                        **_timeit(step, repeat)})
+    return results
+
+
+def load_video_frames(path, limit=120):
+    """영상 파일 또는 recorder.py 녹화 폴더에서 최대 limit 프레임"""
+    cap = ReplaySource(path) if is_recording(path) else cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise ValueError(f"Could not read frames from ({path})")
+    return frames
+
+
+def run_suite(resolutions=RESOLUTIONS, grid_sizes=GRID_SIZES, kinds=SCENE_KINDS,
+              fires=2, exits=3, dots=10, repeat=20, seed=0, video=None):
+    results = []
+    for width, height in resolutions:
+        for kind in kinds:
+            scene = SyntheticScene(width, height, kind, fires, exits, dots, seed=seed)
+            for grid_size in grid_sizes:
+                print(f"[BENCH] {kind} {width}x{height} grid={grid_size}")
+                results.extend(bench_scene(scene, grid_size, repeat))
+            results.extend(bench_detection([scene.frame], kind, repeat))
+
+    if video:
+        frames = load_video_frames(video)
+        for width, height in resolutions:
+            resized = [cv2.resize(f, (width, height)) for f in frames]
+            results.extend(bench_detection(resized, "video", repeat))
+    return results
+
+
+def _case_key(r):
+    return (r["case"], r["kind"], r["resolution"], r.get("grid_size"))
+
+
+def compare(results, baseline_path, tolerance=1.2):
+    """이전 결과 대비 median이 tolerance배 이상 느려진 항목을 출력. 느려진 항목 수 반환"""
+    with open(baseline_path) as f:
+        baseline = {_case_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        old = baseline.get(_case_key(r))
+        if old is None or old["median_ms"] <= 0:
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        if ratio > tolerance:
+            regressions += 1
+            print(f"[REGRESSION] {r['case']} {r['kind']} {r['resolution']} grid={r.get('grid_size')}: "
+                  f"{old['median_ms']:.3f} -> {r['median_ms']:.3f} ms ({ratio:.2f}x)")
+    print(f"=== 비교 완료: 느려진 항목 {regressions}개 ===")
+    return regressions
+
+
+def _parse_resolutions(text):
+    return [tuple(int(v) for v in item.split("x")) for item in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="경로 탐색 / 마스크 풀링 / 감지 벤치마크")
+    parser.add_argument("--resolutions", default=",".join(f"{w}x{h}" for w, h in RESOLUTIONS))
+    parser.add_argument("--grid-sizes", default=",".join(map(str, GRID_SIZES)))
+    parser.add_argument("--kinds", default=",".join(SCENE_KINDS))
+    parser.add_argument("--fires", type=int, default=2)
+    parser.add_argument("--exits", type=int, default=3)
+    parser.add_argument("--dots", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--video", help="감지 측정에 쓸 녹화 영상 경로")
+    parser.add_argument("--out", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--astar", action="store_true", help="기존 A* vs 배열 기반 A* 비교만 실행")
+    args = parser.parse_args()
+
+    if args.astar:
+        print("=== A* 벤치마크 (기존 dict 기반 vs 배열 기반, 4방향) ===")
+        print(f"{'grid':>9} {'legacy(ms)':>11} {'array(ms)':>10} {'speedup':>8}  identical")
+        for r in bench_astar():
+            print(f"{r['grid']:>9} {r['legacy_ms']:11.3f} {r['array_ms']:10.3f} "
+                  f"{r['speedup']:7.2f}x  {r['identical']}")
+        return
+
+    results = run_suite(resolutions=_parse_resolutions(args.resolutions),
+                        grid_sizes=[int(v) for v in args.grid_sizes.split(",")],
+                        kinds=args.kinds.split(","),
+                        fires=args.fires, exits=args.exits, dots=args.dots,
+                        repeat=args.repeat, seed=args.seed, video=args.video)
+
+    print(f"{'case':<18} {'kind':<10} {'res':>9} {'grid':>5} {'median(ms)':>11}")
+    for r in results:
+        print(f"{r['case']:<18} {r['kind']:<10} {r['resolution']:>9} "
+              f"{str(r.get('grid_size', '-')):>5} {r['median_ms']:11.3f}")
+
+    if args.out:
+        report = {
+            "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed,
+                     "python": platform.python_version(), "numpy": np.__version__,
+                     "opencv": cv2.__version__, "machine": platform.machine()},
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"결과 저장: {args.out}")
+
+    if args.compare and compare(results, args.compare):
+        # 회귀 검사용: 느려진 항목이 있으면 실패 코드로 종료
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+보정 묶음 (calibration bundle) 저장 / 불러오기.
+
+get_coords.py에서 도트/탈출구를 찍고 'w'로 저장하면, main은 시작할 때 불러와서
+- 도트/탈출구 좌표 (FIXED_DOT_POSITIONS / FIXED_EXIT_POSITIONS 대신)
+- 고정된 벽 마스크 (시작하자마자 벽 고정 상태, 벽을 찾는 프레임이 없음)
+- 보드 코너 / 호모그래피 (USE_BOARD_WARP일 때 코너 탐색 생략)
+- 불이 없을 때의 거리장 (첫 프레임에 BFS 없이 바로 방향)
+을 그대로 씁니다.
+
+형식은 압축하지 않은 .npz 한 파일 (배열을 그대로 읽으므로 불러오기는 몇 ms).
+벽 마스크는 np.packbits로 1비트씩 저장합니다.
+"""
+import os
+
+import numpy as np
+
+VERSION = 1
+
+
+class Calibration:
+    def __init__(self, width, height, grid_size, dots, exits, wall_mask,
+                 corners=None, homography=None, field=None):
+        """
+        :param dots / exits: [(x, y), ...] (main의 MAP_WIDTH x MAP_HEIGHT 화면 좌표)
+        :param wall_mask: 고정할 벽 마스크 (uint8, 0/255)
+        :param corners: Detector.detect_corners 결과 (4, 1, 2) 또는 None
+        :param field: GridMap.field_state() (불이 없을 때의 거리장) 또는 None
+        """
+        self.width = width
+        self.height = height
+        self.grid_size = grid_size
+        self.dots = [tuple(int(v) for v in p) for p in dots]
+        self.exits = [tuple(int(v) for v in p) for p in exits]
+        self.wall_mask = wall_mask
+        self.corners = corners
+        self.homography = homography
+        self.field = field
+
+    @classmethod
+    def capture(cls, frame, dots, exits, width, height, grid_size, path_mode="flow", raw_frame=None):
+        """
+        현재 화면으로 보정 묶음 만들기: 벽 감지 + 보드 코너 + 거리장 계산
+        :param frame: width x height로 맞춘 화면 (도트를 찍은 화면)
+        :param raw_frame: 카메라 원본 (보드 코너 탐색용, 없으면 코너 없이)
+        """
+        import cv2
+        from detector import Detector
+        from map import GridMap
+
+        detector = Detector()
+        wall_mask = detector.analyze(frame).wall_mask.copy()
+
+        corners = homography = None
+        if raw_frame is not None:
+            corners, _ = detector.detect_corners(raw_frame)
+            if corners is not None:
+                dst = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+                homography = cv2.getPerspectiveTransform(corners.reshape(4, 2), dst)
+
+        grid_map = GridMap(width, height, grid_size, path_mode=path_mode)
+        grid_map.update_obstacles_from_mask(wall_mask)
+        for ex, ey in exits:
+            grid_map.add_exit(ex, ey, 20, 20)
+        grid_map.sync()
+        field = grid_map.field_state()
+        return cls(width, height, grid_size, dots, exits, wall_mask, corners, homography, field)
+
+    def save(self, path):
+        arrays = {
+            "version": np.array(VERSION),
+            "size": np.array([self.width, self.height, self.grid_size], dtype=np.int32),
+            "dots": np.array(self.dots, dtype=np.int32).reshape(-1, 2),
+            "exits": np.array(self.exits, dtype=np.int32).reshape(-1, 2),
+            "wall_bits": np.packbits(self.wall_mask > 0),
+        }
+        if self.corners is not None:
+            arrays["corners"] = np.asarray(self.corners, dtype=np.float32)
+            arrays["homography"] = np.asarray(self.homography, dtype=np.float64)
+        if self.field is not None:
+            arrays["path_mode"] = np.array(self.field["path_mode"])
+            for name, value in self.field.items():
+                if name != "path_mode":
+                    arrays["field_" + name] = value
+
+        # 다 쓴 뒤 이름을 바꿔서 읽는 쪽이 쓰다 만 파일을 보지 않게 함
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        print(f"[INFO] 보정 저장: {path} (도트 {len(self.dots)}, 탈출구 {len(self.exits)})")
+
+    @classmethod
+    def load(cls, path):
+        """파일이 없거나 버전이 다르면 None"""
+        if not path or not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            if int(data["version"]) != VERSION:
+                print(f"[WARN] 보정 파일 버전이 달라 무시합니다: {path}")
+                return None
+            width, height, grid_size = (int(v) for v in data["size"])
+            wall_mask = np.unpackbits(data["wall_bits"], count=width * height).reshape(height, width) * np.uint8(255)
+            corners = data["corners"] if "corners" in data else None
+            homography = data["homography"] if "homography" in data else None
+            field = None
+            if "path_mode" in data:
+                field = {name[len("field_"):]: data[name] for name in data.files if name.startswith("field_")}
+                field["path_mode"] = str(data["path_mode"])
+            return cls(width, height, grid_size, data["dots"].tolist(), data["exits"].tolist(),
+                       wall_mask, corners, homography, field)
+
+    def matches(self, width, height, grid_size):
+        return (self.width, self.height, self.grid_size) == (width, height, grid_size)
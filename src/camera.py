@@ -1,34 +1,172 @@
 import cv2
+import threading
+import time
+
+from recorder import FrameRecorder, ReplaySource, is_recording
 
 class Camera:
-    def __init__(self, source=1):
+    def __init__(self, source=1, threaded=False, record_path=None, replay_realtime=False):
         """
         카메라를 초기화합니다.
-        :param source: 카메라 인덱스(0) 또는 스트림 URL(문자열).
+        :param source: 카메라 인덱스(0), 스트림 URL(문자열), 또는 recorder.py 녹화 폴더.
+        :param threaded: True면 별도 스레드에서 계속 읽고 가장 최신 프레임만 보관합니다.
+                         (MJPEG 스트림이 쌓여서 몇 초 전 화면을 처리하는 문제 방지)
+        :param record_path: 지정하면 읽은 프레임을 모두 이 폴더에 녹화합니다.
+        :param replay_realtime: 녹화본 재생 시 녹화 당시 속도로 (False면 최대 속도)
         """
+        self.source = source
+        self.threaded = threaded
+        self.is_replay = is_recording(source)
+        self.replay_realtime = replay_realtime
+
+        # 재접속 대기 시간 (초): 실패할 때마다 2배씩 늘리되 최대값까지만
+        self.RECONNECT_MIN_DELAY = 0.5
+        self.RECONNECT_MAX_DELAY = 8.0
+
+        # 통계 / 마지막으로 반환한 프레임 정보
+        self.frame_id = 0              # get_frame이 반환한 프레임 번호 (캡처 순서)
+        self.frame_timestamp = None    # 그 프레임을 캡처한 시각 (time.time())
+        self.frames_captured = 0       # 카메라에서 읽은 전체 프레임 수
+        self.frames_dropped = 0        # 처리되기 전에 새 프레임으로 덮어써진 수
+        self.reconnects = 0
+
+        self.cap = self._open(source)
+
+        # 공통: 카메라/스트림 열기 실패 확인
+        if not self.cap.isOpened():
+            raise ValueError("Could not open video source ({})".format(source))
+
+        self.recorder = FrameRecorder(record_path, source) if record_path else None
+
+        self._running = False
+        self._thread = None
+        if threaded:
+            self._cond = threading.Condition()
+            self._latest = None
+            self._latest_id = 0
+            self._latest_ts = None
+            self._running = True
+            self._thread = threading.Thread(target=self._capture_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _open(self, source):
+        # 녹화 폴더인 경우: 저장된 프레임을 재생
+        if self.is_replay:
+            print(f"[INFO] 녹화본 재생: {source}")
+            return ReplaySource(source, realtime=self.replay_realtime)
+
         # source가 문자열(URL)인 경우: 웹 스트리밍 주소로 간주
-        if isinstance(source, str):
+        elif isinstance(source, str):
             print(f"[INFO] 네트워크 스트림 접속 시도: {source}")
-            self.cap = cv2.VideoCapture(source)
-        
+            cap = cv2.VideoCapture(source)
+
         # source가 숫자(Int)인 경우: 로컬 USB 카메라로 간주
         else:
             # 1) Windows에서 MSMF 대신 DSHOW 백엔드 먼저 시도 (로컬 카메라용)
-            self.cap = cv2.VideoCapture(source, cv2.CAP_DSHOW)
+            cap = cv2.VideoCapture(source, cv2.CAP_DSHOW)
 
             # 2) 만약 이게 안 되면 기본 백엔드로 한 번 더 시도
-            if not self.cap.isOpened():
+            if not cap.isOpened():
                 print("[WARN] CAP_DSHOW로 열기 실패, 기본 백엔드로 재시도합니다.")
-                self.cap = cv2.VideoCapture(source)
+                cap = cv2.VideoCapture(source)
+        return cap
 
-        # 공통: 카메라/스트림 열기 실패 확인
-        if not self.cap.isOpened():
-            raise ValueError("Could not open video source ({})".format(source))
+    def _reconnect(self):
+        """스트림이 끊겼을 때 백오프를 두고 다시 열기를 반복합니다."""
+        delay = self.RECONNECT_MIN_DELAY
+        while self._running:
+            print(f"[WARN] 스트림 끊김, {delay:.1f}초 후 재접속합니다.")
+            # release()가 부르면 바로 깨어나도록 sleep 대신 _cond에서 대기
+            with self._cond:
+                if self._cond.wait_for(lambda: not self._running, delay):
+                    return
+            if self.cap is not None:
+                self.cap.release()
+            self.cap = self._open(self.source)
+            if self.cap.isOpened():
+                self.reconnects += 1
+                print("[INFO] 재접속 성공")
+                return
+            delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
 
-    def get_frame(self):
-        ret, frame = self.cap.read()
-        return ret, frame
+    def _capture_loop(self):
+        try:
+            self._capture_frames()
+        finally:
+            # cap.read()와 release()가 겹치지 않도록 캡처 장치는 이 스레드가 닫음
+            self._close()
 
-    def release(self):
+    def _capture_frames(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                if self.is_replay:
+                    # 녹화본 끝: 재접속 대신 종료
+                    with self._cond:
+                        self._running = False
+                        self._cond.notify_all()
+                    break
+                self._reconnect()
+                continue
+
+            ts = self._timestamp()
+            if self.recorder is not None:
+                self.recorder.write(frame, ts)
+            with self._cond:
+                self.frames_captured += 1
+                # 아직 가져가지 않은 프레임은 버리고 최신 것만 남김
+                if self._latest is not None and self._latest_id > self.frame_id:
+                    self.frames_dropped += 1
+                self._latest = frame
+                self._latest_id += 1
+                self._latest_ts = ts
+                self._cond.notify_all()
+
+    def get_frame(self, timeout=None):
+        """
+        다음 프레임을 반환합니다.
+        threaded 모드에서는 아직 처리하지 않은 가장 최신 프레임을 기다렸다가 반환합니다.
+        (재접속 중에는 계속 대기, timeout 초가 지나거나 release되면 (False, None))
+        """
+        if not self.threaded:
+            ret, frame = self.cap.read()
+            if ret:
+                self.frames_captured += 1
+                self.frame_id += 1
+                self.frame_timestamp = self._timestamp()
+                if self.recorder is not None:
+                    self.recorder.write(frame, self.frame_timestamp)
+            return ret, frame
+
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: not self._running or self._latest_id > self.frame_id, timeout)
+            if not ok or self._latest_id <= self.frame_id:
+                return False, None
+            self.frame_id = self._latest_id
+            self.frame_timestamp = self._latest_ts
+            return True, self._latest
+
+    def _timestamp(self):
+        # 재생 중에는 녹화 당시 캡처 시각을 그대로 사용
+        return self.cap.timestamp if self.is_replay else time.time()
+
+    def _close(self):
         if self.cap is not None:
-            self.cap.release()
\ No newline at end of file
+            self.cap.release()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def release(self):
+        if self._thread is None:
+            self._close()
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        if self._thread.is_alive():
+            # 멈춘 스트림의 cap.read()에서 아직 못 나옴: 나오면 캡처 스레드가 직접 닫음
+            print("[WARN] 캡처 스레드가 아직 읽는 중입니다. 읽기가 끝나면 닫힙니다.")
+        self._thread = None
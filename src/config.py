@@ -0,0 +1,33 @@
+"""
+main.py(단일 카메라)와 zones.py(여러 구역 워커)가 함께 쓰는 설정.
+각 실행 방식에만 쓰는 설정은 그 파일에 둡니다.
+"""
+
+MAP_WIDTH = 640
+MAP_HEIGHT = 480
+GRID_SIZE = 20
+
+# 변화한 그리드 셀에서만 불 검사 (FULL_SCAN_INTERVAL 프레임마다 전체 검사)
+FIRE_CHANGE_GATING = True
+
+# 불 박스를 프레임 사이에서 추적해 여러 번 확인된 불만 장애물로 사용 (깜빡임/잡음에 경로가 흔들리지 않음)
+FIRE_TRACKING = True
+
+# 경로 탐색 방식: "hazard" = 불/연기/벽 근접 위험을 비용으로 더해 최소화 (GridMap.FIRE_PENALTY 등),
+# "flow" = 최단 칸 수, "hpa" = 클러스터 추상 그래프 (GRID_SIZE를 줄인 촘촘한 그리드/여러 층용), "astar" = 도트마다 A*
+PATH_MODE = "hazard"
+
+# 웹 서버 백엔드: "flask" (개발 서버) / "asyncio" (keep-alive, 많은 동시 접속용)
+SERVER_BACKEND = "asyncio"
+
+# 화면 출력: "window" = OpenCV 창 미리보기, "headless" = 렌더링 없음 (무인 운영 장비, Ctrl+C로 종료)
+DISPLAY_MODE = "window"
+PREVIEW_FPS = 10  # 창 미리보기 최대 갱신 빈도 (0이면 매 프레임)
+# 서버 /debug/stream 으로 축소된 분석 화면(MJPEG) 제공. 보는 사람이 있을 때만 렌더링/인코딩
+DEBUG_STREAM = True
+DEBUG_STREAM_FPS = 5
+DEBUG_STREAM_SCALE = 0.5
+DEBUG_STREAM_QUALITY = 70
+
+# 단계별 소요 시간/fps/큐 깊이 등을 수집해 서버 /metrics (Prometheus 형식)로 제공
+METRICS = True
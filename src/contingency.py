@@ -0,0 +1,212 @@
+"""
+사전 계산 비상 경로표 (contingency table).
+
+벽을 고정하면 벽 그리드 / 탈출구 / 도트 위치가 모두 고정되므로, 불이 한 곳에 처음 생기는 경우를
+미리 전부 계산해 둘 수 있습니다. 불 영역(그리드 셀 기준 w x h 사각형, 최대 MAX_REGION 칸)의
+모든 위치마다 각 도트의 방향과 화살표 목표점을 계산해 .npy 표로 저장하고(np.load mmap_mode로 읽음),
+경로 단계에서는 지금 그리드가 표의 한 경우와 정확히 같을 때 탐색 없이 표의 값을 씁니다.
+불이 여러 곳이거나 더 큰 경우처럼 표에 없는 경우에만 실제 탐색을 합니다.
+
+표 계산은 별도 프로세스에서 (비전 루프와 GIL을 나눠 쓰지 않도록) 하고,
+같은 벽/탈출구/도트 조합의 표가 이미 파일로 있으면 바로 불러옵니다.
+
+    파일: <TABLE_DIR>/<지문>.npy (행: 경우, 열: 도트, 값: (방향 코드, 목표 x, 목표 y))
+          <TABLE_DIR>/<지문>.json (크기/설정/기준 그리드)
+"""
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+DIRECTIONS = ("STOP", "UP", "DOWN", "LEFT", "RIGHT")
+UNSET = 255  # 계산되지 않은 칸
+RECORD = np.dtype([("dir", "u1"), ("tx", "<i2"), ("ty", "<i2")])
+VERSION = 1
+
+
+def fingerprint(base_grid, exits, dots, grid_size, path_mode, max_region):
+    """표가 유효한 조건 (벽 그리드, 탈출구, 도트, 설정) 의 해시"""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(base_grid, dtype=np.uint8).tobytes())
+    h.update(repr((base_grid.shape, list(exits), list(dots), grid_size, path_mode, max_region, VERSION)).encode())
+    return h.hexdigest()[:16]
+
+
+def region_row(gx, gy, w, h, cols, max_region):
+    """불 사각형 (셀 좌상단 gx, gy / 크기 w x h) 의 행 번호. 0행은 불이 없는 경우"""
+    return 1 + ((gy * cols + gx) * max_region + (h - 1)) * max_region + (w - 1)
+
+
+def build_table(path, width, height, grid_size, path_mode, base_grid, exits, dots, max_region):
+    """
+    모든 경우를 계산해 path(.npy/.json)로 저장. 별도 프로세스에서 호출됩니다.
+    :param exits: [(x, y), ...] 탈출구 (main과 같이 20x20 영역으로 등록)
+    :param dots: [(x, y), ...] 도트 (화면 밖 도트는 STOP)
+    """
+    from map import GridMap
+    from navigator import Navigator
+
+    start = time.time()
+    grid_map = GridMap(width, height, grid_size, path_mode=path_mode)
+    navigator = Navigator()
+    rows, cols = base_grid.shape
+    table = np.zeros((1 + rows * cols * max_region * max_region, len(dots)), dtype=RECORD)
+    table["dir"] = UNSET
+
+    def fill(row):
+        for j, (dx, dy) in enumerate(dots):
+            if not (0 <= dx < width and 0 <= dy < height):
+                table[row, j] = (0, -1, -1)
+                continue
+            direction, target = navigator.direction_along((dx, dy), grid_map.get_shortest_path(dx, dy))
+            tx, ty = target if target is not None else (-1, -1)
+            table[row, j] = (DIRECTIONS.index(direction), tx, ty)
+
+    def prepare():
+        # 매번 전체 재계산: 부분 복구는 이전 경우에 따라 같은 길이 경로 중 다른 것을 고를 수 있음
+        grid_map._synced_grid = None
+        grid_map.reset()
+        np.copyto(grid_map.grid, base_grid)
+        for ex, ey in exits:
+            grid_map.add_exit(ex, ey, 20, 20)
+
+    prepare()
+    fill(0)
+    for h in range(1, max_region + 1):
+        for w in range(1, max_region + 1):
+            for gy in range(rows - h + 1):
+                for gx in range(cols - w + 1):
+                    if base_grid[gy:gy + h, gx:gx + w].all():
+                        continue  # 전부 벽이면 지도가 바뀌지 않으므로 lookup에서 걸러짐
+                    prepare()
+                    grid_map.grid[gy:gy + h, gx:gx + w] = 1
+                    grid_map.fire[gy:gy + h, gx:gx + w] = 1
+                    fill(region_row(gx, gy, w, h, cols, max_region))
+
+    meta = {
+        "width": width, "height": height, "grid_size": grid_size, "path_mode": path_mode,
+        "max_region": max_region, "rows": rows, "cols": cols,
+        "exits": [list(e) for e in exits], "dots": [list(d) for d in dots],
+        "base": np.ascontiguousarray(base_grid, dtype=np.uint8).tobytes().hex(),
+        "seconds": round(time.time() - start, 2),
+    }
+    # 다 쓴 뒤 이름을 바꿔서, 읽는 쪽은 완성된 표만 보게 함
+    tmp = path + ".tmp.npy"
+    np.save(tmp, table)
+    with open(path + ".json.tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path + ".npy")
+    os.replace(path + ".json.tmp", path + ".json")
+
+
+class ContingencyTable:
+    """
+    벽이 고정되어 있는 동안 쓰는 비상 경로표.
+    ensure()로 현재 벽/탈출구/도트에 맞는 표를 불러오거나 (없으면 백그라운드 계산 시작),
+    lookup()으로 지금 그리드에 해당하는 도트별 (방향, 목표점)을 찾습니다.
+    """
+    def __init__(self, table_dir, exits, dots, max_region=5):
+        """
+        :param max_region: 표에 넣을 불 사각형의 최대 가로/세로 칸 수
+        """
+        self.table_dir = table_dir
+        self.exits = list(exits)
+        self.dots = list(dots)
+        self.MAX_REGION = max_region
+
+        self.key = None        # 지금 필요한 표의 지문
+        self.table = None      # 불러온 표 (memmap) - key와 지문이 같을 때만
+        self.meta = None
+        self._base = None
+        self._exit_cells = None
+        self._loaded_key = None
+        self._builder = None   # 계산 중인 Process
+
+    @property
+    def ready(self):
+        return self.table is not None and self._loaded_key == self.key
+
+    def ensure(self, grid_map, base_grid):
+        """
+        base_grid(불을 넣기 전 벽 그리드)에 맞는 표 준비. 파일이 있으면 바로 불러오고,
+        없으면 별도 프로세스에서 계산을 시작합니다 (끝나면 다음 호출에서 불러옴).
+        """
+        key = fingerprint(base_grid, self.exits, self.dots, grid_map.grid_size,
+                          grid_map.path_mode, self.MAX_REGION)
+        path = os.path.join(self.table_dir, key)
+        if key != self.key:
+            self.key = key
+            if self._builder is not None and self._builder.is_alive():
+                # 벽이 바뀌어 이전 표는 필요 없음
+                self._builder.terminate()
+            self._builder = None
+            if os.path.exists(path + ".json"):
+                self._load(path, key)
+                return True
+            os.makedirs(self.table_dir, exist_ok=True)
+            self._builder = mp.get_context("spawn").Process(
+                target=build_table, name="contingency", daemon=True,
+                args=(path, grid_map.width, grid_map.height, grid_map.grid_size, grid_map.path_mode,
+                      base_grid.copy(), self.exits, self.dots, self.MAX_REGION))
+            self._builder.start()
+            print(f"[INFO] 비상 경로표 계산 시작 ({key})")
+            return False
+
+        if self.ready:
+            return True
+        if self._builder is None or self._builder.is_alive():
+            return False
+        self._builder = None
+        if os.path.exists(path + ".json"):
+            self._load(path, key)
+            return True
+        # 계산 프로세스가 파일 없이 끝남 (오류). 같은 벽이면 다시 시도하지 않음
+        print(f"[WARN] 비상 경로표 계산 실패 ({key}), 실시간 탐색만 사용합니다.")
+        return False
+
+    def _load(self, path, key):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        self.table = np.load(path + ".npy", mmap_mode="r")
+        self.meta = meta
+        self._base = np.frombuffer(bytes.fromhex(meta["base"]), dtype=np.uint8).reshape(meta["rows"], meta["cols"])
+        self._exit_cells = None
+        self._loaded_key = key
+        self._builder = None
+        print(f"[INFO] 비상 경로표 사용: {path}.npy ({self.table.shape[0]} cases, {meta['seconds']}s)")
+
+    def lookup(self, grid_map):
+        """
+        지금 그리드가 (기준 벽 + 불 사각형 하나) 와 정확히 같으면 도트별 [(방향, 목표점 또는 None), ...],
+        표에 없는 경우면 None.
+        """
+        if not self.ready:
+            return None
+        if self._exit_cells is None:
+            self._exit_cells = tuple(grid_map._to_grid(ex + 10, ey + 10) for ex, ey in self.exits)
+        if tuple(grid_map.exits) != self._exit_cells:
+            return None
+
+        fire = grid_map.fire
+        ys, xs = np.nonzero(fire)
+        if len(ys) == 0:
+            row = 0
+        else:
+            gx, gy = int(xs.min()), int(ys.min())
+            w, h = int(xs.max()) - gx + 1, int(ys.max()) - gy + 1
+            # 불 사각형 하나가 꽉 찬 경우만 (여러 곳이면 표에 없음)
+            if w > self.MAX_REGION or h > self.MAX_REGION or len(ys) != w * h:
+                return None
+            row = region_row(gx, gy, w, h, grid_map.cols, self.MAX_REGION)
+        # 벽까지 포함해 그리드가 표를 만들 때와 같아야 함
+        if not np.array_equal(grid_map.grid, self._base | fire):
+            return None
+
+        records = self.table[row]
+        if len(records) and records[0]["dir"] == UNSET:
+            return None
+        return [(DIRECTIONS[r["dir"]], (int(r["tx"]), int(r["ty"])) if r["tx"] >= 0 else None)
+                for r in records]
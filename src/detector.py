@@ -1,12 +1,285 @@
 import cv2
 import numpy as np
 
+from metrics import metrics
+
+
+class DetectionResult:
+    """
+    Detector.analyze() 결과. 마스크는 Detector 내부 버퍼를 그대로 가리키므로
+    buffer_sets번 뒤의 analyze 호출에서 덮어써집니다. 오래 보관하려면 copy() 할 것.
+    """
+    __slots__ = ("wall_mask", "fire_mask", "fire_boxes", "exit_mask", "exit_boxes")
+
+    def __init__(self, wall_mask, fire_mask, fire_boxes, exit_mask, exit_boxes):
+        self.wall_mask = wall_mask    # None이면 벽 감지를 건너뛴 것
+        self.fire_mask = fire_mask
+        self.fire_boxes = fire_boxes
+        self.exit_mask = exit_mask
+        self.exit_boxes = exit_boxes
+
+
+class PixelChange:
+    """
+    기준 프레임과 픽셀 단위로 비교해, 셀마다 PIXEL_THRESH 이상 바뀐 픽셀이 MIN_PIXELS개 이상인지 판정.
+    셀 평균 비교는 작은 불꽃(몇 px)이 평균에 묻혀 놓치므로 함께 씁니다.
+    """
+    def __init__(self, grid_size, pixel_thresh=40, min_pixels=4):
+        self.grid_size = grid_size
+        self.PIXEL_THRESH = pixel_thresh
+        self.MIN_PIXELS = min_pixels
+        self._ref = None
+
+    def changed_cells(self, frame):
+        """(rows, cols) bool 배열. 기준 프레임이 없거나 크기가 다르면 None (전부 바뀐 것으로 볼 것)"""
+        if self._ref is None or self._ref.shape != frame.shape:
+            return None
+        gs = self.grid_size
+        h, w = frame.shape[:2]
+        cols, rows = max(1, w // gs), max(1, h // gs)
+        if self._cells is None or self._cells.shape[:2] != (rows, cols):
+            self._cells = np.empty((rows, cols, frame.shape[2]), dtype=np.uint8)
+        cv2.absdiff(frame, self._ref, dst=self._diff)
+        cv2.threshold(self._diff, self.PIXEL_THRESH, 255, cv2.THRESH_BINARY, dst=self._diff)
+        # 0/255 셀 평균 = 255 * (바뀐 픽셀 비율) (채널별)
+        cv2.resize(self._diff[:rows * gs, :cols * gs], (cols, rows),
+                   dst=self._cells, interpolation=cv2.INTER_AREA)
+        level = max(1, round(255 * self.MIN_PIXELS / (gs * gs)))
+        return self._cells.max(axis=2) >= level
+
+    def remember(self, frame):
+        """다음 비교의 기준 프레임으로 저장"""
+        if self._ref is None or self._ref.shape != frame.shape:
+            self._ref = frame.copy()
+            self._diff = np.empty_like(frame)
+            self._cells = None
+        else:
+            np.copyto(self._ref, frame)
+
+
 class Detector:
-    def __init__(self):
+    def __init__(self, buffer_sets=1):
+        """
+        :param buffer_sets: analyze() 출력 마스크 버퍼 세트 수.
+                            파이프라인처럼 이전 결과를 다른 스레드가 아직 쓰는 경우
+                            동시에 처리 중인 프레임 수만큼 두면 덮어쓰기가 생기지 않습니다.
+        """
         # 유지보수를 위한 임계값 설정
         self.WALL_THRESH = 200       # 흰색 벽으로 인식할 밝기 기준 (0~255))
         self.MIN_WALL_AREA = 500     # 잡음 제거를 위한 최소 벽 면적
         self.MIN_FIRE_AREA = 10      # 최소 불 영역 크기
+        self.MAX_FIRE_AREA = 3000    # 이보다 큰 붉은 영역(창문 등)은 불이 아님
+        self.MIN_EXIT_AREA = 200
+
+        # 색상 범위 (detect_fire / detect_exit 와 동일)
+        self.LOWER_RED1 = np.array([0, 100, 100])
+        self.UPPER_RED1 = np.array([10, 255, 255])
+        self.LOWER_RED2 = np.array([170, 100, 100])
+        self.UPPER_RED2 = np.array([180, 255, 255])
+        self.LOWER_GREEN = np.array([40, 50, 50])
+        self.UPPER_GREEN = np.array([80, 255, 255])
+
+        self.KERNEL3 = np.ones((3, 3), np.uint8)
+
+        # analyze()용 미리 할당된 버퍼 (첫 프레임 크기에 맞춰 생성)
+        self.buffer_sets = buffer_sets
+        self._buf_shape = None
+        self._buf_index = 0
+
+        # 셀 단위 변화 감지 (enable_change_gating으로 켬)
+        self.gate_grid_size = None
+        self.CHANGE_THRESH = 15          # 셀 평균 색이 배경과 이만큼 다르면 '변화'
+        self.PIXEL_THRESH = 40           # 또는 직전 프레임보다 이만큼 바뀐 픽셀이
+        self.CHANGE_PIXELS = 4           # 셀 안에 이 수 이상이면 '변화' (작은 불꽃)
+        self.FULL_SCAN_INTERVAL = 30     # 이 프레임 수마다 강제로 전체 검사
+        self.BG_LEARNING_RATE = 0.05     # 배경(셀 평균) 갱신 속도
+        self.last_scan_ratio = 1.0       # 직전 analyze에서 실제로 검사한 셀 비율
+
+        # 보드 코너 / 원근 변환 캐시 (고정 카메라)
+        self.CORNER_CHECK_INTERVAL = 60  # 이 프레임 수마다 코너를 다시 찾아 흔들림 확인
+        self.CORNER_DRIFT_PX = 4.0       # 코너가 이보다 많이 움직이면 다시 고정
+        self.locked_corners = None
+        self.homography = None
+        self._frames_since_corner_check = 0
+        self._warp_key = None
+        self._warp_maps = None
+
+    def enable_change_gating(self, grid_size, change_thresh=None, full_scan_interval=None):
+        """
+        GridMap.grid_size에 맞춘 셀마다 평균 색의 이동 평균(배경)을 유지하고,
+        배경과 달라진 셀에서만 HSV 변환/불/탈출구 검사를 다시 합니다.
+        변화 없는 셀은 직전 결과를 그대로 쓰며, full_scan_interval마다 전체를 다시 검사합니다.
+        """
+        self.gate_grid_size = grid_size
+        if change_thresh is not None:
+            self.CHANGE_THRESH = change_thresh
+        if full_scan_interval is not None:
+            self.FULL_SCAN_INTERVAL = full_scan_interval
+        self._buf_shape = None  # 버퍼/배경 다시 생성
+
+    def _alloc_buffers(self, shape):
+        h, w = shape[:2]
+        u8 = lambda: np.empty((h, w), dtype=np.uint8)
+        # 중간 계산용 (매 프레임 재사용)
+        self._hsv = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = u8()
+        self._r = u8()
+        self._b = u8()
+        self._tmp1 = u8()
+        self._tmp2 = u8()
+        self._tmp3 = u8()
+        # 형태학 연산 전 불 마스크 / 탈출구 마스크 (변화 없는 셀은 이전 값 유지)
+        self._fire_raw = u8()
+        self._exit_raw = u8()
+        # 출력용 (buffer_sets개를 돌려가며 사용)
+        self._out = [(u8(), u8(), u8()) for _ in range(self.buffer_sets)]
+        self._buf_shape = shape
+
+        self._last_fire = None
+        self._last_fire_boxes = []
+        self._last_exit_boxes = []
+        self._frames_since_full = 0
+        if self.gate_grid_size:
+            gs = self.gate_grid_size
+            self._cell_cols, self._cell_rows = max(1, w // gs), max(1, h // gs)
+            self._cell_mean = np.empty((self._cell_rows, self._cell_cols, 3), dtype=np.uint8)
+            self._cell_bg = np.zeros((self._cell_rows, self._cell_cols, 3), dtype=np.float32)
+            self._bg_empty = True
+            self._cell_bg_u8 = np.empty_like(self._cell_mean)
+            self._cell_diff = np.empty_like(self._cell_mean)
+            self._pixel_change = PixelChange(gs, self.PIXEL_THRESH, self.CHANGE_PIXELS)
+
+    def _changed_rois(self, frame):
+        """배경과 달라진 셀들을 묶어 (y0, y1, x0, x1) 픽셀 영역 목록으로 반환"""
+        gs = self.gate_grid_size
+        rows, cols = self._cell_rows, self._cell_cols
+        h, w = frame.shape[:2]
+
+        # 셀 평균 색 (나누어떨어지지 않는 나머지 픽셀은 평균에서 제외, ROI에는 포함)
+        cv2.resize(frame[:rows * gs, :cols * gs], (cols, rows),
+                   dst=self._cell_mean, interpolation=cv2.INTER_AREA)
+        if self._bg_empty:
+            self._cell_bg[:] = self._cell_mean
+            self._bg_empty = False
+        cv2.convertScaleAbs(self._cell_bg, dst=self._cell_bg_u8)
+        cv2.absdiff(self._cell_mean, self._cell_bg_u8, dst=self._cell_diff)
+        cv2.accumulateWeighted(self._cell_mean, self._cell_bg, self.BG_LEARNING_RATE)
+
+        changed = self._cell_diff.max(axis=2) > self.CHANGE_THRESH
+        pixels = self._pixel_change.changed_cells(frame)
+        changed = (changed | pixels if pixels is not None else changed).astype(np.uint8)
+        self._pixel_change.remember(frame)
+        # 경계에 걸친 작은 변화(옆 셀에는 임계값 미만)도 놓치지 않도록 이웃 셀까지 포함
+        changed = cv2.dilate(changed, self.KERNEL3)
+        self.last_scan_ratio = float(changed.mean())
+        if not changed.any():
+            return []
+
+        n, _, stats, _ = cv2.connectedComponentsWithStats(changed, connectivity=8)
+        rois = []
+        for cx, cy, cw, ch, _ in stats[1:n]:
+            x1 = w if cx + cw >= cols else (cx + cw) * gs
+            y1 = h if cy + ch >= rows else (cy + ch) * gs
+            rois.append((cy * gs, y1, cx * gs, x1))
+        return rois
+
+    def _fire_exit_raw(self, frame, y0, y1, x0, x1):
+        """영역 안에서만 불(형태학 연산 전)/탈출구 마스크를 계산해 _fire_raw/_exit_raw에 씀"""
+        f = frame[y0:y1, x0:x1]
+        hsv = cv2.cvtColor(f, cv2.COLOR_BGR2HSV, dst=self._hsv[y0:y1, x0:x1])
+        r = cv2.extractChannel(f, 2, dst=self._r[y0:y1, x0:x1])
+        b = cv2.extractChannel(f, 0, dst=self._b[y0:y1, x0:x1])
+        t1, t2, t3 = self._tmp1[y0:y1, x0:x1], self._tmp2[y0:y1, x0:x1], self._tmp3[y0:y1, x0:x1]
+
+        # 불꽃: 밝고 붉은 빛
+        cv2.threshold(r, 230, 255, cv2.THRESH_BINARY, dst=t1)
+        # 포화 뺄셈이라 r < b 이면 0 -> int16 변환 없이 (r - b) > 30 판정 가능
+        cv2.subtract(r, b, dst=t2)
+        cv2.threshold(t2, 30, 255, cv2.THRESH_BINARY, dst=t2)
+        cv2.bitwise_and(t1, t2, dst=t1)
+
+        # 빨간 양초 본체
+        cv2.inRange(hsv, self.LOWER_RED1, self.UPPER_RED1, dst=t2)
+        cv2.inRange(hsv, self.LOWER_RED2, self.UPPER_RED2, dst=t3)
+        cv2.bitwise_or(t2, t3, dst=t2)
+        cv2.bitwise_or(t1, t2, dst=self._fire_raw[y0:y1, x0:x1])
+
+        # 탈출구: 녹색
+        cv2.inRange(hsv, self.LOWER_GREEN, self.UPPER_GREEN, dst=self._exit_raw[y0:y1, x0:x1])
+
+    def analyze(self, frame, walls=True):
+        """
+        한 번의 색 변환(HSV 1회, Gray 1회)으로 벽/불/탈출구 마스크와 박스를 모두 만듭니다.
+        모든 중간 결과는 미리 할당한 버퍼에 쓰므로 프레임마다 큰 배열을 새로 만들지 않습니다.
+        enable_change_gating을 켰다면 불/탈출구 검사는 변화한 셀에서만 다시 수행합니다.
+        :param walls: False면 벽 감지를 건너뜀 (벽을 고정한 경우)
+        :return: DetectionResult
+        """
+        if frame.shape != self._buf_shape:
+            self._alloc_buffers(frame.shape)
+        wall, fire, exit_mask = self._out[self._buf_index]
+        self._buf_index = (self._buf_index + 1) % self.buffer_sets
+
+        # === 벽: 밝은 흰색 (detect_walls_in_map 과 동일) ===
+        wall_mask = None
+        if walls:
+            with metrics.time("detector", step="walls"):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+                cv2.threshold(gray, self.WALL_THRESH, 255, cv2.THRESH_BINARY, dst=self._tmp1)
+                wall_mask = cv2.morphologyEx(self._tmp1, cv2.MORPH_OPEN, self.KERNEL3, dst=wall)
+
+        # === 검사할 영역 결정 ===
+        h, w = frame.shape[:2]
+        full_scan = (not self.gate_grid_size or self._last_fire is None
+                     or self._frames_since_full >= self.FULL_SCAN_INTERVAL)
+        if self.gate_grid_size:
+            with metrics.time("detector", step="gate"):
+                rois = self._changed_rois(frame)  # 배경 모델은 전체 검사 때도 갱신
+        if full_scan:
+            rois = [(0, h, 0, w)]
+            self._frames_since_full = 0
+            self.last_scan_ratio = 1.0
+        else:
+            self._frames_since_full += 1
+
+        # === 변화 없음: 직전 결과 재사용 ===
+        metrics.gauge("detector_scan_ratio", self.last_scan_ratio)
+        if not rois:
+            if fire is not self._last_fire:
+                np.copyto(fire, self._last_fire)
+            np.copyto(exit_mask, self._exit_raw)
+            self._last_fire = fire
+            return DetectionResult(wall_mask, fire, list(self._last_fire_boxes),
+                                   exit_mask, list(self._last_exit_boxes))
+
+        # === 불: 불꽃(밝고 붉은 빛) OR 빨간 양초 (detect_fire 와 동일) ===
+        with metrics.time("detector", step="fire_exit"):
+            for y0, y1, x0, x1 in rois:
+                self._fire_exit_raw(frame, y0, y1, x0, x1)
+
+            cv2.erode(self._fire_raw, self.KERNEL3, dst=self._tmp2, iterations=1)
+            fire_mask = cv2.dilate(self._tmp2, self.KERNEL3, dst=fire, iterations=3)
+            fire_boxes = self._boxes_from_mask(fire_mask, self.MIN_FIRE_AREA, self.MAX_FIRE_AREA)
+
+        # === 탈출구: 녹색 (detect_exit 와 동일) ===
+        with metrics.time("detector", step="exit_boxes"):
+            np.copyto(exit_mask, self._exit_raw)
+            exit_boxes = self._boxes_from_mask(exit_mask, self.MIN_EXIT_AREA)
+
+        self._last_fire = fire_mask
+        self._last_fire_boxes = fire_boxes
+        self._last_exit_boxes = exit_boxes
+        return DetectionResult(wall_mask, fire_mask, list(fire_boxes), exit_mask, list(exit_boxes))
+
+    def _boxes_from_mask(self, mask, min_area, max_area=None):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = []
+        for c in contours:
+            area = cv2.contourArea(c)
+            if area < min_area or (max_area is not None and area > max_area):
+                continue
+            boxes.append(cv2.boundingRect(c))
+        return boxes
 
     def detect_corners(self, frame):
         """
@@ -78,12 +351,60 @@ class Detector:
 
 
     def warp_perspective(self, frame, corners, width, height):
+        """
+        보드 영역을 width x height로 펴서 반환합니다.
+        코너/출력 크기가 직전과 같으면 미리 만든 remap 테이블로 cv2.remap 한 번만 수행합니다.
+        """
         if corners is None: return None
-        
-        dst = np.array([[0, 0], [width-1, 0], [width-1, height-1], [0, height-1]], dtype=np.float32)
+
         src = corners.reshape(4, 2).astype(np.float32)
-        M = cv2.getPerspectiveTransform(src, dst)
-        return cv2.warpPerspective(frame, M, (width, height))
+        key = (src.tobytes(), width, height)
+        if self._warp_key != key:
+            dst = np.array([[0, 0], [width-1, 0], [width-1, height-1], [0, height-1]], dtype=np.float32)
+            M = cv2.getPerspectiveTransform(src, dst)
+            self.homography = M
+            self._warp_maps = self._build_remap(np.linalg.inv(M), width, height)
+            self._warp_key = key
+
+        map1, map2 = self._warp_maps
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
+
+    def _build_remap(self, M_inv, width, height):
+        """출력 픽셀 (x, y) -> 원본 좌표 테이블 (warpPerspective와 같은 고정소수점 형식)"""
+        xs, ys = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        pts = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+        src = cv2.perspectiveTransform(pts, M_inv).reshape(height, width, 2)
+        return cv2.convertMaps(src, None, cv2.CV_16SC2)
+
+    def warp_board(self, frame, width, height):
+        """
+        고정 카메라용: 처음 찾은 보드 코너를 고정(lock)해 두고 매 프레임 remap만 수행합니다.
+        코너는 CORNER_CHECK_INTERVAL 프레임마다 다시 찾아보고,
+        CORNER_DRIFT_PX 이상 움직였을 때만 새 코너로 교체합니다.
+        :return: 펴진 보드 영상, 아직 보드를 못 찾았으면 None
+        """
+        check = (self.locked_corners is None
+                 or self._frames_since_corner_check >= self.CORNER_CHECK_INTERVAL)
+        if check:
+            self._frames_since_corner_check = 0
+            corners, _ = self.detect_corners(frame)
+            if corners is not None:
+                if self.locked_corners is None:
+                    print("[INFO] 보드 코너 고정")
+                    self.locked_corners = corners
+                elif np.abs(corners - self.locked_corners).max() > self.CORNER_DRIFT_PX:
+                    print("[WARN] 보드 코너가 움직임, 다시 고정합니다.")
+                    self.locked_corners = corners
+        else:
+            self._frames_since_corner_check += 1
+
+        if self.locked_corners is None:
+            return None
+        return self.warp_perspective(frame, self.locked_corners, width, height)
+
+    def unlock_corners(self):
+        """다음 warp_board 호출에서 코너를 새로 찾도록 고정 해제"""
+        self.locked_corners = None
 
     def detect_walls_in_map(self, warped_frame):
         """
@@ -11,6 +11,7 @@ def mouse_callback(event, x, y, flags, param):
     if event == cv2.EVENT_LBUTTONDOWN:
         # 왼쪽 클릭: 도트(출발점) 좌표
         print(f"({x}, {y}),") # 복사하기 편하게 포맷 맞춤
+        param['dots'].append((x, y))
         cv2.circle(img, (x, y), 5, (0, 255, 255), -1)
         cv2.putText(img, "DOT", (x+5, y-5),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0,255,255), 1)
@@ -18,12 +19,26 @@ def mouse_callback(event, x, y, flags, param):
     elif event == cv2.EVENT_RBUTTONDOWN:
         # 오른쪽 클릭: 탈출구(목적지) 좌표
         print(f"EXIT: ({x}, {y})")
+        param['exits'].append((x, y))
         cv2.circle(img, (x, y), 7, (0, 255, 0), -1)
         cv2.putText(img, "EXIT", (x+5, y-5),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0,255,0), 1)
 
     param['img'] = img
 
+def save_calibration(frame, raw_frame, dots, exits):
+    """지금 화면(벽)과 찍은 좌표로 보정 묶음을 만들어 main의 CALIBRATION_PATH에 저장"""
+    from calibration import Calibration
+    from config import GRID_SIZE, PATH_MODE
+    from main import CALIBRATION_PATH
+
+    if frame is None or not exits:
+        print("[WARN] 탈출구(우클릭)를 하나 이상 찍은 뒤 저장하세요.")
+        return
+    calib = Calibration.capture(frame, dots, exits, MAP_W, MAP_H, GRID_SIZE,
+                                path_mode=PATH_MODE, raw_frame=raw_frame)
+    calib.save(CALIBRATION_PATH)
+
 def main():
     STREAM_URL = "http://10.8.0.6:8080/?action=stream"
     # STREAM_URL = 1
@@ -41,26 +56,28 @@ def main():
     print("3. main.py의 FIXED_DOT_POSITIONS 리스트에 붙여넣으세요.")
     print("4. 's' 키: 화면 멈춤 (정확히 찍기 위해 사용)")
     print("5. 'r' 키: 화면 리셋 (잘못 찍었을 때)")
-    print("6. 'q' 키: 종료")
+    print("6. 'w' 키: 찍은 도트/탈출구 + 지금 화면의 벽을 보정 파일로 저장 (main이 시작할 때 불러옴)")
+    print("7. 'q' 키: 종료")
 
     is_paused = False
     
     # 클릭한 흔적을 그릴 투명 레이어
     overlay = np.zeros((MAP_H, MAP_W, 3), dtype=np.uint8)
-    param = {'img': overlay} # 마우스 콜백이 여기에 그림
+    param = {'img': overlay, 'dots': [], 'exits': []} # 마우스 콜백이 여기에 그림
+    raw_frame = frame = None
 
     cv2.namedWindow('Get Coordinates')
     cv2.setMouseCallback('Get Coordinates', mouse_callback, param)
 
     while True:
         if not is_paused:
-            ret, frame = cam.get_frame()
+            ret, raw_frame = cam.get_frame()
             if not ret:
                 print("[ERROR] 프레임 읽기 실패")
                 break
             
             # 메인 코드와 동일한 크기로 리사이즈
-            frame = cv2.resize(frame, (MAP_W, MAP_H))
+            frame = cv2.resize(raw_frame, (MAP_W, MAP_H))
             
             # 현재 프레임 + 오버레이(점 찍은 것) 합치기
             # 오버레이가 검은색(0)이 아닌 부분만 프레임에 덮어씀
@@ -84,7 +101,11 @@ def main():
             # 리셋 기능
             overlay.fill(0)
             param['img'] = overlay
+            param['dots'].clear()
+            param['exits'].clear()
             print("화면 초기화됨")
+        elif key == ord('w'):
+            save_calibration(frame, raw_frame, param['dots'], param['exits'])
 
     cam.release()
     cv2.destroyAllWindows()
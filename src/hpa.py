@@ -0,0 +1,397 @@
+"""
+계층적 경로 탐색 (HPA* 방식) - GridMap(path_mode="hpa")에서 사용.
+
+그리드를 cluster_size x cluster_size 칸의 클러스터로 나누고
+- 이웃 클러스터 경계에서 양쪽 모두 빈 칸이 이어진 구간마다 입구(경계 양쪽 셀 한 쌍)를 두고
+- 클러스터 안에서는 입구/탈출구 셀끼리의 거리와 BFS 트리를 미리 계산해 둡니다.
+추상 그래프(입구/탈출구/포털 셀)는 원래 그리드보다 훨씬 작아서, 모든 탈출구에서 한 번의
+Dijkstra로 각 노드의 탈출구까지 거리를 구하고, 경로 조회는 시작 클러스터 안의 BFS +
+저장된 트리를 따라가는 것만으로 끝납니다.
+
+장면이 바뀌면 바뀐 셀이 있는 클러스터(와 경계를 공유하는 이웃)만 다시 계산하므로
+GRID_SIZE를 줄인 촘촘한 그리드에서도 불이 조금 움직일 때의 비용이 작습니다.
+결과는 단위 비용(4방향) 기준의 근사 최단 경로입니다. 탈출구가 시작 클러스터나 그 이웃 클러스터에 있으면
+그 3x3 클러스터 안에서 직접 찾은 최단 경로를 쓰고, 그 밖은 입구를 거치므로 경계를 한 번 지날 때마다
+최대 2 * cluster_size 칸까지 길어질 수 있습니다.
+"""
+import heapq
+
+from metrics import metrics
+
+
+class ClusterGraph:
+    def __init__(self, grid_map, cluster_size=10):
+        """
+        :param grid_map: 그리드/탈출구/포털을 읽어 올 GridMap
+        :param cluster_size: 클러스터 한 변의 칸 수
+        """
+        self.map = grid_map
+        self.cs = cluster_size
+        self.ccols = -(-grid_map.cols // cluster_size)
+        self.crows = -(-grid_map.rows // cluster_size)
+
+        # 경계 구간이 이 길이 이상이면 양 끝에 입구 2개, 아니면 가운데 1개
+        self.ENTRANCE_SPLIT = 6
+
+        self.border_pairs = {}  # (클러스터, "E"/"S") -> [(a, b), ...] 경계 양쪽 셀 인덱스
+        self.nodes = {}         # 클러스터 -> 그 안의 추상 노드 셀 목록
+        self.inter = {}         # 셀 -> {이웃 클러스터 셀: 비용} (경계 입구, 포털)
+        self.intra = {}         # 셀 -> {같은 클러스터 노드: 거리}
+        self.adj = {}           # 클러스터 -> (지역 인접 리스트, x0, y0, 폭)
+        self.trees = {}         # 노드 셀 -> 노드 쪽 다음 칸 리스트 (클러스터 안 BFS 트리, 지역 인덱스)
+        self.dist = {}          # 노드 셀 -> 탈출구까지 추상 거리
+        self.next = {}          # 노드 셀 -> 탈출구 쪽 다음 노드
+        self.last_rebuilt = 0   # 직전 갱신에서 다시 계산한 클러스터 수
+
+    # === 좌표 ===
+    def cluster_of(self, idx):
+        cols = self.map.cols
+        return (idx // cols // self.cs) * self.ccols + (idx % cols) // self.cs
+
+    def _bounds(self, c):
+        cx, cy = c % self.ccols, c // self.ccols
+        x0, y0 = cx * self.cs, cy * self.cs
+        return x0, y0, min(self.map.cols, x0 + self.cs), min(self.map.rows, y0 + self.cs)
+
+    # === 구성 ===
+    def build(self):
+        """전체 재계산 (탈출구/포털이 바뀌었을 때)"""
+        self.border_pairs.clear()
+        self.nodes.clear()
+        self.inter.clear()
+        self.intra.clear()
+        self.adj.clear()
+        self.trees.clear()
+        clusters = range(self.ccols * self.crows)
+        with metrics.time("hpa", op="build"):
+            self._rebuild(clusters)
+            self._abstract_search()
+
+    def update(self, dirty_cells):
+        """바뀐 셀이 속한 클러스터와 그 경계를 공유하는 이웃만 다시 계산"""
+        touched = {self.cluster_of(idx) for idx in dirty_cells.tolist()}
+        if not touched:
+            return
+        with metrics.time("hpa", op="update"):
+            changed = self._rebuild(touched)
+            self._repair_abstract(changed)
+
+    def _rebuild(self, touched):
+        borders = set()
+        for c in touched:
+            cx, cy = c % self.ccols, c // self.ccols
+            borders.add((c, "E"))
+            borders.add((c, "S"))
+            if cx > 0: borders.add((c - 1, "E"))
+            if cy > 0: borders.add((c - self.ccols, "S"))
+
+        # 1) 경계 입구 다시 찾기 (입구가 바뀌면 반대편 클러스터의 노드도 바뀜)
+        affected = set(touched)
+        for key in borders:
+            c, side = key
+            if side == "E" and c % self.ccols == self.ccols - 1: continue
+            if side == "S" and c // self.ccols == self.crows - 1: continue
+            for a, b in self.border_pairs.pop(key, ()):
+                self.inter.get(a, {}).pop(b, None)
+                self.inter.get(b, {}).pop(a, None)
+            pairs = self._find_entrances(c, side)
+            self.border_pairs[key] = pairs
+            for a, b in pairs:
+                self.inter.setdefault(a, {})[b] = 1
+                self.inter.setdefault(b, {})[a] = 1
+            affected.add(c)
+            affected.add(c + 1 if side == "E" else c + self.ccols)
+
+        self._link_portals()
+
+        # 2) 노드가 바뀌었을 수 있는 클러스터의 내부 거리/트리 다시 계산
+        changed = set()
+        for c in affected:
+            changed.update(self.nodes.get(c, ()))
+            self._build_cluster(c)
+            changed.update(self.nodes[c])
+        self.last_rebuilt = len(affected)
+        metrics.gauge("hpa_clusters_rebuilt", len(affected))
+        return changed
+
+    def _find_entrances(self, c, side):
+        grid = self.map.grid
+        x0, y0, x1, y1 = self._bounds(c)
+        cols = self.map.cols
+        if side == "E":
+            # 왼쪽 열 x1-1, 오른쪽 열 x1
+            line = [(y * cols + x1 - 1, y * cols + x1) for y in range(y0, y1)]
+            free = ((grid[y0:y1, x1 - 1] | grid[y0:y1, x1]) == 0).tolist()
+        else:
+            line = [((y1 - 1) * cols + x, y1 * cols + x) for x in range(x0, x1)]
+            free = ((grid[y1 - 1, x0:x1] | grid[y1, x0:x1]) == 0).tolist()
+
+        pairs = []
+        start = None
+        for i, ok in enumerate(free + [False]):
+            if ok and start is None:
+                start = i
+            elif not ok and start is not None:
+                end = i - 1
+                if end - start + 1 >= self.ENTRANCE_SPLIT:
+                    pairs.append(line[start])
+                    pairs.append(line[end])
+                else:
+                    pairs.append(line[(start + end) // 2])
+                start = None
+        return pairs
+
+    def _link_portals(self):
+        blocked = self.map.grid.reshape(-1)
+        for a, links in self.map.portals.items():
+            for b, cost in links:
+                if blocked[a] or blocked[b]:
+                    self.inter.get(a, {}).pop(b, None)
+                else:
+                    self.inter.setdefault(a, {})[b] = cost
+
+    def _cluster_nodes(self, c):
+        nodes = set()
+        for key in ((c, "E"), (c, "S"), (c - 1, "E"), (c - self.ccols, "S")):
+            for a, b in self.border_pairs.get(key, ()):
+                if self.cluster_of(a) == c: nodes.add(a)
+                if self.cluster_of(b) == c: nodes.add(b)
+        cols = self.map.cols
+        blocked = self.map.grid.reshape(-1)
+        for gx, gy in self.map.exits:
+            idx = gy * cols + gx
+            if not blocked[idx] and self.cluster_of(idx) == c:
+                nodes.add(idx)
+        for idx in self.map.portals:
+            if not blocked[idx] and self.cluster_of(idx) == c:
+                nodes.add(idx)
+        return sorted(nodes)
+
+    def _local_graph(self, c):
+        """클러스터 c의 빈 칸 인접 리스트 (클러스터 안 지역 인덱스 ly * w + lx)"""
+        x0, y0, x1, y1 = self._bounds(c)
+        w, h = x1 - x0, y1 - y0
+        free = (self.map.grid[y0:y1, x0:x1] == 0).reshape(-1).tolist()
+        adj = [()] * (w * h)
+        for li in range(w * h):
+            if not free[li]:
+                continue
+            lx = li % w
+            # (-1,0), (1,0), (0,-1), (0,1) 순서는 GridMap.build_flow_field와 동일
+            adj[li] = [n for ok, n in ((lx > 0, li - 1), (lx < w - 1, li + 1),
+                                       (li >= w, li - w), (li < (h - 1) * w, li + w))
+                       if ok and free[n]]
+        return adj, x0, y0, w
+
+    def _local(self, c, idx):
+        _, x0, y0, w = self.adj[c]
+        cols = self.map.cols
+        return (idx // cols - y0) * w + idx % cols - x0
+
+    def _global(self, c, li):
+        _, x0, y0, w = self.adj[c]
+        return (y0 + li // w) * self.map.cols + x0 + li % w
+
+    def _bfs(self, c, source):
+        """클러스터 c 안에서 source(지역 인덱스)부터 BFS. (거리 리스트, source 쪽 다음 칸 리스트), 미도달은 -1"""
+        adj = self.adj[c][0]
+        dist = [-1] * len(adj)
+        parent = [-1] * len(adj)
+        dist[source] = 0
+        # 리스트를 순회하면서 뒤에 덧붙이면 deque 없이 FIFO 순서 그대로 (클러스터가 작아 메모리 부담 없음)
+        queue = [source]
+        for cur in queue:
+            nd = dist[cur] + 1
+            for n in adj[cur]:
+                if dist[n] < 0:
+                    dist[n] = nd
+                    parent[n] = cur
+                    queue.append(n)
+        return dist, parent
+
+    def _build_cluster(self, c):
+        for node in self.nodes.get(c, ()):
+            self.intra.pop(node, None)
+            self.trees.pop(node, None)
+        self.adj[c] = self._local_graph(c)
+        nodes = self._cluster_nodes(c)
+        self.nodes[c] = nodes
+        local = [self._local(c, node) for node in nodes]
+        for node, li in zip(nodes, local):
+            dist, parent = self._bfs(c, li)
+            self.trees[node] = parent
+            self.intra[node] = {other: dist[lo] for other, lo in zip(nodes, local)
+                                if other != node and dist[lo] >= 0}
+
+    def _exit_nodes(self):
+        cols = self.map.cols
+        blocked = self.map.grid.reshape(-1)
+        return {gy * cols + gx for gx, gy in self.map.exits if not blocked[gy * cols + gx]}
+
+    def _abstract_search(self):
+        """모든 탈출구에서 시작하는 추상 그래프 Dijkstra (전체)"""
+        self.dist = {idx: 0 for idx in self._exit_nodes()}
+        self.next = dict.fromkeys(self.dist, -1)
+        self._propagate([(0, idx) for idx in self.dist])
+
+    def _repair_abstract(self, changed):
+        """
+        바뀐 노드(changed)를 거쳐 탈출구로 가던 노드만 무효화하고 다시 채웁니다
+        (GridMap._repair_flow_field와 같은 방식, 가중치 간선).
+        """
+        dist, nxt = self.dist, self.next
+        for node in changed:
+            dist.pop(node, None)
+            nxt.pop(node, None)
+
+        # 1) next 사슬이 무효 노드(사라진 것 포함)에 닿는 노드 찾기 (사슬마다 한 번만 따라감)
+        valid = {}
+        for node in list(dist):
+            chain = []
+            x = node
+            while x not in valid and x in dist and nxt[x] != -1:
+                chain.append(x)
+                x = nxt[x]
+            ok = valid[x] if x in valid else (x in dist)
+            for y in chain:
+                valid[y] = ok
+            valid[x] = ok
+        invalid = [node for node, ok in valid.items() if not ok]
+        for node in invalid:
+            dist.pop(node, None)
+            nxt.pop(node, None)
+
+        # 2) 무효 노드 + 바뀐 노드를 유효한 이웃에서 다시 시드
+        exits = self._exit_nodes()
+        open_set = []
+        for node in set(invalid) | changed:
+            if node in exits:
+                dist[node] = 0
+                nxt[node] = -1
+                open_set.append((0, node))
+                continue
+            best, best_d = -1, float("inf")
+            for edges in (self.intra.get(node), self.inter.get(node)):
+                if not edges:
+                    continue
+                for u, w in edges.items():
+                    d = dist.get(u)
+                    if d is not None and d + w < best_d:
+                        best, best_d = u, d + w
+            if best >= 0:
+                dist[node] = best_d
+                nxt[node] = best
+                open_set.append((best_d, node))
+        self._propagate(open_set)
+
+    def _propagate(self, open_set):
+        """open_set(힙)에서 시작해 거리가 줄어드는 노드로만 전파"""
+        heapq.heapify(open_set)
+        dist, nxt = self.dist, self.next
+        inf = float("inf")
+        while open_set:
+            d, u = heapq.heappop(open_set)
+            if d > dist[u]:
+                continue
+            for edges in (self.intra.get(u), self.inter.get(u)):
+                if not edges:
+                    continue
+                for v, w in edges.items():
+                    nd = d + w
+                    if nd < dist.get(v, inf):
+                        dist[v] = nd
+                        nxt[v] = u
+                        heapq.heappush(open_set, (nd, v))
+
+    # === 조회 ===
+    def _near_exit_path(self, start, limit):
+        """
+        시작 클러스터와 이웃 클러스터(3x3) 안에서만 BFS해 탈출구까지 limit 칸 이하의 최단 셀 경로.
+        그 안에 탈출구가 없거나 더 길면 None
+        """
+        cs, cols = self.cs, self.map.cols
+        cx, cy = start[0] // cs, start[1] // cs
+        x0, y0 = max(0, (cx - 1) * cs), max(0, (cy - 1) * cs)
+        x1, y1 = min(cols, (cx + 2) * cs), min(self.map.rows, (cy + 2) * cs)
+        w = x1 - x0
+        exits = {(gy - y0) * w + gx - x0 for gx, gy in self.map.exits
+                 if x0 <= gx < x1 and y0 <= gy < y1}
+        if not exits:
+            return None
+
+        free = (self.map.grid[y0:y1, x0:x1] == 0).reshape(-1).tolist()
+        size = len(free)
+        source = (start[1] - y0) * w + start[0] - x0
+        dist = [-1] * size
+        parent = [-1] * size
+        dist[source] = 0
+        queue = [source]
+        for cur in queue:
+            if cur in exits:
+                path = []
+                while cur != -1:
+                    path.append((x0 + cur % w, y0 + cur // w))
+                    cur = parent[cur]
+                return path[::-1]
+            nd = dist[cur] + 1
+            if nd > limit:
+                break
+            lx = cur % w
+            for ok, n in ((lx > 0, cur - 1), (lx < w - 1, cur + 1), (cur >= w, cur - w), (cur < size - w, cur + w)):
+                if ok and free[n] and dist[n] < 0:
+                    dist[n] = nd
+                    parent[n] = cur
+                    queue.append(n)
+        return None
+
+    def find_path(self, start, refine=None):
+        """
+        시작 셀 (gx, gy)에서 가장 가까운 탈출구까지의 셀 경로 [(gx, gy), ...]. 없으면 [].
+        탈출구가 주변 3x3 클러스터 안에 있으면 먼저 그 안에서 직접 찾고 (추상 경로보다 짧거나 같으면 사용),
+        아니면 시작 클러스터 안에서만 BFS하고 이후는 추상 경로의 각 구간을 저장된 트리로 펼칩니다.
+        :param refine: 앞에서부터 이 칸 수까지만 셀 단위로 펼치고 그 뒤는 추상 노드(입구)만 이어 붙임
+                       (방향 계산은 앞 몇 칸만 보므로). None이면 전체를 펼침
+        """
+        cols = self.map.cols
+        s = start[1] * cols + start[0]
+        c = self.cluster_of(s)
+        local, parent = self._bfs(c, self._local(c, s))
+
+        best, best_cost = -1, float("inf")
+        for node in self.nodes.get(c, ()):
+            d = local[self._local(c, node)]
+            if d >= 0 and node in self.dist:
+                cost = d + self.dist[node]
+                if cost < best_cost:
+                    best, best_cost = node, cost
+
+        # 입구를 돌아가는 추상 경로보다 가까운 탈출구가 바로 옆에 있을 수 있음
+        near = self._near_exit_path(start, best_cost)
+        if near is not None:
+            return near
+        if best < 0:
+            return []
+
+        # 시작 -> 첫 노드 (BFS 부모를 거꾸로)
+        head = []
+        x = self._local(c, best)
+        while x != -1:
+            head.append(self._global(c, x))
+            x = parent[x]
+        cells = head[::-1]
+
+        # 노드 -> 노드: 경계/포털이면 한 칸, 같은 클러스터면 다음 노드의 BFS 트리를 따라감
+        u = best
+        while self.next[u] != -1:
+            v = self.next[u]
+            tree = self.trees.get(v) if v in self.intra.get(u, ()) else None
+            if tree is not None and (refine is None or len(cells) < refine):
+                cv = self.cluster_of(v)
+                x = tree[self._local(cv, u)]
+                while x != -1:
+                    cells.append(self._global(cv, x))
+                    x = tree[x]
+            else:
+                cells.append(v)
+            u = v
+        return [(idx % cols, idx // cols) for idx in cells]
@@ -0,0 +1,256 @@
+"""
+서버 백엔드 부하 테스트: 같은 프로세스에서 비전 루프(합성 장면으로 감지 + 경로 + 게시)를 돌리면서
+별도 프로세스의 keep-alive 클라이언트들이 /direction, /status를 계속 요청합니다.
+부하 없을 때와 부하 중의 루프 fps, 초당 처리 요청 수를 백엔드별로 출력합니다.
+
+    python loadtest.py                                   # flask, asyncio 모두
+    python loadtest.py --backends asyncio --procs 4 --threads 32 --duration 10
+    python loadtest.py --people-stress                   # 동시 인원수 이벤트에서 빠지는 값이 없는지 확인
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import threading
+import time
+
+from benchmark import SyntheticScene
+from detector import Detector
+from map import GridMap
+from navigator import Navigator
+from server import EvacuationServer
+
+MAP_WIDTH = 640
+MAP_HEIGHT = 480
+GRID_SIZE = 20
+
+
+class VisionLoop:
+    """main.py의 감지 -> 경로 -> 게시 루프를 합성 장면 두 개를 번갈아 가며 흉내냄"""
+    def __init__(self, server):
+        self.server = server
+        self.scenes = [SyntheticScene(MAP_WIDTH, MAP_HEIGHT, "rooms", dots=4, seed=s) for s in (0, 1)]
+        self.detector = Detector()
+        self.grid_map = GridMap(MAP_WIDTH, MAP_HEIGHT, GRID_SIZE)
+        self.navigator = Navigator()
+        self.frames = 0
+        self.running = False
+
+    def step(self):
+        scene = self.scenes[self.frames // 10 % 2]  # 10프레임마다 장면(=방향) 전환
+        result = self.detector.analyze(scene.frame)
+        scene.build_grid(self.grid_map)
+        directions = {}
+        for i, (dx, dy) in enumerate(scene.dots):
+            path = self.grid_map.get_shortest_path(dx, dy)
+            directions[i] = self.navigator.direction_along((dx, dy), path)[0]
+        self.server.update_data(len(result.fire_boxes) > 0, directions, frame_id=self.frames)
+        self.frames += 1
+
+    def run(self):
+        while self.running:
+            self.step()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def measure_fps(self, seconds):
+        start_frames, start = self.frames, time.perf_counter()
+        time.sleep(seconds)
+        return (self.frames - start_frames) / (time.perf_counter() - start)
+
+
+def _client_thread(host, port, deadline, dots, counts, idx):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    ok = errors = 0
+    n = idx
+    while time.time() < deadline:
+        path = "/status" if n % 5 == 0 else f"/direction/{n % dots}"
+        n += 1
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.close()
+    counts[idx] = (ok, errors)
+
+
+def _client_process(host, port, threads, start_at, deadline, dots, out):
+    """부하 프로세스 하나: threads개의 keep-alive 연결로 deadline까지 요청 반복"""
+    counts = [(0, 0)] * threads
+    while time.time() < start_at:
+        time.sleep(0.01)
+    workers = [threading.Thread(target=_client_thread, args=(host, port, deadline, dots, counts, i))
+               for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    out.put((sum(c[0] for c in counts), sum(c[1] for c in counts)))
+
+
+def run_backend(backend, port, procs, threads, duration, warmup=1.0):
+    server = EvacuationServer(port=port, backend=backend)
+    server.start()
+    loop = VisionLoop(server)
+    loop.start()
+    time.sleep(warmup)
+
+    fps_idle = loop.measure_fps(duration)
+
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    start_at = time.time() + 1.0  # 프로세스가 모두 뜬 뒤 동시에 시작
+    deadline = start_at + duration
+    clients = [ctx.Process(target=_client_process,
+                           args=("127.0.0.1", port, threads, start_at, deadline, 4, out), daemon=True)
+               for _ in range(procs)]
+    for c in clients:
+        c.start()
+    while time.time() < start_at:
+        time.sleep(0.01)
+    fps_load = loop.measure_fps(duration)
+
+    ok = errors = 0
+    for _ in clients:
+        o, e = out.get()
+        ok += o
+        errors += e
+    for c in clients:
+        c.join()
+    loop.stop()
+
+    return {
+        "backend": backend,
+        "clients": procs * threads,
+        "rps": ok / duration,
+        "errors": errors,
+        "fps_idle": fps_idle,
+        "fps_load": fps_load,
+    }
+
+
+def _people_thread(host, port, events, counts, idx):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    body = json.dumps({"type": "IN"})
+    ok = 0
+    for _ in range(events):
+        try:
+            conn.request("POST", "/api/people_count", body=body,
+                         headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            ok += resp.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.close()
+    counts[idx] = ok
+
+
+def _people_process(host, port, threads, events, out):
+    counts = [0] * threads
+    workers = [threading.Thread(target=_people_thread, args=(host, port, events, counts, i))
+               for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    out.put(sum(counts))
+
+
+def people_stress(backend, port, procs, threads, events):
+    """
+    비전 루프가 게시하는 동안
+    1) 여러 프로세스가 HTTP로 IN 이벤트를 동시에 보내고 -> 최종 인원수 == 성공한 요청 수
+    2) 서버 프로세스 안의 스레드들이 IN/OUT 쌍을 동시에 반영 -> 인원수가 그대로
+    인지 확인합니다. (각 스레드는 IN 뒤에 OUT을 하므로 0 하한에 걸리지 않음)
+    """
+    server = EvacuationServer(port=port, backend=backend)
+    server.LOG_PEOPLE_EVENTS = False
+    server.start()
+    loop = VisionLoop(server)
+    loop.start()
+    time.sleep(1.0)
+
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    clients = [ctx.Process(target=_people_process, args=("127.0.0.1", port, threads, events, out), daemon=True)
+               for _ in range(procs)]
+    for c in clients:
+        c.start()
+    sent = sum(out.get() for _ in clients)
+    for c in clients:
+        c.join()
+    after_http = server.people.value
+
+    def in_out():
+        for _ in range(events):
+            server.people_event("IN")
+            server.people_event("OUT")
+    workers = [threading.Thread(target=in_out) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    loop.stop()
+
+    return {
+        "backend": backend,
+        "sent": sent,
+        "counted": after_http,
+        "after_in_out": server.people.value,
+        "published": server.snapshot.people_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="서버 백엔드 부하 테스트 (요청 처리량 + 비전 루프 fps)")
+    parser.add_argument("--backends", default="flask,asyncio")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--procs", type=int, default=2, help="부하 클라이언트 프로세스 수")
+    parser.add_argument("--threads", type=int, default=16, help="프로세스당 동시 연결 수")
+    parser.add_argument("--duration", type=float, default=5.0, help="측정 구간 길이 (초)")
+    parser.add_argument("--people-stress", action="store_true", help="인원수 동시 증감 검사만 실행")
+    parser.add_argument("--events", type=int, default=200, help="people-stress: 연결(스레드)당 이벤트 수")
+    args = parser.parse_args()
+
+    if args.people_stress:
+        lost = 0
+        for i, backend in enumerate(args.backends.split(",")):
+            r = people_stress(backend, args.port + i, args.procs, args.threads, args.events)
+            ok = r["sent"] == r["counted"] == r["after_in_out"] == r["published"]
+            lost += not ok
+            print(f"[{'INFO' if ok else 'ERROR'}] {backend}: 보낸 IN {r['sent']}, 집계 {r['counted']}, "
+                  f"IN/OUT 후 {r['after_in_out']}, 게시된 값 {r['published']}")
+        print("=== 빠진 증감 없음 ===" if not lost else "=== 빠진 증감 있음 ===")
+        return
+
+    results = []
+    for i, backend in enumerate(args.backends.split(",")):
+        # 백엔드 서버 스레드는 종료할 수 없으므로 포트를 바꿔 가며 실행
+        print(f"[INFO] {backend} 측정 중...")
+        results.append(run_backend(backend, args.port + i, args.procs, args.threads, args.duration))
+
+    print(f"{'backend':<8} {'clients':>7} {'req/s':>9} {'errors':>6} {'fps idle':>9} {'fps load':>9} {'ratio':>6}")
+    for r in results:
+        print(f"{r['backend']:<8} {r['clients']:7d} {r['rps']:9.0f} {r['errors']:6d} "
+              f"{r['fps_idle']:9.1f} {r['fps_load']:9.1f} {r['fps_load'] / r['fps_idle']:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
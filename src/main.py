@@ -1,17 +1,61 @@
+
 import cv2
-import numpy as np
 
 # 분리된 모듈들 import
 from camera import Camera
 from detector import Detector
 from map import GridMap
 from navigator import Navigator
+from tracker import FireTracker
+from contingency import ContingencyTable
+from scheduler import ActivityScheduler
+from calibration import Calibration
 from server import EvacuationServer
+from pipeline import FramePacket, Pipeline
+from metrics import metrics
+from overlay import Preview, draw_overlay
+from config import (MAP_WIDTH, MAP_HEIGHT, GRID_SIZE, FIRE_CHANGE_GATING, FIRE_TRACKING, PATH_MODE,
+                    SERVER_BACKEND, DISPLAY_MODE, DEBUG_STREAM, METRICS)
+
+# === 설정 === (두 실행 방식이 함께 쓰는 설정은 config.py)
+
+# 스트림을 별도 스레드에서 읽고 최신 프레임만 처리 (끊기면 자동 재접속)
+THREADED_CAPTURE = True
+
+# 캡처/감지/경로/게시를 단계별 스레드로 나누어 실행 (False면 기존처럼 한 루프에서 순서대로)
+PIPELINED = True
+PIPELINE_QUEUE_SIZE = 2
+# 감지 결과 마스크는 Detector 버퍼를 재사용하므로, 감지~화면 출력 사이에 동시에 떠 있을 수 있는
+# 프레임 수(단계 3개 x (큐 + 처리 중 1) + 출력 중 1)만큼 버퍼 세트를 둠
+DETECTOR_BUFFER_SETS = 3 * (PIPELINE_QUEUE_SIZE + 1) + 1 if PIPELINED else 1
+
+# 장면 활동에 맞춘 처리 빈도 (scheduler.py). 조용할 때는 IDLE_FPS로만 감지하고 벽 갱신/경로 재계산은
+# IDLE_STAGE_INTERVALS(초)마다, 불 후보나 장면 변화가 보이면 바로 모든 프레임 처리 -> ACTIVITY_COOLDOWN초 뒤 복귀
+ADAPTIVE_RATE = True
+IDLE_FPS = 2
+ACTIVITY_COOLDOWN = 10.0
+IDLE_STAGE_INTERVALS = {"walls": 5.0, "plan": 5.0}
+
+# 벽 고정 중에는 불 한 곳(최대 CONTINGENCY_MAX_REGION x CONTINGENCY_MAX_REGION 칸)의 모든 경우를
+# 별도 프로세스에서 미리 계산해 두고(contingency.py), 처음 불이 났을 때 탐색 없이 표에서 바로 방향을 찾음
+CONTINGENCY_TABLE = True
+CONTINGENCY_DIR = "contingency"
+CONTINGENCY_MAX_REGION = 5
+
+# get_coords.py에서 'w'로 저장한 보정 묶음 (도트/탈출구, 고정 벽, 보드 코너, 거리장).
+# 있으면 시작하자마자 벽 고정 상태로 첫 프레임부터 저장된 거리장으로 방향을 냄 (None이면 사용 안 함)
+CALIBRATION_PATH = "calibration.npz"
+
+# 보드 코너를 한 번 찾아 고정하고 매 프레임 remap으로 펴서 사용 (고정 카메라)
+USE_BOARD_WARP = False
 
-# === 설정 ===
-MAP_WIDTH = 640
-MAP_HEIGHT = 480
-GRID_SIZE = 20
+# 녹화 / 재생 (recorder.py)
+# RECORD_PATH: 카메라 프레임을 이 폴더에 그대로 녹화
+# REPLAY_PATH: 카메라 대신 녹화본 재생. REPLAY_REALTIME=False면 최대 속도로 한 프레임도 버리지 않고
+#              처리하므로 같은 녹화본에서는 항상 같은 결과가 나옴 (감지/경로 변경 비교, 프로파일링용)
+RECORD_PATH = None
+REPLAY_PATH = None
+REPLAY_REALTIME = False
 
 # 1개의 도트만 테스트한다고 가정 (혹은 여러 개)
 FIXED_DOT_POSITIONS = [
@@ -27,144 +71,264 @@ FIXED_EXIT_POSITIONS = [
     (290, 19)
 ]
 
-def main():
+
+class WallLock:
+    """
+    'c' 키로 토글하는 벽 고정 상태.
+    화면 스레드에서 바꾸고 감지 스레드에서 읽으므로 (고정 여부, 마스크)를 한 번에 교체합니다.
+    """
+    def __init__(self):
+        self.state = (False, None)
+
+    def toggle(self, current_wall_mask):
+        locked, _ = self.state
+        if not locked:
+            mask = current_wall_mask.copy() if current_wall_mask is not None else None
+            self.state = (True, mask)
+            print(">>> 벽 고정 완료! (LOCKED)")
+        else:
+            self.state = (False, None)
+            print(">>> 벽 고정 해제. (UNLOCKED)")
+
+
+def detect_stage(detector, wall_lock, packet, fire_tracker=None, scheduler=None):
+    """[A] 벽 + [B] 불 감지"""
+    locked, locked_wall_mask = wall_lock.state
+    use_locked = locked and locked_wall_mask is not None
+    # idle일 때는 벽을 가끔만 다시 감지하고 그 사이에는 직전 벽 마스크 사용
+    walls = not use_locked and (scheduler is None or "walls" not in scheduler.cache
+                                or scheduler.due("walls", packet.timestamp))
+
+    # 색 변환 한 번으로 벽/불/탈출구를 함께 분석 (벽 고정 시 벽 감지는 생략)
+    result = detector.analyze(packet.frame, walls=walls)
+
+    if use_locked:
+        # [고정 모드] 저장해둔 벽 마스크 사용
+        packet.wall_mask = locked_wall_mask
+        packet.wall_locked = True
+    elif scheduler is None:
+        # [탐색 모드] 실시간 벽 감지
+        packet.wall_mask = result.wall_mask
+    else:
+        # 감지 버퍼는 돌려 쓰므로 다음 갱신까지 쓸 벽 마스크는 복사해 둠
+        if walls:
+            scheduler.cache["walls"] = result.wall_mask.copy()
+        packet.wall_mask = scheduler.cache["walls"]
+    if scheduler is not None:
+        packet.wall_version = scheduler.wall_version(packet.wall_mask)
+
+    packet.raw_fire_boxes = result.fire_boxes
+    if fire_tracker is not None:
+        # 확정된 불만 전달 (확정 박스는 바뀔 때만 달라지므로 그리드 재계산도 그때만)
+        packet.fire_boxes = fire_tracker.update(result.fire_boxes)
+    else:
+        packet.fire_boxes = result.fire_boxes
+    if scheduler is not None:
+        scheduler.report(packet)
+    return packet
+
+
+def plan_stage(grid_map, navigator, packet, scheduler=None):
+    """그리드 갱신 + [C] 탈출구 등록 + [D] 도트 경로 및 방향 계산 (Navigator 위임)"""
+    if scheduler is not None:
+        # idle이고 벽/불이 그대로면 간격(IDLE_STAGE_INTERVALS["plan"])이 지날 때까지 직전 경로 사용
+        inputs = (packet.wall_version, packet.wall_locked, tuple(packet.fire_boxes))
+        if "plan" in scheduler.cache and not scheduler.due("plan", packet.timestamp, inputs):
+            packet.routes, packet.directions = scheduler.cache["plan"]
+            return packet
+
+    grid_map.reset()
+
+    # 그리드맵에 장애물 업데이트
+    if packet.wall_mask is not None:
+        grid_map.update_obstacles_from_mask(packet.wall_mask)
+
+    # 벽이 고정되어 있으면 (불을 넣기 전) 벽 그리드에 맞는 비상 경로표 준비
+    table_routes = None
+    if packet.wall_locked and grid_map.contingency is not None:
+        grid_map.contingency.ensure(grid_map, grid_map.grid)
+
+    for (fx, fy, fw, fh) in packet.fire_boxes:
+        grid_map.set_obstacle_rect(fx-20, fy-20, fw+40, fh+40, fire=True)
+
+    for ex, ey in FIXED_EXIT_POSITIONS:
+        grid_map.add_exit(ex, ey, 20, 20)
+
+    if packet.wall_locked:
+        table_routes = grid_map.contingency_routes()
+
+    routes = []
+    directions = {}
+    for i, (dx, dy) in enumerate(FIXED_DOT_POSITIONS):
+        if not (0 <= dx < MAP_WIDTH and 0 <= dy < MAP_HEIGHT): continue
+
+        if table_routes is not None:
+            # 표에 있는 경우: 탐색 없이 방향/목표점 사용 (화면에는 목표점까지 직선으로)
+            direction, target_pos = table_routes[i]
+            path = [(dx, dy), target_pos] if target_pos is not None else []
+        else:
+            path = grid_map.get_shortest_path(dx, dy)
+            # 5칸 앞(혹은 경로의 끝)을 기준으로 큰 흐름의 방향을 얻음
+            direction, target_pos = navigator.direction_along((dx, dy), path)
+
+        routes.append((i, (dx, dy), path, target_pos, direction))
+        directions[i] = direction
+
+    packet.routes = routes
+    packet.directions = directions
+    if scheduler is not None:
+        scheduler.cache["plan"] = (routes, directions)
+    return packet
+
+
+def publish_stage(server, packet):
+    """[E] 서버에 데이터 업데이트"""
+    is_fire = (len(packet.fire_boxes) > 0)
+    server.update_data(is_fire, packet.directions, frame_id=packet.frame_id)
+    metrics.tick("frames")
+    return packet
+
+
+def capture_packet(cam, detector, scheduler=None):
+    while True:
+        ret, frame = cam.get_frame()
+        if not ret:
+            return None
+        # 조용할 때는 가벼운 변화 검사만 하고 프레임을 건너뜀 (리사이즈/감지 없음)
+        if scheduler is None or scheduler.admit(frame, cam.frame_timestamp):
+            break
+    # 화면 준비 (보드 코너를 아직 못 찾았으면 단순 리사이즈)
+    warped = detector.warp_board(frame, MAP_WIDTH, MAP_HEIGHT) if USE_BOARD_WARP else None
+    frame = warped if warped is not None else cv2.resize(frame, (MAP_WIDTH, MAP_HEIGHT))
+    return FramePacket(cam.frame_id, cam.frame_timestamp, frame)
+
+
+def run_serial(cam, detector, grid_map, navigator, server, wall_lock, preview, fire_tracker=None,
+               scheduler=None):
+    while True:
+        with metrics.time("stage", stage="capture"):
+            packet = capture_packet(cam, detector, scheduler)
+        if packet is None: break
+
+        with metrics.time("stage", stage="detect"):
+            detect_stage(detector, wall_lock, packet, fire_tracker, scheduler)
+        with metrics.time("stage", stage="plan"):
+            plan_stage(grid_map, navigator, packet, scheduler)
+        with metrics.time("stage", stage="publish"):
+            publish_stage(server, packet)
+
+        if not preview.update(packet, wall_lock):
+            break
+
+
+def run_pipelined(cam, detector, grid_map, navigator, server, wall_lock, preview,
+                  fire_tracker=None, lossless=False, scheduler=None):
+    pipeline = Pipeline(queue_size=PIPELINE_QUEUE_SIZE)
+    pipeline.add_source("capture", lambda: capture_packet(cam, detector, scheduler), drop_oldest=not lossless)
+    pipeline.add_stage("detect", lambda p: detect_stage(detector, wall_lock, p, fire_tracker, scheduler))
+    pipeline.add_stage("plan", lambda p: plan_stage(grid_map, navigator, p, scheduler))
+    pipeline.add_stage("publish", lambda p: publish_stage(server, p))
+    metrics.gauge_fn("queue_depth", pipeline.queue_depths, label="stage")
+    metrics.gauge_fn("stage_dropped", pipeline.dropped, label="stage")
+    pipeline.start()
+
+    # OpenCV 창은 메인 스레드에서만 안전하게 다룰 수 있으므로 렌더링은 여기서
+    try:
+        while not pipeline.finished:
+            packet = pipeline.get(timeout=0.1)
+            if packet is None:
+                # 새 결과가 없어도 창 이벤트는 처리
+                if not preview.idle(): break
+                continue
+            if not preview.update(packet, wall_lock):
+                break
+    finally:
+        pipeline.stop()
+
+
+def main(replay_path=REPLAY_PATH, record_path=RECORD_PATH, replay_realtime=REPLAY_REALTIME):
+    # 최대 속도 재생은 프레임을 버리지 않도록 캡처 스레드/큐 드롭 없이 순서대로 처리
+    lossless = replay_path is not None and not replay_realtime
+
     # 1. 모듈 초기화
     try:
         STREAM_URL = "http://10.8.0.6:8080/?action=stream"
         # STREAM_URL = 1  # 테스트용 로컬 카메라
-        print(f"Connecting to {STREAM_URL}...")
-        cam = Camera(STREAM_URL)
+        source = replay_path if replay_path is not None else STREAM_URL
+        print(f"Connecting to {source}...")
+        cam = Camera(source, threaded=THREADED_CAPTURE and not lossless,
+                     record_path=record_path, replay_realtime=replay_realtime)
     except Exception as e:
         print(f"Camera Error: {e}")
         return
 
-    detector = Detector()
-    grid_map = GridMap(MAP_WIDTH, MAP_HEIGHT, GRID_SIZE)
+    metrics.enable(METRICS)
+    metrics.gauge_fn("camera_frames_captured", lambda: cam.frames_captured)
+    metrics.gauge_fn("camera_frames_dropped", lambda: cam.frames_dropped)
+    metrics.gauge_fn("camera_reconnects", lambda: cam.reconnects)
+
+    detector = Detector(buffer_sets=DETECTOR_BUFFER_SETS)
+    if FIRE_CHANGE_GATING:
+        detector.enable_change_gating(GRID_SIZE)
+    fire_tracker = FireTracker() if FIRE_TRACKING else None
+    scheduler = ActivityScheduler(GRID_SIZE, IDLE_FPS, cooldown=ACTIVITY_COOLDOWN,
+                                  stage_intervals=IDLE_STAGE_INTERVALS) if ADAPTIVE_RATE else None
+    if lossless and PIPELINED:
+        # 고를 프레임이 스레드 타이밍에 따라 달라지므로 재현 모드에서는 모든 프레임 처리
+        scheduler = None
+    grid_map = GridMap(MAP_WIDTH, MAP_HEIGHT, GRID_SIZE, path_mode=PATH_MODE)
+
+    # [핵심 변수] 벽 고정용
+    wall_lock = WallLock()
+
+    calib = Calibration.load(CALIBRATION_PATH)
+    if calib is not None and not calib.matches(MAP_WIDTH, MAP_HEIGHT, GRID_SIZE):
+        print(f"[WARN] 보정 파일 크기가 달라 무시합니다: {CALIBRATION_PATH}")
+        calib = None
+    if calib is not None:
+        # 다른 곳(화면 그리기 등)에서도 같은 리스트를 보므로 내용만 교체
+        FIXED_DOT_POSITIONS[:] = calib.dots
+        FIXED_EXIT_POSITIONS[:] = calib.exits
+        wall_lock.state = (True, calib.wall_mask)
+        if calib.corners is not None:
+            detector.locked_corners = calib.corners
+        restored = grid_map.restore_field(calib.field)
+        print(f"[INFO] 보정 불러옴: {CALIBRATION_PATH} (벽 고정, 거리장 {'사용' if restored else '다시 계산'})")
+
+    if CONTINGENCY_TABLE:
+        grid_map.contingency = ContingencyTable(CONTINGENCY_DIR, FIXED_EXIT_POSITIONS, FIXED_DOT_POSITIONS,
+                                                CONTINGENCY_MAX_REGION)
     navigator = Navigator()      # 방향 계산기
-    server = EvacuationServer()  # 웹 서버
-    
+    server = EvacuationServer(backend=SERVER_BACKEND)  # 웹 서버
+
     # 2. 서버 시작 (백그라운드)
     server.start()
 
-    # [핵심 변수] 벽 고정용
-    wall_locked = False
-    locked_wall_mask = None
+    headless = DISPLAY_MODE == "headless"
+    preview = Preview(server, window=not headless,
+                      render=lambda packet: draw_overlay(packet, FIXED_EXIT_POSITIONS))
 
     print("=== System Started ===")
-    print("1. 'c' 키: 벽 고정/해제 (Lock)")
-    print("2. 'q' 키: 종료")
-    
-    while True:
-        ret, frame = cam.get_frame()
-        if not ret: break
-        
-        # 화면 준비
-        frame = cv2.resize(frame, (MAP_WIDTH, MAP_HEIGHT))
-        analysis_map = frame.copy()
-
-        # [A] 맵 & 벽 업데이트 (시각화 복구됨)
-        grid_map.reset()
-        current_wall_mask = None
-        
-        if wall_locked and locked_wall_mask is not None:
-            # [고정 모드] 저장해둔 벽 마스크 사용
-            current_wall_mask = locked_wall_mask
-            
-            # [복구됨] 고정된 벽을 빨간색으로 표시
-            analysis_map[locked_wall_mask > 0] = [0, 0, 255]
-            
-            cv2.putText(analysis_map, "[WALL LOCKED]", (10, 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        else:
-            # [탐색 모드] 실시간 벽 감지
-            current_wall_mask = detector.detect_walls_in_map(analysis_map)
-            
-            # [복구됨] 감지된 벽을 초록색으로 표시
-            if current_wall_mask is not None:
-                analysis_map[current_wall_mask > 0] = [0, 255, 0]
-
-            cv2.putText(analysis_map, "Searching Walls... Press 'c'", (10, 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-        # 그리드맵에 장애물 업데이트
-        if current_wall_mask is not None:
-            grid_map.update_obstacles_from_mask(current_wall_mask)
-
-        # [B] 불 감지
-        fire_boxes, _ = detector.detect_fire(analysis_map)
-        is_fire = (len(fire_boxes) > 0)
-        
-        for (fx, fy, fw, fh) in fire_boxes:
-            grid_map.set_obstacle_rect(fx-20, fy-20, fw+40, fh+40)
-            cv2.rectangle(analysis_map, (fx, fy), (fx+fw, fy+fh), (0, 0, 255), 2)
-            cv2.putText(analysis_map, "FIRE", (fx, fy-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 2)
-
-        # [C] 탈출구 등록
-        for ex, ey in FIXED_EXIT_POSITIONS:
-            grid_map.add_exit(ex, ey, 20, 20)
-            cv2.circle(analysis_map, (ex, ey), 8, (255, 255, 255), -1)
-            cv2.putText(analysis_map, "EXIT", (ex-15, ey-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 1)
-
-        # [D] 도트 경로 및 방향 계산 (Navigator 위임)
-        current_directions = {}
-        
-        for i, (dx, dy) in enumerate(FIXED_DOT_POSITIONS):
-            if not (0 <= dx < MAP_WIDTH and 0 <= dy < MAP_HEIGHT): continue
-
-            # 1. 도트 좌표 표시 (요청사항 반영)
-            cv2.putText(analysis_map, f"({dx},{dy})", (dx+10, dy), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+    if headless:
+        print("(headless) Ctrl+C: 종료")
+    else:
+        print("1. 'c' 키: 벽 고정/해제 (Lock)")
+        print("2. 'q' 키: 종료")
+    if DEBUG_STREAM:
+        print(f"분석 화면: http://<서버>:{server.port}/debug/stream")
 
-            path = grid_map.get_shortest_path(dx, dy)
-            direction = "STOP"
-
-            if len(path) > 1:
-                # [수정 1] 화살표와 텍스트의 기준점을 통일
-                # path[1]은 너무 가까워서 방향이 불안정할 수 있으므로
-                # 5칸 앞(idx) 혹은 경로의 끝을 기준으로 방향을 계산합니다.
-                idx = min(5, len(path)-1)
-                target_pos = path[idx] # 화살표가 가리키는 지점
-                
-                # Navigator에게 '현재위치'와 '목표지점(5칸앞)'을 줘서 큰 흐름의 방향을 얻음
-                direction = navigator.get_direction((dx, dy), target_pos)
-                
-                # 경로 그리기
-                cv2.polylines(analysis_map, [np.array(path)], False, (255, 0, 0), 2)
-                
-                # 화살표 그리기 (목표 지점 target_pos 사용)
-                cv2.arrowedLine(analysis_map, (dx, dy), target_pos, (0, 255, 255), 2)
-                
-                # 방향 텍스트 (위치 약간 조정)
-                cv2.putText(analysis_map, direction, (dx, dy-20), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2) # 폰트 크기 살짝 키움
-            else:
-                 cv2.putText(analysis_map, "X", (dx, dy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1)
-
-            current_directions[i] = direction
-            cv2.circle(analysis_map, (dx, dy), 5, (0, 255, 255), -1)
-
-        # [E] 서버에 데이터 업데이트
-        server.update_data(is_fire, current_directions)
-
-        # 화면 출력
-        cv2.imshow("Smart Evacuation System", analysis_map)
-        
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        elif key == ord('c'):
-            # 벽 고정/해제 토글 로직
-            if not wall_locked:
-                wall_locked = True
-                locked_wall_mask = current_wall_mask.copy() if current_wall_mask is not None else None
-                print(">>> 벽 고정 완료! (LOCKED)")
-            else:
-                wall_locked = False
-                locked_wall_mask = None
-                print(">>> 벽 고정 해제. (UNLOCKED)")
+    try:
+        if PIPELINED:
+            run_pipelined(cam, detector, grid_map, navigator, server, wall_lock, preview,
+                          fire_tracker, lossless, scheduler)
+        else:
+            run_serial(cam, detector, grid_map, navigator, server, wall_lock, preview, fire_tracker, scheduler)
+    except KeyboardInterrupt:
+        print(">>> 종료합니다.")
 
     cam.release()
-    cv2.destroyAllWindows()
+    if not headless:
+        cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
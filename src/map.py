@@ -1,22 +1,84 @@
 import numpy as np
 import heapq
 import cv2
+from collections import deque
+
+from hpa import ClusterGraph
+from metrics import metrics
 
 class GridMap:
-    def __init__(self, width, height, grid_size=20):
+    def __init__(self, width, height, grid_size=20, path_mode="flow", diagonal=False):
+        """
+        :param path_mode: "flow" = 모든 탈출구에서 한 번에 거리장(flow field)을 만들어 조회,
+                          "hazard" = flow와 같되 칸 수 대신 불/연기/벽 근접 위험을 더한 비용을 최소화,
+                          "hpa" = 클러스터 추상 그래프 (hpa.py). 촘촘한 그리드/여러 층 지도용, 근사 최단 경로
+                          "astar" = 기존 방식 (도트 x 탈출구 마다 A*)
+        :param diagonal: "astar" 모드에서 8방향 이동 허용 (octile 휴리스틱)
+        """
         self.width = width
         self.height = height
         self.grid_size = grid_size
         self.cols = width // grid_size
         self.rows = height // grid_size
+        self.path_mode = path_mode
+        self.diagonal = diagonal
+        self.last_expansions = 0  # 마지막 A* 탐색에서 확장한 노드 수
         
         # 0: 이동 가능, 1: 장애물(벽/불)
         self.grid = np.zeros((self.rows, self.cols), dtype=np.uint8)
         self.exits = []
 
+        # 거리장: 가장 가까운 탈출구까지의 칸 수 (-1: 도달 불가)
+        # next_hop: 탈출구 쪽으로 한 칸 다음 셀의 인덱스 (gy * cols + gx)
+        self.dist_field = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        self.next_hop = np.full((self.rows, self.cols), -1, dtype=np.int32)
+
+        # 마지막으로 경로를 계산했을 때의 그리드/탈출구 상태 (변경 감지용)
+        self._synced_grid = None
+        self._synced_exits = None
+        self.dirty_cells = np.empty(0, dtype=np.intp)  # 직전 동기화에서 바뀐 셀 인덱스
+        self._path_cache = {}
+
+        # 셀 점유율(0~1): 마스크 픽셀이 이 비율을 넘게 차지하면 장애물 (0 = 한 픽셀이라도 있으면)
+        self.OCCUPANCY_THRESH = 0.0
+        self.occupancy = np.zeros((self.rows, self.cols), dtype=np.float32)
+        self._pool_shape = None
+
+        # 바뀐 셀이 전체의 이 비율을 넘으면 부분 복구 대신 전체 재계산
+        self.REBUILD_RATIO = 0.25
+
+        # 포털: 인접하지 않은 두 셀을 잇는 추가 간선 (계단/통로로 이어진 구역, zones.py).
+        # 셀 인덱스 -> [(상대 셀 인덱스, 비용(칸)), ...]. reset()으로 지워지지 않음
+        self.portals = {}
+        self._portal_version = 0
+        self._synced_portals = None
+
+        # "hpa" 모드: 클러스터 한 변의 칸 수 (바뀐 셀이 있는 클러스터만 다시 계산)
+        self.CLUSTER_SIZE = 10
+        # 경로 앞부분 이 칸 수까지만 셀 단위로 펼침 (나머지는 입구 지점만). None이면 전체
+        self.HPA_REFINE_CELLS = 30
+        self.hpa = None
+
+        # 사전 계산 비상 경로표 (contingency.ContingencyTable). 있으면 경로 단계가 탐색보다 먼저 조회
+        self.contingency = None
+
+        # === "hazard" 모드: 셀 이동 비용 = 1 + 위험 페널티 (장애물은 inf) ===
+        self.FIRE_PENALTY = 20.0    # 불 바로 옆 칸의 추가 비용 (거리에 따라 지수적으로 감소)
+        self.FIRE_FALLOFF = 3.0     # 불 페널티가 1/e로 줄어드는 거리 (칸)
+        self.WALL_PENALTY = 0.3     # 벽에 붙은 칸의 추가 비용 (복도 가운데로 유도)
+        self.WALL_FALLOFF = 1.0
+        self.SMOKE_SPREAD = 0       # 연기 추정 범위 (칸, 벽은 통과 못함). 0이면 사용 안 함
+        self.SMOKE_PENALTY = 5.0    # 불 바로 옆 연기 칸의 추가 비용 (범위 끝에서 0)
+        self.fire = np.zeros((self.rows, self.cols), dtype=np.uint8)   # 불 셀 (set_obstacle_rect(fire=True))
+        self.cost = np.ones((self.rows, self.cols), dtype=np.float32)  # 프레임당 한 번 계산, 모든 도트가 공유
+        self.cost_to_go = np.full((self.rows, self.cols), np.inf, dtype=np.float64)  # 탈출구까지 누적 비용
+        self._synced_fire = None
+
     def reset(self):
         """매 프레임 맵 상태 초기화"""
         self.grid.fill(0)
+        self.occupancy.fill(0)
+        self.fire.fill(0)
         self.exits.clear()
 
     def _to_grid(self, x, y):
@@ -31,31 +93,81 @@ class GridMap:
         cy = gy * self.grid_size + self.grid_size // 2
         return cx, cy
 
-    def update_obstacles_from_mask(self, mask):
+    def update_obstacles_from_mask(self, mask, threshold=None):
         """
         Detector에서 만든 벽/불 마스크(0 or 255)를 받아 그리드에 장애물로 등록
-        미래지향적: 픽셀 단위 마스크를 그리드 단위로 효율적으로 변환
+        셀마다 마스크 픽셀이 차지하는 비율(occupancy)을 적분 영상으로 한 번에 구하고,
+        비율이 threshold(기본 OCCUPANCY_THRESH)를 넘는 셀을 장애물(1)로 설정합니다.
+        (INTER_NEAREST 축소처럼 얇은 벽이 사라지지 않고, grid_size로 나누어떨어지지 않아도 됨)
+        :return: 셀별 점유율 (rows x cols, float32, 0~1)
         """
-        # 마스크를 그리드 크기로 축소 (Nearest Neighbor or Max Pooling 개념)
-        # 단순히 resize하면 중간에 있는 얇은 벽이 사라질 수 있으므로 주의.
-        # 여기서는 안전하게 픽셀 체크 방식으로 구현 (성능 최적화 가능)
-        
-        # 리사이즈로 대략적인 그리드 맵 생성 (cv2.INTER_AREA or MAX)
-        small_mask = cv2.resize(mask, (self.cols, self.rows), interpolation=cv2.INTER_NEAREST)
-        
-        # 마스크가 있는 곳(>0)은 장애물(1)로 설정
-        self.grid[small_mask > 0] = 1
+        if threshold is None:
+            threshold = self.OCCUPANCY_THRESH
+
+        with metrics.time("grid_mask"):
+            ratio = self.mask_occupancy(mask)
+        np.maximum(self.occupancy, ratio, out=self.occupancy)
+
+        # 마스크가 충분히 차 있는 셀은 장애물(1)로 설정
+        self.grid[ratio > threshold] = 1
+        return ratio
+
+    def mask_occupancy(self, mask):
+        """픽셀 마스크 -> 셀별 점유율. 마스크 크기가 맵과 달라도 비율에 맞춰 셀 경계를 잡습니다."""
+        mh, mw = mask.shape[:2]
+        if self._pool_shape != (mh, mw):
+            # 셀 경계 (마지막 셀은 나머지 픽셀까지 포함, _to_grid의 clamp와 동일)
+            xs = np.arange(self.cols + 1) * self.grid_size
+            ys = np.arange(self.rows + 1) * self.grid_size
+            xs[-1], ys[-1] = self.width, self.height
+            xs = np.round(xs * (mw / self.width)).astype(np.intp)
+            ys = np.round(ys * (mh / self.height)).astype(np.intp)
+            area = np.outer(np.diff(ys), np.diff(xs)).astype(np.float32)
+            self._pool_edges = (ys, xs)
+            self._pool_scale = (1.0 / (255.0 * np.maximum(area, 1))).astype(np.float32)
+            self._pool_shape = (mh, mw)
 
-    def set_obstacle_rect(self, x, y, w, h):
-        """사각형 영역 장애물 설정 (불 등)"""
+        ys, xs = self._pool_edges
+        integral = cv2.integral(mask, sdepth=cv2.CV_32S)
+        corners = integral[ys[:, None], xs[None, :]]
+        sums = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+        return np.multiply(sums, self._pool_scale, dtype=np.float32)
+
+    def set_obstacle_rect(self, x, y, w, h, fire=False):
+        """
+        사각형 영역 장애물 설정 (불 등)
+        :param fire: True면 불 셀로도 표시 ("hazard" 모드에서 주변 칸 비용이 올라감)
+        """
         gx1, gy1 = self._to_grid(x, y)
         gx2, gy2 = self._to_grid(x + w, y + h)
         self.grid[gy1:gy2+1, gx1:gx2+1] = 1
+        if fire:
+            self.fire[gy1:gy2+1, gx1:gx2+1] = 1
 
     def add_exit(self, x, y, w, h):
         cx, cy = x + w/2, y + h/2
         self.exits.append(self._to_grid(cx, cy))
 
+    def add_portal(self, x1, y1, x2, y2, cost=1):
+        """
+        두 픽셀 좌표의 셀을 양방향으로 잇는 포털 추가 (flow/hazard 모드에서만 사용).
+        :param cost: 포털 통과 비용 (칸 단위, "hazard" 모드). "flow" 모드에서는 항상 한 칸
+        """
+        gx1, gy1 = self._to_grid(x1, y1)
+        gx2, gy2 = self._to_grid(x2, y2)
+        a, b = gy1 * self.cols + gx1, gy2 * self.cols + gx2
+        self.portals.setdefault(a, []).append((b, cost))
+        self.portals.setdefault(b, []).append((a, cost))
+        self._portal_version += 1
+
+    def contingency_routes(self):
+        """비상 경로표에 지금 그리드와 같은 경우가 있으면 도트별 [(방향, 목표점), ...], 없으면 None"""
+        if self.contingency is None or not self.contingency.ready:
+            return None
+        routes = self.contingency.lookup(self)
+        metrics.inc("contingency", result="miss" if routes is None else "hit")
+        return routes
+
     def get_shortest_path(self, start_x, start_y):
         if not self.exits: return []
         
@@ -64,55 +176,472 @@ class GridMap:
         if self.grid[start_node[1], start_node[0]] == 1:
             return []
 
-        shortest_path = []
-        min_len = float('inf')
+        # 장면이 그대로면 캐시된 경로를 그대로 반환 (반환된 리스트는 수정하지 말 것)
+        self.sync()
+        cached = self._path_cache.get(start_node)
+        if cached is not None:
+            metrics.inc("path_cache", result="hit")
+            return cached
+        metrics.inc("path_cache", result="miss")
 
-        for exit_pos in self.exits:
-            path = self._astar(start_node, exit_pos)
-            if path and len(path) < min_len:
-                min_len = len(path)
-                shortest_path = path
-        
+        if self.path_mode in ("flow", "hazard"):
+            shortest_path = self._path_from_field(start_node)
+        elif self.path_mode == "hpa":
+            shortest_path = [self._to_pixel(gx, gy) for gx, gy in self.hpa.find_path(start_node, self.HPA_REFINE_CELLS)]
+        else:
+            shortest_path = []
+            min_len = float('inf')
+
+            with metrics.time("path_search", mode=self.path_mode):
+                for exit_pos in self.exits:
+                    path = self._astar(start_node, exit_pos)
+                    metrics.inc("astar_expansions", self.last_expansions)
+                    if path and len(path) < min_len:
+                        min_len = len(path)
+                        shortest_path = path
+            metrics.gauge("astar_last_expansions", self.last_expansions)
+
+        self._path_cache[start_node] = shortest_path
         return shortest_path
 
+    def sync(self):
+        """
+        현재 그리드를 직전 계산 시점의 그리드와 비교해 바뀐 셀(dirty_cells)만 반영합니다.
+        - 변화 없음: 아무것도 하지 않음 (캐시된 경로 재사용)
+        - 일부 셀 변화: flow 모드에서는 거리장을 부분 복구, hpa 모드에서는 바뀐 클러스터만 재계산
+        - 탈출구 변화 / 대규모 변화: 전체 재계산
+        :return: 경로가 바뀌었을 수 있으면 True
+        """
+        exits = tuple(self.exits)
+        if (self._synced_grid is None or exits != self._synced_exits
+                or self._portal_version != self._synced_portals):
+            self.dirty_cells = np.arange(self.grid.size)
+            self._full_rebuild(exits)
+            return True
+
+        self.dirty_cells = np.flatnonzero(self.grid.reshape(-1) != self._synced_grid.reshape(-1))
+        if self.path_mode == "hazard":
+            # 불 위치가 바뀌면 넓은 범위의 비용이 함께 바뀌므로 비용장 + 거리장을 다시 계산
+            if len(self.dirty_cells) == 0 and np.array_equal(self.fire, self._synced_fire):
+                return False
+            self._full_rebuild(exits)
+            return True
+        if len(self.dirty_cells) == 0:
+            return False
+
+        if len(self.dirty_cells) > self.grid.size * self.REBUILD_RATIO:
+            self._full_rebuild(exits)
+            return True
+
+        if self.path_mode == "flow":
+            with metrics.time("flow_field", op="repair"):
+                self._repair_flow_field(self.dirty_cells)
+        elif self.path_mode == "hpa":
+            self.hpa.update(self.dirty_cells)
+        metrics.gauge("grid_dirty_cells", len(self.dirty_cells))
+        np.copyto(self._synced_grid, self.grid)
+        self._path_cache.clear()
+        return True
+
+    def _full_rebuild(self, exits):
+        if self.path_mode == "flow":
+            with metrics.time("flow_field", op="rebuild"):
+                self.build_flow_field()
+        elif self.path_mode == "hazard":
+            with metrics.time("flow_field", op="hazard"):
+                self.build_cost_field()
+                self.build_cost_flow_field()
+            self._synced_fire = self.fire.copy()
+        elif self.path_mode == "hpa":
+            self.hpa = ClusterGraph(self, self.CLUSTER_SIZE)
+            self.hpa.build()
+        self._synced_grid = self.grid.copy()
+        self._synced_exits = exits
+        self._synced_portals = self._portal_version
+        self._path_cache.clear()
+
+    def field_state(self):
+        """
+        마지막 sync() 때의 거리장과 그 기준(그리드/탈출구). calibration.py가 저장해 두었다가
+        restore_field()로 되돌리면 같은 장면의 첫 프레임에서 재계산하지 않습니다.
+        flow/hazard 모드만 (그 외는 None)
+        """
+        if self.path_mode not in ("flow", "hazard") or self._synced_grid is None:
+            return None
+        state = {
+            "path_mode": self.path_mode,
+            "grid": self._synced_grid.copy(),
+            "exits": np.array(self._synced_exits, dtype=np.int32).reshape(-1, 2),
+            "dist_field": self.dist_field.copy(),
+            "next_hop": self.next_hop.copy(),
+        }
+        if self.path_mode == "hazard":
+            state["fire"] = self._synced_fire.copy()
+            state["cost"] = self.cost.copy()
+            state["cost_to_go"] = self.cost_to_go.copy()
+        return state
+
+    def restore_field(self, state):
+        """field_state()로 저장한 거리장을 그대로 사용. 모드/크기가 다르거나 포털이 있으면 False"""
+        if (state is None or state["path_mode"] != self.path_mode or self.portals
+                or state["grid"].shape != self.grid.shape):
+            return False
+        np.copyto(self.dist_field, state["dist_field"])
+        np.copyto(self.next_hop, state["next_hop"])
+        if self.path_mode == "hazard":
+            np.copyto(self.cost, state["cost"])
+            np.copyto(self.cost_to_go, state["cost_to_go"])
+            self._synced_fire = np.array(state["fire"], dtype=np.uint8)
+        self._synced_grid = np.array(state["grid"], dtype=np.uint8)
+        self._synced_exits = tuple((int(gx), int(gy)) for gx, gy in state["exits"])
+        self._synced_portals = self._portal_version
+        self._path_cache.clear()
+        return True
+
+    def build_flow_field(self):
+        """
+        모든 탈출구를 동시에 출발점으로 하는 역방향 BFS 한 번으로
+        전체 셀의 거리(dist_field)와 다음 칸(next_hop)을 채웁니다.
+        이후 도트 개수와 상관없이 경로 조회는 경로 길이만큼의 비용만 듭니다.
+        """
+        cols, rows = self.cols, self.rows
+        self.dist_field.fill(-1)
+        self.next_hop.fill(-1)
+
+        # 원소 단위 접근은 numpy 인덱싱보다 memoryview가 훨씬 빠름
+        blocked = memoryview(self.grid.reshape(-1))
+        dist = memoryview(self.dist_field.reshape(-1))
+        hop = memoryview(self.next_hop.reshape(-1))
+        portals = self.portals
+
+        queue = deque()
+        for gx, gy in self.exits:
+            idx = gy * cols + gx
+            if blocked[idx] or dist[idx] == 0:
+                continue
+            dist[idx] = 0
+            queue.append(idx)
+
+        while queue:
+            cur = queue.popleft()
+            nd = dist[cur] + 1
+            cx = cur % cols
+            # (-1,0), (1,0), (0,-1), (0,1) 순서는 _astar와 동일
+            if cx > 0:
+                n = cur - 1
+                if not blocked[n] and dist[n] < 0:
+                    dist[n] = nd; hop[n] = cur; queue.append(n)
+            if cx < cols - 1:
+                n = cur + 1
+                if not blocked[n] and dist[n] < 0:
+                    dist[n] = nd; hop[n] = cur; queue.append(n)
+            if cur >= cols:
+                n = cur - cols
+                if not blocked[n] and dist[n] < 0:
+                    dist[n] = nd; hop[n] = cur; queue.append(n)
+            if cur < (rows - 1) * cols:
+                n = cur + cols
+                if not blocked[n] and dist[n] < 0:
+                    dist[n] = nd; hop[n] = cur; queue.append(n)
+            if portals and cur in portals:
+                for n, _ in portals[cur]:
+                    if not blocked[n] and dist[n] < 0:
+                        dist[n] = nd; hop[n] = cur; queue.append(n)
+
+    def estimate_smoke(self):
+        """
+        불에서 열린 칸을 따라 SMOKE_SPREAD칸까지 번지는 연기 농도 추정 (불 옆 1 -> 범위 끝 0).
+        벽으로 막힌 방에는 넘어가지 않도록 한 칸씩 팽창시키며 빈 칸으로 제한합니다.
+        """
+        level = np.zeros((self.rows, self.cols), dtype=np.float32)
+        if self.SMOKE_SPREAD <= 0 or not self.fire.any():
+            return level
+        passable = ((self.grid == 0) | (self.fire == 1)).astype(np.uint8)
+        front = self.fire.copy()
+        kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+        for i in range(self.SMOKE_SPREAD):
+            front = cv2.dilate(front, kernel) & passable
+            np.maximum(level, front * np.float32(1.0 - i / self.SMOKE_SPREAD), out=level)
+        return level
+
+    def build_cost_field(self):
+        """
+        셀 이동 비용을 한 번에(벡터 연산) 계산합니다: 1 + 불 근접 + 벽 근접 (+ 연기).
+        불/벽까지의 거리는 cv2.distanceTransform으로 구하고, 장애물 칸은 inf.
+        """
+        cost = self.cost
+        cost.fill(1.0)
+        if self.fire.any():
+            d = cv2.distanceTransform((self.fire == 0).astype(np.uint8), cv2.DIST_L2, 3)
+            cost += self.FIRE_PENALTY * np.exp(-(d - 1.0) / self.FIRE_FALLOFF)
+        walls = (self.grid == 1) & (self.fire == 0)
+        if self.WALL_PENALTY > 0 and walls.any():
+            d = cv2.distanceTransform((~walls).astype(np.uint8), cv2.DIST_L2, 3)
+            cost += self.WALL_PENALTY * np.exp(-(d - 1.0) / self.WALL_FALLOFF)
+        if self.SMOKE_SPREAD > 0:
+            cost += self.SMOKE_PENALTY * self.estimate_smoke()
+        cost[self.grid == 1] = np.inf
+        return cost
+
+    def build_cost_flow_field(self):
+        """
+        모든 탈출구에서 시작하는 Dijkstra 한 번으로 누적 위험 비용(cost_to_go)과 next_hop을 채웁니다.
+        한 칸 이동 비용은 두 칸 비용의 평균. dist_field에는 누적 비용을 올림한 값(-1: 도달 불가)을 둡니다.
+        """
+        cols, rows = self.cols, self.rows
+        self.cost_to_go.fill(np.inf)
+        self.next_hop.fill(-1)
+
+        blocked = memoryview(self.grid.reshape(-1))
+        cost = self.cost.reshape(-1).tolist()
+        dist = memoryview(self.cost_to_go.reshape(-1))
+        hop = memoryview(self.next_hop.reshape(-1))
+        portals = self.portals
+
+        open_set = []
+        for gx, gy in self.exits:
+            idx = gy * cols + gx
+            if blocked[idx] or dist[idx] == 0:
+                continue
+            dist[idx] = 0.0
+            open_set.append((0.0, idx))
+        heapq.heapify(open_set)
+        push, pop = heapq.heappush, heapq.heappop
+        last_row = (rows - 1) * cols
+
+        while open_set:
+            d, cur = pop(open_set)
+            if d > dist[cur]:
+                continue
+            half = cost[cur] * 0.5
+            cx = cur % cols
+            if cx > 0:
+                n = cur - 1
+                if not blocked[n]:
+                    nd = d + half + cost[n] * 0.5
+                    if nd < dist[n]:
+                        dist[n] = nd; hop[n] = cur; push(open_set, (nd, n))
+            if cx < cols - 1:
+                n = cur + 1
+                if not blocked[n]:
+                    nd = d + half + cost[n] * 0.5
+                    if nd < dist[n]:
+                        dist[n] = nd; hop[n] = cur; push(open_set, (nd, n))
+            if cur >= cols:
+                n = cur - cols
+                if not blocked[n]:
+                    nd = d + half + cost[n] * 0.5
+                    if nd < dist[n]:
+                        dist[n] = nd; hop[n] = cur; push(open_set, (nd, n))
+            if cur < last_row:
+                n = cur + cols
+                if not blocked[n]:
+                    nd = d + half + cost[n] * 0.5
+                    if nd < dist[n]:
+                        dist[n] = nd; hop[n] = cur; push(open_set, (nd, n))
+            if portals and cur in portals:
+                for n, length in portals[cur]:
+                    if not blocked[n]:
+                        nd = d + (half + cost[n] * 0.5) * length
+                        if nd < dist[n]:
+                            dist[n] = nd; hop[n] = cur; push(open_set, (nd, n))
+
+        reachable = np.isfinite(self.cost_to_go)
+        self.dist_field.fill(-1)
+        self.dist_field[reachable] = np.ceil(self.cost_to_go[reachable])
+
+    def _neighbors(self, idx):
+        cols = self.cols
+        cx = idx % cols
+        if cx > 0: yield idx - 1
+        if cx < cols - 1: yield idx + 1
+        if idx >= cols: yield idx - cols
+        if idx < (self.rows - 1) * cols: yield idx + cols
+        links = self.portals.get(idx)
+        if links:
+            for n, _ in links: yield n
+
+    def _repair_flow_field(self, changed):
+        """
+        LPA*/D* Lite 방식의 부분 복구 (단위 비용, 탈출구 다수).
+        1) 새로 막힌 셀을 거쳐 가던 셀들(next_hop 트리의 하위)을 무효화
+        2) 무효화된 셀과 새로 뚫린 셀을 경계의 유효한 거리에서 다시 채우고,
+           거리가 줄어드는 곳만 전파
+        """
+        blocked = memoryview(self.grid.reshape(-1))
+        dist = memoryview(self.dist_field.reshape(-1))
+        hop = memoryview(self.next_hop.reshape(-1))
+        cols = self.cols
+        exit_ids = {gy * cols + gx for gx, gy in self.exits}
+
+        # 1) 무효화 (raise)
+        invalid = []
+        stack = []
+        for idx in changed.tolist():
+            if blocked[idx] and dist[idx] >= 0:
+                dist[idx] = -1
+                hop[idx] = -1
+                stack.append(idx)
+        while stack:
+            u = stack.pop()
+            for n in self._neighbors(u):
+                if hop[n] == u:
+                    dist[n] = -1
+                    hop[n] = -1
+                    invalid.append(n)
+                    stack.append(n)
+
+        # 2) 재시드 (lower): 무효화된 셀 + 새로 뚫린 셀
+        open_set = []
+        seeds = invalid + [idx for idx in changed.tolist() if not blocked[idx]]
+        for idx in seeds:
+            if blocked[idx]:
+                continue
+            if idx in exit_ids:
+                dist[idx] = 0
+                hop[idx] = -1
+                heapq.heappush(open_set, (0, idx))
+                continue
+            best = -1
+            for n in self._neighbors(idx):
+                d = dist[n]
+                if d >= 0 and not blocked[n] and (best < 0 or d < dist[best]):
+                    best = n
+            if best >= 0 and (dist[idx] < 0 or dist[best] + 1 < dist[idx]):
+                dist[idx] = dist[best] + 1
+                hop[idx] = best
+                heapq.heappush(open_set, (dist[idx], idx))
+
+        while open_set:
+            d, u = heapq.heappop(open_set)
+            if d != dist[u]:
+                continue
+            nd = d + 1
+            for n in self._neighbors(u):
+                if not blocked[n] and (dist[n] < 0 or nd < dist[n]):
+                    dist[n] = nd
+                    hop[n] = u
+                    heapq.heappush(open_set, (nd, n))
+
+    def _path_from_field(self, start_node):
+        """거리장의 next_hop을 따라가며 경로(픽셀 좌표)를 만듭니다."""
+        cols = self.cols
+        idx = start_node[1] * cols + start_node[0]
+        if self.dist_field[start_node[1], start_node[0]] < 0:
+            return []
+
+        hop = self.next_hop.reshape(-1)
+        path = [start_node]
+        while True:
+            idx = int(hop[idx])
+            if idx < 0:
+                break
+            path.append((idx % cols, idx // cols))
+        return [self._to_pixel(gx, gy) for gx, gy in path]
+
     def _astar(self, start, end):
-        # (기존 A* 로직 유지)
+        """
+        배열 기반 A*.
+        노드는 정수 id(gy * cols + gx), g-score/부모는 평탄화된 int32 배열, 닫힌 집합은 비트맵.
+        비용은 직선 10 / 대각선 14 정수 (4방향일 때 기존 A*와 완전히 같은 경로를 반환).
+        self.diagonal=True면 8방향 + octile 휴리스틱 (벽 모서리를 가로지르는 대각선 이동은 금지)
+        """
         # 만약 끝점이 장애물이면 근처 가능한 곳으로 타협하는 로직 추가 가능
-        if self.grid[end[1], end[0]] == 1: return [] 
+        if self.grid[end[1], end[0]] == 1: return []
 
-        open_set = []
-        heapq.heappush(open_set, (0, start))
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: abs(start[0]-end[0]) + abs(start[1]-end[1])}
+        cols, rows = self.cols, self.rows
+        n = rows * cols
+        ex, ey = end
+        goal = ey * cols + ex
+        diagonal = self.diagonal
+
+        g_arr = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+        parent_arr = np.full(n, -1, dtype=np.int32)
+        # 원소 단위 접근은 memoryview로 (numpy 스칼라 인덱싱보다 훨씬 빠름)
+        g = memoryview(g_arr)
+        parent = memoryview(parent_arr)
+        blocked = memoryview(self.grid.reshape(-1))
+        closed = bytearray(n)
+
+        # 휴리스틱은 전체 셀에 대해 한 번에 벡터 연산으로 계산
+        dx_arr = np.abs(np.arange(cols, dtype=np.int32) - ex)
+        dy_arr = np.abs(np.arange(rows, dtype=np.int32) - ey)
+        if diagonal:
+            h_arr = 10 * (dy_arr[:, None] + dx_arr[None, :]) - 6 * np.minimum(dy_arr[:, None], dx_arr[None, :])
+        else:
+            h_arr = 10 * (dy_arr[:, None] + dx_arr[None, :])
+        h = memoryview(np.ascontiguousarray(h_arr, dtype=np.int32).reshape(-1))
+
+        # 동률일 때 기존 구현((f, (x, y)) 튜플 비교)과 같은 순서가 되도록 x * rows + y 로 정렬
+        sx, sy = start
+        s_id = sy * cols + sx
+        g[s_id] = 0
+        open_set = [(0, sx * rows + sy, s_id)]
+        push, pop = heapq.heappush, heapq.heappop
+        last_row = (rows - 1) * cols
+        expansions = 0
 
         while open_set:
-            current = heapq.heappop(open_set)[1]
-            if current == end:
-                return self._reconstruct(came_from, current)
-
-            for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]: # 4방향
-                nx, ny = current[0]+dx, current[1]+dy
-                if 0 <= nx < self.cols and 0 <= ny < self.rows:
-                    if self.grid[ny, nx] == 0: # 장애물 아님
-                        tentative_g = g_score[current] + 1
-                        if nx == end[0] and ny == end[1]: pass # 도착지
-                        
-                        if (nx, ny) not in g_score or tentative_g < g_score[(nx, ny)]:
-                            came_from[(nx, ny)] = current
-                            g_score[(nx, ny)] = tentative_g
-                            f_score[(nx, ny)] = tentative_g + abs(nx-end[0]) + abs(ny-end[1])
-                            heapq.heappush(open_set, (f_score[(nx, ny)], (nx, ny)))
+            cur = pop(open_set)[2]
+            if closed[cur]:
+                continue
+            if cur == goal:
+                self.last_expansions = expansions
+                return self._reconstruct_ids(parent, cur)
+            closed[cur] = 1
+            expansions += 1
+
+            cy, cx = divmod(cur, cols)
+            ng = g[cur] + 10
+
+            # 4방향 (기존과 같은 순서: 좌, 우, 상, 하)
+            if cx > 0:
+                nid = cur - 1
+                if not blocked[nid] and not closed[nid] and ng < g[nid]:
+                    parent[nid] = cur; g[nid] = ng
+                    push(open_set, (ng + h[nid], (cx - 1) * rows + cy, nid))
+            if cx < cols - 1:
+                nid = cur + 1
+                if not blocked[nid] and not closed[nid] and ng < g[nid]:
+                    parent[nid] = cur; g[nid] = ng
+                    push(open_set, (ng + h[nid], (cx + 1) * rows + cy, nid))
+            if cur >= cols:
+                nid = cur - cols
+                if not blocked[nid] and not closed[nid] and ng < g[nid]:
+                    parent[nid] = cur; g[nid] = ng
+                    push(open_set, (ng + h[nid], cx * rows + cy - 1, nid))
+            if cur < last_row:
+                nid = cur + cols
+                if not blocked[nid] and not closed[nid] and ng < g[nid]:
+                    parent[nid] = cur; g[nid] = ng
+                    push(open_set, (ng + h[nid], cx * rows + cy + 1, nid))
+
+            if diagonal:
+                dg = ng + 4  # 대각선 비용 14
+                for ddx, ddy in ((-1, -1), (1, -1), (-1, 1), (1, 1)):
+                    nx, ny = cx + ddx, cy + ddy
+                    if 0 <= nx < cols and 0 <= ny < rows:
+                        nid = ny * cols + nx
+                        # 양 옆 칸이 모두 비어 있어야 대각선 이동 가능 (벽 모서리 통과 금지)
+                        if (blocked[nid] or closed[nid]
+                                or blocked[cy * cols + nx] or blocked[ny * cols + cx]):
+                            continue
+                        if dg < g[nid]:
+                            parent[nid] = cur; g[nid] = dg
+                            push(open_set, (dg + h[nid], nx * rows + ny, nid))
+
+        self.last_expansions = expansions
         return []
 
-    def _reconstruct(self, came_from, current):
+    def _reconstruct_ids(self, parent, current):
+        cols = self.cols
         path = [current]
-        while current in came_from:
-            current = came_from[current]
+        while parent[current] >= 0:
+            current = parent[current]
             path.append(current)
         path.reverse()
-        return [self._to_pixel(gx, gy) for gx, gy in path]
-        
+        return [self._to_pixel(i % cols, i // cols) for i in path]
+
     def draw_grid(self, img):
         # 디버깅: 그리드 그리기 (장애물은 빨간색 채우기)
         for r in range(self.rows):
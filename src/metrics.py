@@ -0,0 +1,221 @@
+"""
+단계별 소요 시간 / 카운터 / 게이지 수집과 Prometheus 텍스트 출력.
+
+    from metrics import metrics
+    with metrics.time("stage", stage="detect"):
+        ...
+    metrics.inc("astar_expansions", n)
+
+모든 모듈이 같은 전역 metrics 객체를 쓰며, 기본은 꺼져 있습니다 (main에서 enable).
+꺼져 있으면 time()은 아무 일도 하지 않는 공용 객체를 돌려주고 inc/observe는 바로 반환하므로
+계측 코드를 그대로 두어도 비용이 거의 없습니다.
+"""
+import collections
+import threading
+import time
+
+PREFIX = "evac_"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """최근 window개 관측값으로 계산하는 분위수 + 누적 합계/개수"""
+    def __init__(self, window):
+        self.values = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs=QUANTILES):
+        values = sorted(self.values)
+        if not values:
+            return [(q, 0.0) for q in qs]
+        return [(q, values[min(len(values) - 1, int(q * len(values)))]) for q in qs]
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Metrics:
+    def __init__(self, enabled=False, window=1024):
+        """
+        :param window: 분위수/초당 빈도를 계산할 최근 관측 개수
+        """
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms = {}   # (이름, 라벨) -> Histogram (초 단위)
+        self._counters = {}     # (이름, 라벨) -> 누적값
+        self._gauges = {}       # (이름, 라벨) -> 현재값
+        self._gauge_fns = {}    # 이름 -> 수집 시 호출할 함수 (값 또는 {라벨값: 값})
+        self._ticks = {}        # 이름 -> 최근 발생 시각들 (초당 빈도 계산용)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def time(self, name, **labels):
+        """with 블록의 소요 시간을 name 히스토그램에 기록"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, _key(name, labels))
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self._observe(_key(name, labels), seconds)
+
+    def _observe(self, key, seconds):
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.window)
+            hist.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        if self.enabled:
+            self._gauges[_key(name, labels)] = value
+
+    def gauge_fn(self, name, fn, label=None):
+        """
+        수집(/metrics) 시점에 fn()을 호출해 값을 읽는 게이지.
+        fn이 dict를 반환하면 각 키를 label 라벨 값으로 한 여러 시계열이 됩니다 (예: 큐별 깊이).
+        """
+        self._gauge_fns[name] = (fn, label)
+
+    def tick(self, name):
+        """이벤트 한 번 발생 (예: 처리 완료 프레임). name_total 카운터 + 초당 빈도"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            ticks = self._ticks.get(name)
+            if ticks is None:
+                ticks = self._ticks[name] = collections.deque(maxlen=self.window)
+            ticks.append(now)
+            key = _key(name + "_total", {})
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def rate(self, name, horizon=5.0):
+        """최근 horizon초 동안의 초당 발생 빈도"""
+        with self._lock:
+            ticks = list(self._ticks.get(name, ()))
+        now = time.perf_counter()
+        recent = [t for t in ticks if now - t <= horizon]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(1e-9, recent[-1] - recent[0])
+
+    def summary(self):
+        """{히스토그램 이름(라벨): {p50, p95, p99, count}} (로그 출력용, 밀리초)"""
+        with self._lock:
+            items = [(k, h.quantiles(), h.count) for k, h in self._histograms.items()]
+        result = {}
+        for (name, labels), qs, count in items:
+            label = ",".join(v for _, v in labels)
+            key = f"{name}[{label}]" if label else name
+            result[key] = dict({f"p{int(q * 100)}": v * 1000 for q, v in qs}, count=count)
+        return result
+
+    def prometheus(self):
+        """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+        with self._lock:
+            histograms = [(k, h.quantiles(), h.total, h.count) for k, h in sorted(self._histograms.items())]
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            tick_names = sorted(self._ticks)
+
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), qs, total, count in histograms:
+            full = f"{PREFIX}{name}_seconds"
+            header(full, "summary")
+            for q, v in qs:
+                lines.append(f"{full}{_format_labels(labels, ('quantile', q))} {v:.6g}")
+            lines.append(f"{full}_sum{_format_labels(labels)} {total:.6g}")
+            lines.append(f"{full}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            # Prometheus 관례: 카운터 이름은 _total로 끝남
+            full = PREFIX + (name if name.endswith("_total") else name + "_total")
+            header(full, "counter")
+            lines.append(f"{full}{_format_labels(labels)} {value}")
+
+        for name in tick_names:
+            full = f"{PREFIX}{name}_per_second"
+            header(full, "gauge")
+            lines.append(f"{full} {self.rate(name):.3f}")
+
+        for (name, labels), value in gauges:
+            full = PREFIX + name
+            header(full, "gauge")
+            lines.append(f"{full}{_format_labels(labels)} {value}")
+
+        for name, (fn, label) in sorted(self._gauge_fns.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            full = PREFIX + name
+            header(full, "gauge")
+            if isinstance(value, dict):
+                for k, v in sorted(value.items()):
+                    lines.append(f"{full}{_format_labels([(label or 'name', k)])} {v}")
+            else:
+                lines.append(f"{full} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# 전역 수집기 (main에서 metrics.enable())
+metrics = Metrics()
@@ -4,6 +4,17 @@ class Navigator:
     def __init__(self):
         pass
 
+    def direction_along(self, current_pos, path, lookahead=5):
+        """
+        경로를 따라 lookahead칸 앞 지점을 기준으로 방향을 계산합니다.
+        path[1]은 너무 가까워서 방향이 불안정할 수 있으므로 몇 칸 앞(혹은 경로의 끝)을 봅니다.
+        :return: (방향, 화살표 목표 지점). 경로가 없으면 ("STOP", None)
+        """
+        if len(path) <= 1:
+            return "STOP", None
+        target_pos = path[min(lookahead, len(path) - 1)]
+        return self.get_direction(current_pos, target_pos), target_pos
+
     def get_direction(self, current_pos, next_pos):
         """
         현재 좌표(cx, cy)와 다음 목표 좌표(nx, ny)를 받아
@@ -0,0 +1,127 @@
+"""
+분석 화면 그리기 / 창 미리보기 / 디버그 스트림 (main.py, zones.py 공용).
+"""
+import time
+
+import cv2
+import numpy as np
+
+from config import DEBUG_STREAM, DEBUG_STREAM_FPS, DEBUG_STREAM_QUALITY, DEBUG_STREAM_SCALE, PREVIEW_FPS
+from metrics import metrics
+
+
+_SOLID_COLORS = {}
+
+
+def fill_mask(image, mask, color):
+    """mask가 0이 아닌 픽셀을 color로 칠함 (불리언 인덱싱 대신 단색 이미지를 cv2.copyTo)"""
+    key = (image.shape, color)
+    solid = _SOLID_COLORS.get(key)
+    if solid is None:
+        solid = _SOLID_COLORS[key] = np.full(image.shape, color, dtype=np.uint8)
+    cv2.copyTo(solid, mask, image)
+
+
+def draw_overlay(packet, exits=()):
+    """분석 결과를 프레임 위에 그립니다."""
+    analysis_map = packet.frame.copy()
+
+    if packet.wall_locked:
+        # 고정된 벽을 빨간색으로 표시
+        fill_mask(analysis_map, packet.wall_mask, (0, 0, 255))
+        cv2.putText(analysis_map, "[WALL LOCKED]", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+    else:
+        # 감지된 벽을 초록색으로 표시
+        if packet.wall_mask is not None:
+            fill_mask(analysis_map, packet.wall_mask, (0, 255, 0))
+        cv2.putText(analysis_map, "Searching Walls... Press 'c'", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+    # 이번 프레임 감지 결과(미확정 포함)는 얇은 주황색, 확정된 불은 빨간색
+    for (fx, fy, fw, fh) in packet.raw_fire_boxes:
+        cv2.rectangle(analysis_map, (fx, fy), (fx+fw, fy+fh), (0, 165, 255), 1)
+    for (fx, fy, fw, fh) in packet.fire_boxes:
+        cv2.rectangle(analysis_map, (fx, fy), (fx+fw, fy+fh), (0, 0, 255), 2)
+        cv2.putText(analysis_map, "FIRE", (fx, fy-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 2)
+
+    for ex, ey in exits:
+        cv2.circle(analysis_map, (ex, ey), 8, (255, 255, 255), -1)
+        cv2.putText(analysis_map, "EXIT", (ex-15, ey-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 1)
+
+    for i, (dx, dy), path, target_pos, direction in packet.routes:
+        # 도트 좌표 표시
+        cv2.putText(analysis_map, f"({dx},{dy})", (dx+10, dy),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+
+        if target_pos is not None:
+            # 경로 그리기
+            cv2.polylines(analysis_map, [np.array(path)], False, (255, 0, 0), 2)
+
+            # 화살표 그리기 (목표 지점 target_pos 사용)
+            cv2.arrowedLine(analysis_map, (dx, dy), target_pos, (0, 255, 255), 2)
+
+            # 방향 텍스트 (위치 약간 조정)
+            cv2.putText(analysis_map, direction, (dx, dy-20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        else:
+            cv2.putText(analysis_map, "X", (dx, dy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1)
+
+        cv2.circle(analysis_map, (dx, dy), 5, (0, 255, 255), -1)
+
+    return analysis_map
+
+
+class Preview:
+    """
+    창 미리보기 / 디버그 스트림 렌더링.
+    처리한 프레임마다 그리지 않고 각각 PREVIEW_FPS, DEBUG_STREAM_FPS 빈도로만 그리며,
+    창이 없고(headless) 스트림 시청자도 없으면 아무것도 그리지 않습니다.
+    """
+    def __init__(self, server, window=True, render=draw_overlay):
+        """
+        :param render: packet -> 화면 이미지 (main은 탈출구를 넘긴 draw_overlay, zones.py는 구역 화면을 이어 붙이는 함수)
+        """
+        self.server = server
+        self.window = window
+        self.render = render
+        self._next_window = 0.0
+        self._next_stream = 0.0
+
+    def update(self, packet, wall_lock):
+        """새 결과 하나 반영. 'q'를 누르면 False."""
+        now = time.perf_counter()
+        due_window = self.window and now >= self._next_window
+        due_stream = DEBUG_STREAM and self.server.debug.active and now >= self._next_stream
+        if not (due_window or due_stream):
+            return True
+
+        with metrics.time("stage", stage="render"):
+            analysis_map = self.render(packet)
+
+        if due_stream:
+            self._next_stream = now + 1.0 / DEBUG_STREAM_FPS
+            small = cv2.resize(analysis_map, None, fx=DEBUG_STREAM_SCALE, fy=DEBUG_STREAM_SCALE,
+                               interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, DEBUG_STREAM_QUALITY])
+            if ok:
+                self.server.debug.publish(jpeg.tobytes())
+
+        if not due_window:
+            return True
+        self._next_window = now + (1.0 / PREVIEW_FPS if PREVIEW_FPS > 0 else 0.0)
+        cv2.imshow("Smart Evacuation System", analysis_map)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            return False
+        elif key == ord('c'):
+            # 벽 고정/해제 토글 로직
+            wall_lock.toggle(packet.wall_mask)
+        return True
+
+    def idle(self):
+        """새 결과가 없을 때: 창 이벤트만 처리. 'q'를 누르면 False."""
+        if not self.window:
+            return True
+        return (cv2.waitKey(1) & 0xFF) != ord('q')
@@ -0,0 +1,161 @@
+import queue
+import threading
+import traceback
+
+from metrics import metrics
+
+_STOP = object()  # 스트림 종료 신호 (다음 단계로 그대로 전달됨)
+
+
+class FramePacket:
+    """
+    파이프라인 단계 사이를 오가는 프레임 단위 데이터.
+    frame_id가 모든 단계를 그대로 통과하므로, 서버에 게시된 방향이
+    어느 프레임에서 나왔는지 추적할 수 있습니다.
+    """
+    def __init__(self, frame_id, timestamp, frame):
+        self.frame_id = frame_id
+        self.timestamp = timestamp  # 캡처 시각
+        self.frame = frame
+
+        # 감지 단계 결과
+        self.wall_mask = None
+        self.wall_locked = False
+        self.wall_version = 0      # 벽 마스크가 바뀔 때마다 오르는 번호 (스케줄러 사용 시)
+        self.fire_boxes = []       # 경로 계산에 쓰는 불 박스 (추적 사용 시 확정된 것만)
+        self.raw_fire_boxes = []   # 이번 프레임 감지 결과 그대로
+
+        # 경로 단계 결과: (도트 번호, 도트 좌표, 경로, 화살표 목표점, 방향)
+        self.routes = []
+        self.directions = {}
+
+
+class Stage:
+    """
+    하나의 작업 스레드. in_queue에서 꺼내 fn을 적용하고 out_queue로 넘깁니다.
+    in_queue가 없으면 소스 단계로, fn()이 None을 반환하면 스트림 종료로 봅니다.
+    """
+    def __init__(self, name, fn, out_queue, in_queue=None, drop_oldest=False):
+        self.name = name
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.drop_oldest = drop_oldest  # True면 뒤 단계가 밀려도 기다리지 않고 오래된 것을 버림
+        self.processed = 0
+        self.dropped = 0
+        self._stop_event = None
+        self.thread = threading.Thread(target=self._run, name=f"stage-{name}")
+        self.thread.daemon = True
+
+    def _get(self):
+        while not self._stop_event.is_set():
+            try:
+                return self.in_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _put(self, item):
+        if self.drop_oldest:
+            while True:
+                try:
+                    self.out_queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.out_queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+        # 뒤 단계가 느리면 여기서 대기 -> 처리량이 가장 느린 단계에 맞춰짐
+        while not self._stop_event.is_set():
+            try:
+                self.out_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                if self.in_queue is None:
+                    with metrics.time("stage", stage=self.name):
+                        item = self.fn()
+                    if item is None:
+                        break
+                else:
+                    item = self._get()
+                    if item is _STOP:
+                        break
+                    with metrics.time("stage", stage=self.name):
+                        item = self.fn(item)
+                    if item is None:
+                        continue
+                self.processed += 1
+                self._put(item)
+        except Exception:
+            print(f"[ERROR] '{self.name}' 단계에서 오류 발생")
+            traceback.print_exc()
+        # 종료 신호는 버려지지 않도록 drop 없이 전달
+        self.drop_oldest = False
+        self._put(_STOP)
+
+
+class Pipeline:
+    """
+    캡처 -> 감지 -> 경로 -> 게시 ... 를 단계별 스레드로 나누어 실행합니다.
+    단계 사이는 크기가 제한된 큐로 연결되어 있어, 한 프레임의 지연은 각 단계의 합이지만
+    처리량은 가장 느린 단계 하나에 의해 결정됩니다.
+    마지막 단계의 출력은 get()으로 호출한 스레드(보통 화면 출력용 메인 스레드)가 받습니다.
+    """
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self.stages = []
+        self.finished = False  # 소스가 끝나서 종료 신호가 마지막까지 도착했는지
+        self._stop_event = threading.Event()
+
+    def _new_queue(self):
+        return queue.Queue(maxsize=self.queue_size)
+
+    def add_source(self, name, fn, drop_oldest=True):
+        """
+        캡처 단계: 큐가 차 있으면 오래된 프레임을 버리고 최신 프레임만 유지.
+        drop_oldest=False면 버리지 않고 기다림 (녹화본을 빠짐없이 처리할 때)
+        """
+        stage = Stage(name, fn, self._new_queue(), drop_oldest=drop_oldest)
+        self.stages.append(stage)
+        return stage
+
+    def add_stage(self, name, fn):
+        in_queue = self.stages[-1].out_queue
+        stage = Stage(name, fn, self._new_queue(), in_queue=in_queue)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage._stop_event = self._stop_event
+            stage.thread.start()
+
+    def get(self, timeout=None):
+        """마지막 단계의 결과를 하나 꺼냅니다. 시간 초과나 스트림 종료(finished) 시 None."""
+        try:
+            item = self.stages[-1].out_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is _STOP:
+            self.finished = True
+            return None
+        return item
+
+    def queue_depths(self):
+        return {stage.name: stage.out_queue.qsize() for stage in self.stages}
+
+    def dropped(self):
+        return {stage.name: stage.dropped for stage in self.stages}
+
+    def stop(self):
+        self._stop_event.set()
+        for stage in self.stages:
+            stage.thread.join(timeout=1.0)
@@ -0,0 +1,224 @@
+"""
+카메라 프레임 녹화 / 재생.
+
+녹화본은 폴더 하나에 저장됩니다.
+    frames.raw       모든 프레임의 원본 픽셀 (uint8, H x W x C를 이어 붙임. np.memmap으로 바로 읽음)
+    timestamps.f64   프레임별 캡처 시각 (little-endian float64, time.time())
+    meta.json        크기 / 채널 / 프레임 수 / 원본 소스
+frames.raw와 timestamps.f64는 프레임마다 덧붙이기만 하므로, 녹화 중 프로그램이 죽어도
+그때까지의 프레임은 그대로 재생할 수 있습니다.
+
+    python recorder.py record http://10.8.0.6:8080/?action=stream session1 --seconds 60
+    python recorder.py info session1
+    python recorder.py replay session1              # 녹화본으로 main 실행 (최대 속도)
+    python recorder.py replay session1 --realtime   # 녹화 당시 속도로 재생
+"""
+import argparse
+import json
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+FRAMES_FILE = "frames.raw"
+TIMESTAMPS_FILE = "timestamps.f64"
+META_FILE = "meta.json"
+
+
+def is_recording(path):
+    return isinstance(path, str) and os.path.isfile(os.path.join(path, META_FILE))
+
+
+class FrameRecorder:
+    """프레임을 받은 그대로 (압축 없이) 녹화 폴더에 덧붙여 저장"""
+    def __init__(self, path, source=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.source = source
+        self.shape = None
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+        self._frames = open(os.path.join(path, FRAMES_FILE), "wb")
+        self._times = open(os.path.join(path, TIMESTAMPS_FILE), "wb")
+        print(f"[INFO] 녹화 시작: {path}")
+
+    def write(self, frame, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.shape is None:
+            self.shape = frame.shape
+            self._write_meta()
+        elif frame.shape != self.shape:
+            # 스트림 해상도가 중간에 바뀌면 처음 크기에 맞춤 (프레임 크기가 고정이어야 memmap으로 읽을 수 있음)
+            frame = cv2.resize(frame, (self.shape[1], self.shape[0]))
+        self._frames.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+        self._times.write(struct.pack("<d", timestamp))
+        self.count += 1
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self.last_ts = timestamp
+
+    def _write_meta(self):
+        h, w = self.shape[:2]
+        meta = {
+            "width": w,
+            "height": h,
+            "channels": self.shape[2] if len(self.shape) > 2 else 1,
+            "dtype": "uint8",
+            "source": str(self.source) if self.source is not None else None,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "frames": self.count,
+            "duration": (self.last_ts - self.first_ts) if self.count > 1 else 0.0,
+        }
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def close(self):
+        if self._frames.closed:
+            return
+        self._frames.close()
+        self._times.close()
+        if self.shape is not None:
+            self._write_meta()
+        print(f"[INFO] 녹화 종료: {self.count} frames -> {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplaySource:
+    """
+    녹화본을 cv2.VideoCapture처럼 읽는 소스 (read / isOpened / get / release).
+    :param realtime: True면 녹화 당시 프레임 간격대로 기다렸다가 반환,
+                     False면 기다리지 않고 바로 다음 프레임 (오프라인 처리/회귀 테스트용)
+    """
+    def __init__(self, path, realtime=False, speed=1.0, loop=False):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+
+        h, w, c = self.meta["height"], self.meta["width"], self.meta["channels"]
+        shape = (h, w, c) if c > 1 else (h, w)
+        frame_bytes = h * w * c
+        raw_path = os.path.join(path, FRAMES_FILE)
+        # meta의 frames 대신 파일 크기로 세서, 녹화 도중 끊긴 파일도 온전한 프레임까지 재생
+        count = os.path.getsize(raw_path) // frame_bytes
+        self.timestamps = np.fromfile(os.path.join(path, TIMESTAMPS_FILE), dtype="<f8")
+        count = min(count, len(self.timestamps))
+        self.frames = np.memmap(raw_path, dtype=np.uint8, mode="r", shape=(count,) + shape) if count else None
+        self.count = count
+
+        self.pos = 0
+        self.timestamp = None  # 마지막으로 반환한 프레임의 녹화 시각
+        self._start_wall = None
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def read(self):
+        if self.frames is None:
+            return False, None
+        if self.pos >= self.count:
+            if not self.loop:
+                return False, None
+            self.pos = 0
+            self._start_wall = None
+
+        ts = float(self.timestamps[self.pos])
+        if self.realtime:
+            if self._start_wall is None:
+                self._start_wall = time.perf_counter() - (ts - self.timestamps[0]) / self.speed
+            delay = self._start_wall + (ts - self.timestamps[0]) / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        # VideoCapture처럼 매번 새 버퍼를 돌려줌 (memmap은 읽기 전용)
+        frame = np.array(self.frames[self.pos])
+        self.timestamp = ts
+        self.pos += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.count)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.pos)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.meta["width"])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.meta["height"])
+        if prop == cv2.CAP_PROP_FPS:
+            if self.count < 2:
+                return 0.0
+            return (self.count - 1) / max(1e-6, self.timestamps[self.count - 1] - self.timestamps[0])
+        return 0.0
+
+    def release(self):
+        self.frames = None
+
+
+def record(source, path, seconds=None, show=False):
+    """source(카메라 인덱스/URL)에서 읽은 프레임을 녹화 (seconds가 없으면 'q' 또는 Ctrl+C까지)"""
+    from camera import Camera
+
+    cam = Camera(source)
+    start = time.time()
+    with FrameRecorder(path, source) as rec:
+        try:
+            while seconds is None or time.time() - start < seconds:
+                ret, frame = cam.get_frame()
+                if not ret:
+                    print("[WARN] 프레임을 읽지 못해 녹화를 멈춥니다.")
+                    break
+                rec.write(frame, cam.frame_timestamp)
+                if show:
+                    cv2.imshow("Recording", frame)
+                    if (cv2.waitKey(1) & 0xFF) == ord('q'):
+                        break
+        except KeyboardInterrupt:
+            pass
+    cam.release()
+    if show:
+        cv2.destroyAllWindows()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카메라 녹화 / 재생")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="카메라/스트림을 녹화")
+    p.add_argument("source", help="카메라 인덱스 또는 스트림 URL")
+    p.add_argument("path", help="녹화 폴더")
+    p.add_argument("--seconds", type=float)
+    p.add_argument("--show", action="store_true", help="녹화 중 화면 표시")
+
+    p = sub.add_parser("info", help="녹화본 정보 출력")
+    p.add_argument("path")
+
+    p = sub.add_parser("replay", help="녹화본으로 main 실행")
+    p.add_argument("path")
+    p.add_argument("--realtime", action="store_true", help="녹화 당시 속도로 재생 (기본: 최대 속도)")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        source = int(args.source) if args.source.isdigit() else args.source
+        record(source, args.path, args.seconds, args.show)
+    elif args.command == "info":
+        src = ReplaySource(args.path)
+        print(json.dumps(dict(src.meta, frames=src.count, fps=round(src.get(cv2.CAP_PROP_FPS), 2)), indent=2))
+    elif args.command == "replay":
+        import main as evac
+        evac.main(replay_path=args.path, replay_realtime=args.realtime)
+
+
+if __name__ == "__main__":
+    main()
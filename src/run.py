@@ -1,5 +1,4 @@
-from get_coords import main as coord_mode
-from main import main as evac_mode
+# 고른 모드의 모듈만 불러옴 (시작 시간 단축)
 
 if __name__ == "__main__":
     print("=== 모드 선택 ===")
@@ -9,8 +8,10 @@ if __name__ == "__main__":
     mode = input("모드를 선택하세요 (1/2): ").strip()
 
     if mode == "1":
+        from get_coords import main as coord_mode
         coord_mode()
     elif mode == "2":
+        from main import main as evac_mode
         evac_mode()
     else:
         print("잘못된 입력입니다.")
@@ -0,0 +1,139 @@
+"""
+장면 활동에 따라 처리 빈도를 바꾸는 스케줄러.
+
+조용할 때(idle)는 비싼 처리(벽 갱신, 불 전체 검사, 경로 재계산)를 낮은 빈도로만 하고,
+불 후보가 보이거나 장면이 바뀌면 그 프레임부터 바로 최대 빈도(active)로 올립니다.
+마지막 활동 후 COOLDOWN초가 지나면 다시 idle로 내려갑니다.
+
+    admit(frame, ts)   : 이번 프레임을 처리할지 (캡처 직후, 셀 평균/픽셀 변화만 보는 가벼운 검사)
+    report(packet)     : 감지 결과에 불 후보가 있으면 active 유지
+    due(stage, ts)     : idle일 때 단계별 최소 간격(STAGE_INTERVALS)이 지났는지
+
+admit은 캡처 스레드, report/due는 감지/경로 스레드에서 부르므로 상태는 _lock으로 보호합니다.
+파이프라인에서는 어느 프레임을 고를지가 스레드 타이밍(불 후보 보고가 언제 도착하는지)에 따라 달라지므로
+파이프라인으로 최대 속도 재생(재현 모드)할 때는 main이 스케줄러를 쓰지 않습니다.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from detector import PixelChange
+from metrics import metrics
+
+
+class ActivityScheduler:
+    def __init__(self, grid_size=20, idle_fps=2, active_fps=0, cooldown=10.0, stage_intervals=None):
+        """
+        :param grid_size: 장면 변화 검사 셀 크기 (px)
+        :param idle_fps / active_fps: 처리할 최대 프레임 수 (0이면 카메라 속도 그대로)
+        :param cooldown: 마지막 활동 후 idle로 돌아가기까지의 시간 (초)
+        :param stage_intervals: idle일 때 단계별 최소 간격 (초). 예: {"walls": 5.0, "plan": 5.0}
+        """
+        self.GRID_SIZE = grid_size
+        self.IDLE_FPS = idle_fps
+        self.ACTIVE_FPS = active_fps
+        self.COOLDOWN = cooldown
+        self.CHANGE_THRESH = 15      # 셀 평균 색이 직전 처리 프레임과 이만큼 다르면 '변화'
+        self.CHANGE_CELLS = 1        # 변화한 셀이 이 수 이상이면 장면 변화 (작은 불꽃 한 칸도 놓치지 않도록)
+        # 셀 평균에 묻히는 작은 불꽃은 픽셀 단위로 (Detector의 변화 감지와 같은 기준)
+        self._pixel_change = PixelChange(grid_size)
+        self.STAGE_INTERVALS = {"walls": 5.0, "plan": 5.0}
+        if stage_intervals is not None:
+            self.STAGE_INTERVALS.update(stage_intervals)
+
+        self.active = True           # 시작 직후에는 최대 빈도 (첫 벽/경로를 바로 얻도록)
+        self.cache = {}              # 건너뛴 단계가 대신 쓸 직전 결과
+        self._last_activity = None
+        self._last_admit = None
+        self._last_run = {}          # 단계 -> (마지막 실행 시각, 입력)
+        self._wall_mask = None       # 직전 벽 마스크 (붙잡아 두므로 is 비교로 바뀜을 알 수 있음)
+        self._wall_version = 0
+        self._lock = threading.Lock()
+        self._ref = None             # 마지막으로 처리한 프레임의 셀 평균
+        self._probe = None
+        self._diff = None
+
+    def _activate(self, ts, reason):
+        if not self.active:
+            print(f"[INFO] 처리 빈도: active ({reason})")
+        self.active = True
+        self._last_activity = ts
+        metrics.gauge("scheduler_active", 1)
+
+    def _scene_changed(self, frame):
+        h, w = frame.shape[:2]
+        size = (max(1, w // self.GRID_SIZE), max(1, h // self.GRID_SIZE))
+        if self._probe is None or self._probe.shape[1::-1] != size:
+            self._probe = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._diff = np.empty_like(self._probe)
+            self._ref = None
+        cv2.resize(frame, size, dst=self._probe, interpolation=cv2.INTER_AREA)
+        if self._ref is None:
+            return True
+        cv2.absdiff(self._probe, self._ref, dst=self._diff)
+        changed = self._diff.max(axis=2) > self.CHANGE_THRESH
+        pixels = self._pixel_change.changed_cells(frame)
+        if pixels is None:
+            return True
+        return np.count_nonzero(changed | pixels) >= self.CHANGE_CELLS
+
+    def admit(self, frame, ts):
+        """캡처한 프레임을 처리할지 결정. False면 감지/경로/게시를 모두 건너뜀"""
+        changed = self._scene_changed(frame)
+        with self._lock:
+            admitted = self._admit(changed, ts)
+        if admitted:
+            self._pixel_change.remember(frame)
+        return admitted
+
+    def _admit(self, changed, ts):
+        if changed:
+            self._activate(ts, "장면 변화")
+        elif self.active and ts - self._last_activity >= self.COOLDOWN:
+            self.active = False
+            metrics.gauge("scheduler_active", 0)
+            print("[INFO] 처리 빈도: idle")
+
+        fps = self.ACTIVE_FPS if self.active else self.IDLE_FPS
+        if not changed and fps and self._last_admit is not None and ts - self._last_admit < 1.0 / fps:
+            metrics.inc("scheduler_frames", result="skipped")
+            return False
+
+        # 변화 비교 기준은 처리한 프레임 (느린 변화도 처리 간격 동안 쌓이면 잡힘)
+        if self._ref is None:
+            self._ref = self._probe.copy()
+        else:
+            np.copyto(self._ref, self._probe)
+        self._last_admit = ts
+        metrics.inc("scheduler_frames", result="processed")
+        return True
+
+    def report(self, packet):
+        """감지 결과 전달. 불 후보(확정 전 포함, 한 프레임만 보인 것도)가 있으면 active로 올리고 유지"""
+        if packet.raw_fire_boxes or packet.fire_boxes:
+            with self._lock:
+                self._activate(packet.timestamp, "불 후보")
+
+    def wall_version(self, wall_mask):
+        """벽 마스크가 (다른 배열로) 바뀔 때마다 1씩 오르는 번호. 감지 단계에서 프레임 순서대로 호출"""
+        with self._lock:
+            if wall_mask is not self._wall_mask:
+                self._wall_mask = wall_mask
+                self._wall_version += 1
+            return self._wall_version
+
+    def due(self, stage, ts, inputs=None):
+        """
+        단계를 이번 프레임에 실행할지. active이거나, 입력이 바뀌었거나,
+        idle 간격(STAGE_INTERVALS)이 지났으면 True (실행한 것으로 기록)
+        """
+        interval = self.STAGE_INTERVALS.get(stage, 0)
+        with self._lock:
+            last = self._last_run.get(stage)
+            if (self.active or last is None or inputs != last[1] or not interval
+                    or ts - last[0] >= interval):
+                self._last_run[stage] = (ts, inputs)
+                return True
+        metrics.inc("scheduler_stage_skipped", stage=stage)
+        return False
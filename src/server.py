@@ -1,70 +1,458 @@
+import json
+import queue
 import threading
 import logging
-from flask import Flask, jsonify, request  # request 추가됨
-from flask_cors import CORS
+import time
+
+from metrics import metrics
+from state import AtomicCounter, PeopleLedger
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True).encode()
+
+
+class StatusSnapshot:
+    """
+    update 시점에 미리 직렬화해 둔 읽기 전용 상태.
+    요청 처리 스레드는 이 객체를 읽기만 하고, 갱신은 새 객체로 통째로 교체합니다.
+    """
+    def __init__(self, version, fire_detected, directions, people_count, frame_id,
+                 dot_versions, fire_version, doors=None):
+        self.version = version
+        self.fire_detected = fire_detected
+        self.directions = directions
+        self.people_count = people_count
+        self.frame_id = frame_id          # 이 방향들을 계산한 원본 프레임 번호 (추적용)
+        self.dot_versions = dot_versions  # 도트별로 응답 내용이 마지막으로 바뀐 버전
+        self.fire_version = fire_version  # 화재 여부가 마지막으로 바뀐 버전
+        self.doors = doors or {}          # 문(센서)별 IN/OUT 집계
+
+        self.status = {
+            "fire_detected": fire_detected,
+            "directions": directions,
+            "people_count": people_count,
+            "doors": self.doors,
+            "frame_id": frame_id,
+            "version": version,
+        }
+        self.body = _dumps(self.status)
+        self.etag = f'"{version}"'
+        self.direction_bodies = {
+            dot_id: _dumps({"id": dot_id, "direction": d, "fire": fire_detected})
+            for dot_id, d in directions.items()
+        }
+
+    def direction(self, dot_id):
+        """:return: (버전, 미리 직렬화된 응답). 모르는 도트는 STOP"""
+        body = self.direction_bodies.get(dot_id)
+        if body is None:
+            return self.fire_version, _dumps({"id": dot_id, "direction": "STOP", "fire": self.fire_detected})
+        return self.dot_versions[dot_id], body
+
+
+class Subscriber:
+    """
+    /events 스트림 구독자 하나. publish 쪽은 절대 기다리지 않도록 put_nowait만 사용하고,
+    큐가 가득 차면(느린 클라이언트) 쌓인 변경분을 버리고 RESYNC 표시 하나만 남깁니다.
+    RESYNC를 받은 쪽은 현재 전체 스냅샷을 다시 보내면 됩니다.
+    """
+    RESYNC = object()
+
+    def __init__(self, maxsize=32):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(self.RESYNC)
+
+    def get(self, timeout=None):
+        """다음 이벤트 (시간 초과면 None)"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class DebugStream:
+    """
+    /debug/stream (MJPEG) 용 최신 분석 화면 JPEG 한 장.
+    시청자(viewers)가 있을 때만 main이 렌더링/인코딩해서 publish 하므로, 아무도 안 보면 비용이 없습니다.
+    """
+    def __init__(self):
+        self.viewers = AtomicCounter(0, floor=0)
+        self._cond = threading.Condition()
+        self.jpeg = None
+        self.version = 0
+        self._listeners = ()  # publish 때 호출할 함수 (asyncio 백엔드 알림용)
+
+    @property
+    def active(self):
+        return self.viewers.value > 0
+
+    def publish(self, jpeg):
+        with self._cond:
+            self.jpeg = jpeg
+            self.version += 1
+            self._cond.notify_all()
+        for fn in self._listeners:
+            fn()
+
+    def add_listener(self, fn):
+        with self._cond:
+            self._listeners = self._listeners + (fn,)
+
+    def remove_listener(self, fn):
+        with self._cond:
+            self._listeners = tuple(f for f in self._listeners if f is not fn)
+
+    def wait(self, version, timeout=None):
+        """version보다 새 프레임이 올 때까지 대기 -> (버전, JPEG)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version, timeout)
+            return self.version, self.jpeg
+
+    @staticmethod
+    def part(jpeg):
+        """multipart/x-mixed-replace 한 조각"""
+        return (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+
+    def frames(self):
+        """Flask 응답 본문 생성기: 새 프레임이 올 때마다 한 조각씩"""
+        self.viewers.add(1)
+        try:
+            version = 0
+            while True:
+                new_version, jpeg = self.wait(version, timeout=5.0)
+                if new_version == version or jpeg is None:
+                    continue
+                version = new_version
+                yield self.part(jpeg)
+        finally:
+            self.viewers.add(-1)
+
+
+def sse_event(name, data):
+    """Server-Sent Events 형식 한 건 (bytes)"""
+    return b"event: " + name.encode() + b"\ndata: " + _dumps(data) + b"\n\n"
+
+
+def _is_int(value):
+    # JSON true/false는 파이썬에서 int의 하위 타입이므로 따로 제외
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _valid_sensor(sensor_id, boot):
+    return (sensor_id is None or isinstance(sensor_id, str)) and _is_int(boot)
+
 
 class EvacuationServer:
-    def __init__(self, port=5000):
+    def __init__(self, port=5000, backend="flask"):
+        """
+        :param backend: "flask" = Flask 개발 서버 (요청마다 스레드),
+                        "asyncio" = async_server.py의 단일 이벤트 루프 HTTP/1.1 서버
+                        (keep-alive, 많은 동시 접속, 미리 직렬화된 응답을 그대로 전송)
+        """
         self.port = port
+        self.backend = backend
+
+        # ?since= 롱폴링 최대 대기 시간 (초). 시간 안에 안 바뀌면 304
+        self.LONG_POLL_TIMEOUT = 25.0
+        # /events: 이 시간 동안 변경이 없으면 연결 유지용 주석 전송 (초)
+        self.STREAM_KEEPALIVE = 15.0
+        self.SUBSCRIBER_QUEUE_SIZE = 32
+
+        # 데이터 저장소: 내용이 바뀔 때만 버전이 올라가는 불변 스냅샷
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.snapshot = StatusSnapshot(0, False, {}, 0, None, {}, 0)
+        # 인원수: 여러 요청 스레드가 동시에 증감하므로 원자적 카운터로 따로 세고,
+        # 스냅샷에는 게시 시점의 값을 담음 (_lock은 스냅샷 교체에만 사용)
+        self.people = AtomicCounter(0, floor=0)
+        self.ledger = PeopleLedger()
+        # 분석 화면 디버그 스트림 (main이 시청자가 있을 때만 채움)
+        self.debug = DebugStream()
+        metrics.gauge_fn("sse_subscribers", lambda: len(self._subscribers))
+        metrics.gauge_fn("debug_stream_viewers", lambda: self.debug.viewers.value)
+        metrics.gauge_fn("status_version", lambda: self.snapshot.version)
+        self.LOG_PEOPLE_EVENTS = True
+        self._subscribers = ()  # 교체만 하는 튜플 (publish 중 순회해도 안전)
+
+        self.app = None
+        if backend == "flask":
+            self._create_flask_app()
+        elif backend != "asyncio":
+            raise ValueError(f"Unknown server backend ({backend})")
+
+        self.thread = threading.Thread(target=self._run_server)
+        self.thread.daemon = True
+
+    @property
+    def status_data(self):
+        return self.snapshot.status
+
+    def _publish(self, fire_detected, directions, people_count, frame_id, doors):
+        """내용이 바뀌었으면 새 스냅샷으로 교체하고 대기 중인 롱폴링을 깨움 (_lock 보유 상태로 호출)"""
+        cur = self.snapshot
+        if (fire_detected == cur.fire_detected and directions == cur.directions
+                and people_count == cur.people_count and doors == cur.doors):
+            return cur
+
+        version = cur.version + 1
+        fire_changed = fire_detected != cur.fire_detected
+        fire_version = version if fire_changed else cur.fire_version
+        dot_versions = {
+            dot_id: (version if fire_changed or cur.directions.get(dot_id) != d
+                     else cur.dot_versions[dot_id])
+            for dot_id, d in directions.items()
+        }
+        self.snapshot = StatusSnapshot(version, fire_detected, directions, people_count,
+                                       frame_id, dot_versions, fire_version, doors)
+        self._changed.notify_all()
+        if self._subscribers:
+            event = self._diff_event(cur, self.snapshot)
+            for sub in self._subscribers:
+                sub.push(event)
+        return self.snapshot
+
+    def _diff_event(self, old, new):
+        """두 스냅샷 사이에 바뀐 항목만 담은 이벤트. ts는 지연 측정용 게시 시각"""
+        event = {"version": new.version, "frame_id": new.frame_id, "ts": time.time()}
+        changed = {dot_id: d for dot_id, d in new.directions.items() if old.directions.get(dot_id) != d}
+        for dot_id in old.directions:
+            if dot_id not in new.directions:
+                changed[dot_id] = "STOP"
+        if changed:
+            event["directions"] = changed
+        if new.fire_detected != old.fire_detected:
+            event["fire_detected"] = new.fire_detected
+        if new.people_count != old.people_count:
+            event["people_count"] = new.people_count
+        doors = {k: v for k, v in new.doors.items() if old.doors.get(k) != v}
+        if doors:
+            event["doors"] = doors
+        return event
+
+    def subscribe(self, subscriber=None):
+        """변경 이벤트 구독. 반환된 구독자는 끝나면 unsubscribe 할 것"""
+        subscriber = subscriber or Subscriber(self.SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+
+    def snapshot_event(self):
+        snap = self.snapshot
+        return sse_event("snapshot", dict(snap.status, ts=time.time()))
+
+    def event_stream(self):
+        """
+        /events 본문 생성기: 처음에 전체 스냅샷, 이후에는 바뀐 도트만 담은 diff.
+        느려서 밀린 클라이언트는 diff 대신 전체 스냅샷을 다시 받습니다.
+        """
+        sub = self.subscribe()
+        try:
+            yield self.snapshot_event()
+            while True:
+                event = sub.get(timeout=self.STREAM_KEEPALIVE)
+                if event is None:
+                    yield b": keepalive\n\n"
+                elif event is Subscriber.RESYNC:
+                    yield self.snapshot_event()
+                else:
+                    yield sse_event("diff", event)
+        finally:
+            self.unsubscribe(sub)
+
+    def _wait_for(self, changed, since):
+        """since 이후 변경이 생길 때까지(최대 LONG_POLL_TIMEOUT) 기다린 뒤 스냅샷과 변경 여부 반환"""
+        with self._changed:
+            ok = self._changed.wait_for(lambda: changed(self.snapshot, since), self.LONG_POLL_TIMEOUT)
+            return self.snapshot, ok
+
+    def status_response(self, if_none_match=None, since=None):
+        """
+        /status 응답: (상태 코드, 본문, ETag)
+        - If-None-Match가 현재 ETag와 같으면 304
+        - since가 있으면 버전이 since보다 커질 때까지 대기 (롱폴링)
+        """
+        snap = self.snapshot
+        if since is not None and snap.version <= since:
+            snap, ok = self._wait_for(lambda s, v: s.version > v, since)
+            if not ok:
+                return 304, b"", snap.etag
+        if if_none_match == snap.etag:
+            return 304, b"", snap.etag
+        return 200, snap.body, snap.etag
+
+    def direction_response(self, dot_id, if_none_match=None, since=None):
+        """/direction/<id> 응답: 그 도트의 방향/화재 여부가 바뀔 때만 버전이 올라감"""
+        snap = self.snapshot
+        version, body = snap.direction(dot_id)
+        if since is not None and version <= since:
+            snap, ok = self._wait_for(lambda s, v: s.direction(dot_id)[0] > v, since)
+            version, body = snap.direction(dot_id)
+            if not ok:
+                return 304, b"", f'"{version}"'
+        etag = f'"{version}"'
+        if if_none_match == etag:
+            return 304, b"", etag
+        return 200, body, etag
+
+    def people_event(self, msg_type, sensor_id=None):
+        """인원수 이벤트 하나 ("IN" / "OUT") 반영 후 현재 인원수 반환 (재전송 중복 검사 없음)"""
+        if msg_type not in ("IN", "OUT"):
+            return self.people.value
+        sensor_id = None if sensor_id is None else str(sensor_id)
+        self.ledger.apply([(sensor_id, None, None, msg_type, None)])
+        if msg_type == "IN":
+            count = self.people.add(1)
+            if self.LOG_PEOPLE_EVENTS:
+                print(f"[People] Someone entered! Total: {count}")
+        else:
+            count = self.people.add(-1)
+            if self.LOG_PEOPLE_EVENTS:
+                print(f"[People] Someone left! Total: {count}")
+        self._publish_people()
+        return count
+
+    def people_batch(self, data):
+        """
+        /api/people_events: 센서가 모아 둔 이벤트를 한 번에 반영.
+        {"sensor_id": "door1", "boot": 1234, "events": [{"seq": 7, "type": "IN", "ts": 51234}, ...]}
+        이벤트마다 sensor_id/boot를 따로 줄 수도 있습니다. 이미 받은 (sensor_id, boot, seq)는 무시하므로
+        응답을 못 받은 센서는 같은 배치를 그대로 다시 보내면 됩니다.
+        :return: (상태 코드, 응답 dict)
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("events"), list):
+            return 400, {"error": "events required"}
+
+        sensor_id = data.get("sensor_id")
+        boot = data.get("boot", 0)
+        if not _valid_sensor(sensor_id, boot):
+            return 400, {"error": "sensor_id must be a string, boot an integer"}
+        events = []
+        rejected = 0
+        for ev in data["events"]:
+            if (not isinstance(ev, dict) or ev.get("type") not in ("IN", "OUT")
+                    or not _is_int(ev.get("seq"))):
+                rejected += 1
+                continue
+            sid, ev_boot = ev.get("sensor_id", sensor_id), ev.get("boot", boot)
+            # (sensor_id, boot)는 중복 검사 키이므로 잘못된 값은 묶음 전체를 거절
+            if not _valid_sensor(sid, ev_boot):
+                return 400, {"error": "sensor_id must be a string, boot an integer"}
+            events.append((sid, ev_boot, ev["seq"], ev["type"], ev.get("ts")))
+
+        accepted, duplicates = self.ledger.apply(events)
+        for msg_type in accepted:
+            self.people.add(1 if msg_type == "IN" else -1)
+        if accepted:
+            if self.LOG_PEOPLE_EVENTS:
+                ins = accepted.count("IN")
+                print(f"[People] +{ins} / -{len(accepted) - ins} (sensor {sensor_id}). Total: {self.people.value}")
+            self._publish_people()
+        return 200, {"accepted": len(accepted), "duplicates": duplicates, "rejected": rejected,
+                     "current_count": self.people.value}
+
+    def _publish_people(self):
+        # 동시에 들어온 이벤트끼리 순서가 바뀌어도 마지막 게시는 항상 최신 카운터 값
+        with self._lock:
+            cur = self.snapshot
+            self._publish(cur.fire_detected, cur.directions, self.people.value, cur.frame_id, self.ledger.doors)
+
+    def _create_flask_app(self):
+        # Flask는 이 백엔드를 쓸 때만 import (asyncio 백엔드/시작 시간 절약)
+        from flask import Flask, Response, jsonify, request
+        from flask_cors import CORS
+
         self.app = Flask(__name__)
         CORS(self.app)
-        
+
         log = logging.getLogger('werkzeug')
         log.setLevel(logging.ERROR)
-        
-        # 데이터 저장소
-        self.status_data = {
-            "fire_detected": False,
-            "directions": {},
-            "people_count": 0  # [추가] 현재 인원수
-        }
-        
-        self._setup_routes()
-        
-        self.thread = threading.Thread(target=self._run_server)
-        self.thread.daemon = True
 
-    def _setup_routes(self):
+        def make_response(code, body, etag):
+            resp = Response(body, status=code, mimetype='application/json')
+            resp.headers['ETag'] = etag
+            resp.headers['Cache-Control'] = 'no-cache'
+            return resp
+
         # 1. 상태 조회 (현황판/아두이노용)
         @self.app.route('/status')
         def get_status():
-            return jsonify(self.status_data)
+            return make_response(*self.status_response(
+                request.headers.get('If-None-Match'), request.args.get('since', type=int)))
 
         # 2. 특정 도트 방향 조회 (스마트 비상구용)
         @self.app.route('/direction/<int:dot_id>')
         def get_direction(dot_id):
-            direction = self.status_data["directions"].get(dot_id, "STOP")
-            return jsonify({
-                "id": dot_id, 
-                "direction": direction,
-                "fire": self.status_data["fire_detected"]
-            })
+            return make_response(*self.direction_response(
+                dot_id, request.headers.get('If-None-Match'), request.args.get('since', type=int)))
+
+        # 2-1. 변경 푸시 (Server-Sent Events): 현황판/표지판이 폴링 대신 구독
+        @self.app.route('/events')
+        def events():
+            resp = Response(self.event_stream(), mimetype='text/event-stream')
+            resp.headers['Cache-Control'] = 'no-cache'
+            resp.headers['X-Accel-Buffering'] = 'no'
+            return resp
 
         # 3. [추가] 인원수 업데이트 (아두이노가 보낸 데이터 받기)
         @self.app.route('/api/people_count', methods=['POST'])
         def update_people():
-            data = request.get_json()
-            if not data:
+            data = request.get_json(silent=True)
+            if not data or not isinstance(data, dict):
                 return "No Data", 400
-            
-            msg_type = data.get("type")
-            if msg_type == "IN":
-                self.status_data["people_count"] += 1
-                print(f"[People] Someone entered! Total: {self.status_data['people_count']}")
-            elif msg_type == "OUT":
-                if self.status_data["people_count"] > 0:
-                    self.status_data["people_count"] -= 1
-                print(f"[People] Someone left! Total: {self.status_data['people_count']}")
-                
-            return jsonify({"current_count": self.status_data["people_count"]})
+            count = self.people_event(data.get("type"), data.get("sensor_id"))
+            return jsonify({"current_count": count})
+
+        # 3-1. 인원수 이벤트 묶음 (센서가 모아서 한 번에 전송, 재전송 중복 제거)
+        @self.app.route('/api/people_events', methods=['POST'])
+        def people_events():
+            code, body = self.people_batch(request.get_json(silent=True))
+            return jsonify(body), code
+
+        # 4. 분석 화면 디버그 스트림 (MJPEG, 브라우저에서 바로 열람)
+        @self.app.route('/debug/stream')
+        def debug_stream():
+            resp = Response(self.debug.frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+            resp.headers['Cache-Control'] = 'no-cache'
+            return resp
+
+        # 5. 처리 시간/fps/큐 깊이 등 계측값 (Prometheus)
+        @self.app.route('/metrics')
+        def get_metrics():
+            return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
 
     def _run_server(self):
-        print(f">>> Web Server started on port {self.port}")
-        self.app.run(host='0.0.0.0', port=self.port, debug=False, use_reloader=False)
+        print(f">>> Web Server started on port {self.port} ({self.backend})")
+        if self.backend == "asyncio":
+            from async_server import AsyncHTTPServer
+            AsyncHTTPServer(self).serve_forever('0.0.0.0', self.port)
+        else:
+            self.app.run(host='0.0.0.0', port=self.port, debug=False, use_reloader=False, threaded=True)
 
     def start(self):
         self.thread.start()
 
-    def update_data(self, fire_detected, directions):
-        self.status_data["fire_detected"] = fire_detected
-        self.status_data["directions"] = directions
\ No newline at end of file
+    def update_data(self, fire_detected, directions, frame_id=None):
+        """
+        비전 루프에서 호출. 방향/화재 여부가 그대로면 아무것도 하지 않고,
+        바뀌었을 때만 새 스냅샷(버전 +1)을 만들어 교체합니다.
+        """
+        with self._lock:
+            self._publish(fire_detected, dict(directions), self.people.value, frame_id, self.snapshot.doors)
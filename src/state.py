@@ -0,0 +1,102 @@
+"""
+비전 루프와 서버 스레드가 함께 쓰는 상태용 동기화 도구.
+
+방향/화재 상태는 server.StatusSnapshot을 통째로 교체하는 방식(읽는 쪽은 잠금 없음)을 쓰고,
+여러 요청 스레드가 동시에 올리고 내리는 카운터는 여기의 AtomicCounter를 씁니다.
+"""
+import threading
+
+
+class AtomicCounter:
+    """
+    여러 스레드가 동시에 증감해도 빠지는 값이 없는 정수 카운터.
+    증감(읽기-수정-쓰기)만 짧게 잠그고, value 읽기는 잠금 없이 마지막으로 쓴 값을 봅니다.
+    """
+    def __init__(self, value=0, floor=None):
+        """
+        :param floor: 이 값 아래로는 내려가지 않음 (예: 인원수는 0)
+        """
+        self._lock = threading.Lock()
+        self._value = value
+        self.floor = floor
+
+    @property
+    def value(self):
+        return self._value
+
+    def add(self, delta=1):
+        """delta만큼 더하고 더한 뒤의 값을 반환"""
+        with self._lock:
+            value = self._value + delta
+            if self.floor is not None and value < self.floor:
+                value = self.floor
+            self._value = value
+            return value
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+
+class PeopleLedger:
+    """
+    문(센서)별 IN/OUT 집계와 재전송 중복 제거.
+    센서는 부팅마다 새 boot 값을 정하고 이벤트마다 seq를 1씩 올려 보냅니다.
+    (센서, boot)별로 최근 WINDOW개 seq를 기억해 같은 이벤트가 다시 오면 무시하고,
+    그보다 오래된 seq도 이미 반영된 재전송으로 보고 무시합니다.
+    재부팅 뒤에 이전 boot의 재전송이 늦게 와도 새 boot의 기록은 그대로 남고,
+    센서마다 최근 BOOTS개 boot까지만 기억합니다.
+    """
+    def __init__(self, window=256, boots=4):
+        self.WINDOW = window
+        self.BOOTS = boots
+        self._lock = threading.Lock()
+        self._seen = {}  # (sensor_id, boot) -> [최대 seq, 최근 seq 집합] (처음 본 순서)
+        # sensor_id -> {"in", "out", "net", "last_seq", "last_ts"}. 통째로 교체만 하므로 잠금 없이 읽어도 됨
+        self.doors = {}
+
+    def _accept(self, sensor_id, boot, seq):
+        state = self._seen.get((sensor_id, boot))
+        if state is None:
+            self._seen[(sensor_id, boot)] = [seq, {seq}]
+            # 이 센서의 가장 오래된 boot부터 잊음
+            boots = [key for key in self._seen if key[0] == sensor_id]
+            for key in boots[:-self.BOOTS]:
+                del self._seen[key]
+            return True
+        high, recent = state
+        if seq in recent or seq <= high - self.WINDOW:
+            return False
+        recent.add(seq)
+        if seq > high:
+            state[0] = seq
+            if len(recent) > 2 * self.WINDOW:
+                state[1] = {s for s in recent if s > seq - self.WINDOW}
+        return True
+
+    def apply(self, events):
+        """
+        :param events: [(sensor_id, boot, seq, "IN"/"OUT", ts), ...]. seq가 None이면 중복 검사 없이 반영
+        :return: (새로 반영된 이벤트 종류 리스트, 중복 개수)
+        """
+        accepted = []
+        duplicates = 0
+        with self._lock:
+            doors = dict(self.doors)
+            for sensor_id, boot, seq, msg_type, ts in sorted(events, key=lambda e: (e[2] is None, e[2] or 0)):
+                if seq is not None and not self._accept(sensor_id, boot, seq):
+                    duplicates += 1
+                    continue
+                accepted.append(msg_type)
+                if sensor_id is None:
+                    continue
+                door = dict(doors.get(sensor_id) or {"in": 0, "out": 0, "net": 0, "last_seq": None, "last_ts": None})
+                door["in" if msg_type == "IN" else "out"] += 1
+                door["net"] = door["in"] - door["out"]
+                if seq is not None:
+                    door["last_seq"] = seq
+                if ts is not None:
+                    door["last_ts"] = ts
+                doors[sensor_id] = door
+            self.doors = doors
+        return accepted, duplicates
@@ -0,0 +1,106 @@
+"""
+/events 스트림 테스트 클라이언트: 받은 변경 이벤트를 출력하고 게시(ts)~수신 지연을 측정합니다.
+
+    python stream_client.py --host 127.0.0.1 --port 5000       # 실행 중인 서버 구독
+    python stream_client.py --self-test                         # 로컬 서버를 띄워 지연 측정
+(ts는 서버 시계 기준이므로 지연 값은 같은 머신에서 잴 때 정확합니다)
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+
+
+def read_events(host, port, path="/events"):
+    """SSE 스트림에서 (이벤트 이름, 데이터 dict)를 하나씩 돌려주는 생성기"""
+    conn = http.client.HTTPConnection(host, port)
+    conn.request("GET", path, headers={"Accept": "text/event-stream"})
+    resp = conn.getresponse()
+    if resp.status != 200:
+        raise ValueError(f"Could not subscribe ({resp.status})")
+
+    name, data = None, []
+    while True:
+        line = resp.readline()
+        if not line:
+            return
+        line = line.decode().rstrip("\r\n")
+        if not line:
+            if data:
+                yield name or "message", json.loads("\n".join(data))
+            name, data = None, []
+        elif line.startswith(":"):
+            continue  # keepalive
+        elif line.startswith("event:"):
+            name = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def measure(host, port, count=None, verbose=True):
+    """이벤트를 count개 받을 때까지(없으면 계속) 지연(ms)을 모아 반환"""
+    latencies = []
+    for name, data in read_events(host, port):
+        latency = (time.time() - data["ts"]) * 1000
+        if name == "diff":
+            latencies.append(latency)
+        if verbose:
+            print(f"[{name}] v{data.get('version')} {latency:6.2f}ms "
+                  f"{ {k: v for k, v in data.items() if k not in ('ts', 'version')} }")
+        if count is not None and len(latencies) >= count:
+            break
+    return latencies
+
+
+def self_test(port, count, interval):
+    """로컬 서버를 띄우고 interval마다 방향을 바꿔 게시하면서 지연을 측정"""
+    from server import EvacuationServer
+
+    server = EvacuationServer(port=port)
+    server.start()
+    time.sleep(0.5)
+
+    def publisher():
+        rng = random.Random(0)
+        time.sleep(0.5)  # 구독이 먼저 붙도록
+        for _ in range(count + 5):
+            directions = {i: rng.choice(["UP", "DOWN", "LEFT", "RIGHT"]) for i in range(4)}
+            server.update_data(rng.random() < 0.5, directions)
+            time.sleep(interval)
+
+    threading.Thread(target=publisher, daemon=True).start()
+    latencies = measure("127.0.0.1", port, count, verbose=False)
+    print(f"=== {len(latencies)} events: p50 {percentile(latencies, 0.5):.2f}ms, "
+          f"p95 {percentile(latencies, 0.95):.2f}ms, max {max(latencies):.2f}ms ===")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/events 구독 및 지연 측정")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--count", type=int, help="이 개수만큼 받고 종료")
+    parser.add_argument("--self-test", action="store_true")
+    parser.add_argument("--interval", type=float, default=0.05, help="self-test 게시 간격 (초)")
+    args = parser.parse_args()
+
+    if args.self_test:
+        self_test(args.port, args.count or 100, args.interval)
+        return
+
+    try:
+        latencies = measure(args.host, args.port, args.count)
+    except KeyboardInterrupt:
+        latencies = []
+    if latencies:
+        print(f"=== p50 {percentile(latencies, 0.5):.2f}ms, p95 {percentile(latencies, 0.95):.2f}ms ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+class FireTrack:
+    __slots__ = ("id", "box", "stable_box", "hits", "misses", "confirmed")
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box            # 마지막으로 관측된 박스 (x, y, w, h)
+        self.stable_box = box     # 그리드에 보내는 박스 (확정 후에는 커지기만 함)
+        self.hits = 1
+        self.misses = 0
+        self.confirmed = False
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def union_box(a, b):
+    x1, y1 = min(a[0], b[0]), min(a[1], b[1])
+    x2, y2 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+class FireTracker:
+    """
+    프레임마다 나오는 불 박스를 프레임 사이에서 연결(IoU, 안 되면 중심 거리)하고
+    - CONFIRM_HITS 번 이상 보인 불만 확정 (한두 프레임 반짝이는 잡음 무시)
+    - 확정된 불은 EXPIRE_MISSES 프레임 연속 안 보여야 해제 (깜빡임에 경로가 흔들리지 않음)
+    - 확정 박스는 줄어들지 않고, 관측이 GROWTH_MARGIN 이상 벗어날 때만 넓힘 (불은 번지기만 한다고 가정)
+    update()가 돌려주는 확정 박스 목록은 실제로 바뀔 때만 달라지므로 GridMap의 재계산도 그때만 일어납니다.
+    """
+    def __init__(self):
+        self.IOU_MATCH = 0.1         # 이 이상 겹치면 같은 불
+        self.CENTROID_MATCH = 40     # 겹치지 않아도 중심이 이 거리(px) 안이면 같은 불
+        self.CONFIRM_HITS = 3        # 확정까지 필요한 관측 횟수
+        self.TENTATIVE_MISSES = 2    # 미확정 트랙은 이만큼 안 보이면 삭제
+        self.EXPIRE_MISSES = 15      # 확정 트랙은 이만큼 연속으로 안 보이면 해제
+        self.GROWTH_MARGIN = 6       # 확정 박스를 넓히는 최소 차이 (px)
+
+        self.tracks = []
+        self.changed = False         # 직전 update에서 확정 박스 목록이 바뀌었는지
+        self._next_id = 1
+        self._confirmed = []
+
+    def reset(self):
+        self.tracks = []
+        self._confirmed = []
+        self.changed = True
+
+    def _match(self, boxes):
+        """(트랙 번호, 박스 번호) 쌍 목록. IoU가 큰 쌍부터, 남은 것은 중심 거리로 연결"""
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for bi, box in enumerate(boxes):
+                score = iou(track.box, box)
+                if score >= self.IOU_MATCH:
+                    pairs.append((score, ti, bi))
+        pairs.sort(reverse=True)
+
+        matched_t, matched_b, matches = set(), set(), []
+        for _, ti, bi in pairs:
+            if ti not in matched_t and bi not in matched_b:
+                matched_t.add(ti)
+                matched_b.add(bi)
+                matches.append((ti, bi))
+
+        limit = self.CENTROID_MATCH ** 2
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            if ti in matched_t:
+                continue
+            tx, ty, tw, th = track.box
+            for bi, (x, y, w, h) in enumerate(boxes):
+                if bi in matched_b:
+                    continue
+                d2 = (tx + tw / 2 - x - w / 2) ** 2 + (ty + th / 2 - y - h / 2) ** 2
+                if d2 <= limit:
+                    pairs.append((d2, ti, bi))
+        pairs.sort()
+        for _, ti, bi in pairs:
+            if ti not in matched_t and bi not in matched_b:
+                matched_t.add(ti)
+                matched_b.add(bi)
+                matches.append((ti, bi))
+        return matches
+
+    def _grow(self, track, box):
+        """관측 박스가 확정 박스를 GROWTH_MARGIN 이상 벗어난 경우에만 합쳐서 넓힘"""
+        sx, sy, sw, sh = track.stable_box
+        x, y, w, h = box
+        m = self.GROWTH_MARGIN
+        if x < sx - m or y < sy - m or x + w > sx + sw + m or y + h > sy + sh + m:
+            track.stable_box = union_box(track.stable_box, box)
+
+    def update(self, boxes):
+        """
+        이번 프레임의 감지 박스를 반영하고 확정된 불 박스 목록을 반환합니다.
+        :param boxes: [(x, y, w, h), ...] (Detector 결과 그대로)
+        """
+        boxes = [tuple(int(v) for v in b) for b in boxes]
+        matches = self._match(boxes)
+        seen = set()
+        for ti, bi in matches:
+            track = self.tracks[ti]
+            box = boxes[bi]
+            seen.add(ti)
+            track.box = box
+            track.hits += 1
+            track.misses = 0
+            if track.confirmed:
+                self._grow(track, box)
+            else:
+                track.stable_box = union_box(track.stable_box, box)
+                if track.hits >= self.CONFIRM_HITS:
+                    track.confirmed = True
+
+        alive = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in seen:
+                track.misses += 1
+                limit = self.EXPIRE_MISSES if track.confirmed else self.TENTATIVE_MISSES
+                if track.misses > limit:
+                    continue
+            alive.append(track)
+
+        matched_b = {bi for _, bi in matches}
+        for bi, box in enumerate(boxes):
+            if bi not in matched_b:
+                alive.append(FireTrack(self._next_id, box))
+                self._next_id += 1
+        self.tracks = alive
+
+        confirmed = [t.stable_box for t in self.tracks if t.confirmed]
+        self.changed = confirmed != self._confirmed
+        self._confirmed = confirmed
+        return list(confirmed)
+
+    @property
+    def confirmed_boxes(self):
+        return list(self._confirmed)
@@ -0,0 +1,458 @@
+"""
+여러 카메라(층/구역) 동시 처리.
+
+구역(Zone)마다 감지 워커 프로세스를 하나씩 띄워 (카메라 읽기 + Detector + 불 추적 + 벽 마스크 풀링)
+CPU 코어를 나눠 쓰고, 메인 프로세스는 구역 그리드를 하나의 전역 GridMap에 이어 붙여
+포털(계단/통로)을 통해 구역을 넘나드는 경로를 계산한 뒤 서버 하나로 모든 도트에 방향을 게시합니다.
+
+    워커 -> 메인: 결과 큐 (구역 그리드 셀, 불 박스 등 작은 값만) + 공유 메모리 프레임 버퍼 (화면 출력용)
+
+전역 지도에서 구역은 가로로 한 칸씩 띄워 배치하므로, 구역 사이는 포털로만 이어집니다.
+도트 번호는 서버 /direction/<id> 의 id이므로 모든 구역에서 겹치지 않아야 합니다.
+
+    python zones.py
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from camera import Camera
+from recorder import is_recording
+from detector import Detector
+from map import GridMap
+from navigator import Navigator
+from tracker import FireTracker
+from server import EvacuationServer
+from pipeline import FramePacket
+from metrics import metrics
+from overlay import Preview, draw_overlay
+from config import (MAP_WIDTH, MAP_HEIGHT, GRID_SIZE, PATH_MODE, FIRE_CHANGE_GATING, FIRE_TRACKING,
+                    SERVER_BACKEND, DISPLAY_MODE, DEBUG_STREAM, METRICS)
+
+
+class Zone:
+    def __init__(self, name, source, dots=None, exits=(), width=MAP_WIDTH, height=MAP_HEIGHT):
+        """
+        :param source: Camera 소스 (스트림 URL, 카메라 인덱스, 녹화 폴더)
+        :param dots: {도트 번호: (x, y)} (구역 화면 좌표)
+        :param exits: [(x, y), ...] 이 구역의 탈출구 (없어도 됨, 포털로 다른 구역의 탈출구로 안내)
+        """
+        self.name = name
+        self.source = source
+        self.dots = dict(dots or {})
+        self.exits = list(exits)
+        self.width = width
+        self.height = height
+        self.origin = (0, 0)  # 전역 지도에서의 좌상단 (ZoneMap이 정함)
+
+
+class Portal:
+    """두 구역의 한 지점씩을 잇는 통로 (계단, 복도 연결부 등)"""
+    def __init__(self, zone_a, pos_a, zone_b, pos_b, cost=1):
+        """
+        :param cost: 통과 비용 (칸 단위, "hazard" 모드). 긴 계단은 크게
+        """
+        self.zone_a = zone_a
+        self.pos_a = pos_a
+        self.zone_b = zone_b
+        self.pos_b = pos_b
+        self.cost = cost
+
+
+# === 설정 ===
+ZONES = [
+    Zone("1F", "http://10.8.0.6:8080/?action=stream",
+         dots={0: (548, 55), 1: (288, 360)}, exits=[(28, 366), (290, 19)]),
+    Zone("2F", "http://10.8.0.7:8080/?action=stream",
+         dots={2: (286, 193), 3: (29, 195)}, exits=[]),
+]
+PORTALS = [
+    Portal("1F", (560, 361), "2F", (560, 361), cost=10),  # 동쪽 계단
+]
+
+# 결과 큐 크기 (모든 구역 공용). 구역별 공유 프레임 슬롯은 이보다 2개 많게
+# (큐에 들어 있는 것 + 메인이 꺼내 복사 중인 것 + 워커가 쓰고 있는 것)
+RESULT_QUEUE_SIZE = 4
+
+
+class SharedFrames:
+    """
+    구역 하나의 프레임 링 버퍼 (multiprocessing.shared_memory).
+    워커가 slot에 프레임을 쓰고 결과 메시지로 (slot, 번호)를 보내면 메인은 받자마자 복사해 둡니다.
+    결과 큐는 모든 구역이 함께 쓰므로 한 구역의 슬롯이 읽기 전에 덮일 수 있어,
+    슬롯마다 쓰기 번호를 두고 복사한 뒤 번호가 그대로인지 확인합니다.
+    """
+    def __init__(self, shape, slots, name=None):
+        frame_size = slots * int(np.prod(shape))
+        size = frame_size + slots * 8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            try:
+                # 워커 쪽: 해제는 메인이 하므로 resource tracker에 등록하지 않음 (3.13+)
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        # 슬롯별 마지막 쓰기 번호 (쓰는 중에는 0)
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=frame_size)
+        self._next = 0
+        self._seq = 0
+
+    def spec(self):
+        """워커 프로세스에 넘길 (이름, 크기, 슬롯 수)"""
+        return self.shm.name, self.shape, self.slots
+
+    def write(self, frame):
+        """프레임을 다음 슬롯에 쓰고 (slot, 번호) 반환"""
+        slot = self._next
+        self._seq += 1
+        self.seqs[slot] = 0
+        self.frames[slot] = frame
+        self.seqs[slot] = self._seq
+        self._next = (slot + 1) % self.slots
+        return slot, self._seq
+
+    def read(self, slot, seq):
+        """slot의 프레임 복사본. 그 사이 워커가 슬롯을 다시 썼으면(번호가 다르면) None"""
+        if self.seqs[slot] != seq:
+            return None
+        frame = self.frames[slot].copy()
+        if self.seqs[slot] != seq:
+            return None
+        return frame
+
+    def close(self):
+        self.frames = None
+        self.seqs = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def pool_walls(pool, wall_mask):
+    """이번 프레임의 벽 마스크만으로 구역 그리드를 다시 채움 (이전 프레임의 벽은 지움)"""
+    pool.reset()
+    pool.update_obstacles_from_mask(wall_mask)
+    return pool.grid
+
+
+def zone_worker(index, zone, grid_size, frames_spec, results, stop, wall_lock):
+    """
+    구역 하나의 감지 프로세스: 읽기 -> analyze -> 불 추적 -> 벽 마스크를 구역 그리드로 풀링.
+    메시지: ("zone", index, frame_id, timestamp, (slot, 번호), 셀 bytes, 확정 불 박스, 감지 불 박스)
+    끝나면 ("done", index)
+    """
+    frames = SharedFrames(frames_spec[1], frames_spec[2], name=frames_spec[0])
+    try:
+        try:
+            cam = Camera(zone.source, threaded=not is_recording(zone.source))
+        except Exception as e:
+            print(f"[ERROR] [{zone.name}] Camera Error: {e}")
+            return
+        detector = Detector()
+        if FIRE_CHANGE_GATING:
+            detector.enable_change_gating(grid_size)
+        tracker = FireTracker() if FIRE_TRACKING else None
+        pool = GridMap(zone.width, zone.height, grid_size)
+        locked_cells = None
+
+        while not stop.is_set():
+            ret, frame = cam.get_frame(timeout=0.5)
+            if not ret:
+                if cam.is_replay:
+                    break
+                continue
+            frame = cv2.resize(frame, (zone.width, zone.height))
+
+            # 벽 고정: 고정한 순간의 구역 그리드를 계속 사용 (벽 감지 생략)
+            if not wall_lock.is_set():
+                locked_cells = None
+            result = detector.analyze(frame, walls=locked_cells is None)
+            if locked_cells is None:
+                cells = pool_walls(pool, result.wall_mask)
+                if wall_lock.is_set():
+                    locked_cells = cells.copy()
+            else:
+                cells = locked_cells
+
+            raw_fire = [tuple(int(v) for v in b) for b in result.fire_boxes]
+            fire = tracker.update(raw_fire) if tracker is not None else raw_fire
+            slot = frames.write(frame)
+            msg = ("zone", index, cam.frame_id, cam.frame_timestamp, slot, cells.tobytes(), fire, raw_fire)
+            while not stop.is_set():
+                try:
+                    results.put(msg, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+        cam.release()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        frames.close()
+        results.put(("done", index))
+
+
+class ZoneMap:
+    """구역 그리드를 이어 붙인 전역 GridMap과 구역별 최신 감지 결과"""
+    def __init__(self, zones, portals, grid_size=GRID_SIZE, path_mode=PATH_MODE):
+        self.zones = zones
+        self.grid_size = grid_size
+        self.index = {zone.name: i for i, zone in enumerate(zones)}
+
+        ids = [dot_id for zone in zones for dot_id in zone.dots]
+        if len(ids) != len(set(ids)):
+            raise ValueError("도트 번호가 여러 구역에서 겹칩니다.")
+
+        # 가로로 한 칸씩 띄워 배치 (띄운 칸은 항상 장애물이라 구역끼리는 포털로만 연결)
+        x = 0
+        for zone in zones:
+            if zone.width % grid_size or zone.height % grid_size:
+                raise ValueError(f"[{zone.name}] 구역 크기는 grid_size의 배수여야 합니다.")
+            zone.origin = (x, 0)
+            x += zone.width + grid_size
+        width = x - grid_size
+        height = max(zone.height for zone in zones)
+        self.grid_map = GridMap(width, height, grid_size, path_mode=path_mode)
+
+        for portal in portals:
+            ax, ay = self.to_global(portal.zone_a, portal.pos_a)
+            bx, by = self.to_global(portal.zone_b, portal.pos_b)
+            self.grid_map.add_portal(ax, ay, bx, by, portal.cost)
+
+        n = len(zones)
+        self.frame_ids = [0] * n
+        self.timestamps = [None] * n
+        self.frames = [None] * n
+        self.cells = [None] * n
+        self.fire_boxes = [[] for _ in range(n)]
+        self.raw_fire_boxes = [[] for _ in range(n)]
+        self.routes = [[] for _ in range(n)]
+        self.directions = {}
+
+    def to_global(self, zone_name, pos):
+        ox, oy = self.zones[self.index[zone_name]].origin
+        return ox + pos[0], oy + pos[1]
+
+    def update(self, index, frame_id, timestamp, frame, cells, fire_boxes, raw_fire_boxes):
+        """:param frame: 공유 슬롯에서 복사한 프레임 (이미 덮여서 못 읽었으면 None -> 화면은 직전 프레임 유지)"""
+        zone = self.zones[index]
+        self.frame_ids[index] = frame_id
+        self.timestamps[index] = timestamp
+        if frame is not None:
+            self.frames[index] = frame
+        self.cells[index] = np.frombuffer(cells, dtype=np.uint8).reshape(
+            zone.height // self.grid_size, zone.width // self.grid_size)
+        self.fire_boxes[index] = fire_boxes
+        self.raw_fire_boxes[index] = raw_fire_boxes
+
+    def _build_grid(self):
+        grid_map = self.grid_map
+        grid_map.reset()
+        # 구역 밖(사이 칸)과 아직 결과가 없는 구역은 장애물
+        grid_map.grid.fill(1)
+        gs = self.grid_size
+        for i, zone in enumerate(self.zones):
+            cells = self.cells[i]
+            if cells is None:
+                continue
+            ox, oy = zone.origin
+            gx, gy = ox // gs, oy // gs
+            grid_map.grid[gy:gy + cells.shape[0], gx:gx + cells.shape[1]] = cells
+
+            for fx, fy, fw, fh in self.fire_boxes[i]:
+                # main.plan_stage와 같은 여유(20px)를 두되 구역 밖으로는 넘치지 않게
+                x1, y1 = max(0, fx - 20), max(0, fy - 20)
+                x2, y2 = min(zone.width - 1, fx + fw + 20), min(zone.height - 1, fy + fh + 20)
+                grid_map.set_obstacle_rect(ox + x1, oy + y1, x2 - x1, y2 - y1, fire=True)
+            for ex, ey in zone.exits:
+                grid_map.add_exit(ox + ex, oy + ey, 20, 20)
+
+    def _local_path(self, zone, path):
+        """전역 경로 중 이 구역 안에 있는 앞부분만 구역 좌표로 (포털을 건너면 거기서 끊음)"""
+        ox, oy = zone.origin
+        local = []
+        for x, y in path:
+            lx, ly = x - ox, y - oy
+            if not (0 <= lx < zone.width and 0 <= ly < zone.height):
+                break
+            local.append((lx, ly))
+        return local
+
+    def plan(self, navigator):
+        """전역 그리드를 다시 채우고 모든 구역의 도트 방향 계산 (모든 도트가 거리장 하나를 공유)"""
+        self._build_grid()
+        directions = {}
+        for i, zone in enumerate(self.zones):
+            ox, oy = zone.origin
+            routes = []
+            for dot_id, (dx, dy) in zone.dots.items():
+                if not (0 <= dx < zone.width and 0 <= dy < zone.height): continue
+                path = self._local_path(zone, self.grid_map.get_shortest_path(ox + dx, oy + dy))
+                direction, target_pos = navigator.direction_along((dx, dy), path)
+                routes.append((dot_id, (dx, dy), path, target_pos, direction))
+                directions[dot_id] = direction
+            self.routes[i] = routes
+        self.directions = directions
+        return directions
+
+    @property
+    def fire_detected(self):
+        return any(self.fire_boxes)
+
+
+class ZoneWallLock:
+    """'c' 키로 모든 구역 워커의 벽 고정을 함께 토글 (main.WallLock과 같은 역할)"""
+    def __init__(self, event):
+        self.event = event
+
+    def toggle(self, _current_wall_mask=None):
+        if not self.event.is_set():
+            self.event.set()
+            print(">>> 벽 고정 완료! (LOCKED)")
+        else:
+            self.event.clear()
+            print(">>> 벽 고정 해제. (UNLOCKED)")
+
+
+class ZoneView:
+    """Preview에 넘기는 한 시점의 구역 화면들"""
+    wall_mask = None
+
+    def __init__(self, zone_map, locked):
+        self.zone_map = zone_map
+        self.locked = locked
+
+
+def render_zones(view):
+    """구역마다 draw_overlay로 그리고 가로로 이어 붙임 (그리드 셀을 벽 마스크 대신 표시)"""
+    zone_map = view.zone_map
+    tiles = []
+    height = max(zone.height for zone in zone_map.zones)
+    for i, zone in enumerate(zone_map.zones):
+        frame = zone_map.frames[i]
+        if frame is None:
+            tiles.append(np.zeros((height, zone.width, 3), dtype=np.uint8))
+            continue
+        packet = FramePacket(zone_map.frame_ids[i], zone_map.timestamps[i], frame)
+        packet.wall_mask = cv2.resize(zone_map.cells[i], (zone.width, zone.height),
+                                      interpolation=cv2.INTER_NEAREST)
+        packet.wall_locked = view.locked
+        packet.fire_boxes = zone_map.fire_boxes[i]
+        packet.raw_fire_boxes = zone_map.raw_fire_boxes[i]
+        packet.routes = zone_map.routes[i]
+        tile = draw_overlay(packet, exits=zone.exits)
+        cv2.putText(tile, zone.name, (10, zone.height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        if tile.shape[0] < height:
+            tile = cv2.copyMakeBorder(tile, 0, height - tile.shape[0], 0, 0, cv2.BORDER_CONSTANT)
+        tiles.append(tile)
+    return np.hstack(tiles)
+
+
+def main(zones=ZONES, portals=PORTALS):
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    wall_event = ctx.Event()
+    results = ctx.Queue(maxsize=RESULT_QUEUE_SIZE)
+
+    zone_map = ZoneMap(zones, portals)
+    buffers = [SharedFrames((zone.height, zone.width, 3), RESULT_QUEUE_SIZE + 2) for zone in zones]
+    workers = [ctx.Process(target=zone_worker, name=f"zone-{zone.name}",
+                           args=(i, zone, GRID_SIZE, buffers[i].spec(), results, stop, wall_event),
+                           daemon=True)
+               for i, zone in enumerate(zones)]
+    for w in workers:
+        w.start()
+
+    metrics.enable(METRICS)
+    metrics.gauge_fn("zone_frame_id", lambda: {z.name: zone_map.frame_ids[i] for i, z in enumerate(zones)},
+                     label="zone")
+    navigator = Navigator()
+    server = EvacuationServer(backend=SERVER_BACKEND)
+    server.start()
+
+    headless = DISPLAY_MODE == "headless"
+    preview = Preview(server, window=not headless, render=render_zones)
+    wall_lock = ZoneWallLock(wall_event)
+
+    print(f"=== System Started ({len(zones)} zones) ===")
+    if headless:
+        print("(headless) Ctrl+C: 종료")
+    else:
+        print("1. 'c' 키: 벽 고정/해제 (Lock)")
+        print("2. 'q' 키: 종료")
+    if DEBUG_STREAM:
+        print(f"분석 화면: http://<서버>:{server.port}/debug/stream")
+
+    running = len(workers)
+    plans = 0
+    try:
+        while running:
+            try:
+                msgs = [results.get(timeout=0.1)]
+            except queue.Empty:
+                if not preview.idle(): break
+                continue
+            # 쌓인 결과를 모두 꺼내 구역별 최신 것만 반영하고 경로는 한 번만 계산
+            while True:
+                try:
+                    msgs.append(results.get_nowait())
+                except queue.Empty:
+                    break
+
+            updated = False
+            for msg in msgs:
+                if msg[0] == "done":
+                    running -= 1
+                    print(f"[INFO] [{zones[msg[1]].name}] 구역 처리 종료")
+                    continue
+                # 다른 구역 메시지를 처리하는 동안 슬롯이 덮이지 않도록 받자마자 복사
+                index, frame_id, timestamp, (slot, seq) = msg[1:5]
+                frame = buffers[index].read(slot, seq)
+                if frame is None:
+                    metrics.inc("zone_frames_overwritten", zone=zones[index].name)
+                zone_map.update(index, frame_id, timestamp, frame, *msg[5:])
+                updated = True
+            if not updated:
+                continue
+
+            with metrics.time("stage", stage="plan"):
+                directions = zone_map.plan(navigator)
+            plans += 1
+            server.update_data(zone_map.fire_detected, directions, frame_id=plans)
+            metrics.tick("frames")
+
+            if not preview.update(ZoneView(zone_map, wall_event.is_set()), wall_lock):
+                break
+    except KeyboardInterrupt:
+        print(">>> 종료합니다.")
+    finally:
+        stop.set()
+        # 워커가 put에서 막혀 있지 않도록 큐를 비우며 종료 대기
+        deadline = time.time() + 3.0
+        while any(w.is_alive() for w in workers) and time.time() < deadline:
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+            w.join()
+        for buf in buffers:
+            buf.close()
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
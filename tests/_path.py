@@ -0,0 +1,7 @@
+# src/ 모듈은 `from map import GridMap`처럼 평평하게 import하므로 테스트에서도 같은 경로를 씀
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
@@ -0,0 +1,37 @@
+import asyncio
+import unittest
+
+from tests import _path  # noqa: F401
+from async_server import AsyncHTTPServer
+from server import EvacuationServer
+
+
+class ContentLengthTest(unittest.TestCase):
+    def request(self, raw):
+        async def run():
+            http = AsyncHTTPServer(EvacuationServer(backend="asyncio"))
+            srv = await asyncio.start_server(http._handle_connection, "127.0.0.1", 0)
+            port = srv.sockets[0].getsockname()[1]
+            async with srv:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(raw)
+                await writer.drain()
+                status = await asyncio.wait_for(reader.readline(), 5)
+                writer.close()
+                return status
+        return asyncio.run(run())
+
+    def test_negative_content_length_is_rejected(self):
+        status = self.request(b"POST /api/people_events HTTP/1.1\r\nHost: x\r\nContent-Length: -1\r\n\r\n")
+        self.assertTrue(status.startswith(b"HTTP/1.1 400"), status)
+
+
+    def test_non_object_json_is_rejected(self):
+        for body in (b"[]", b"1", b'"x"', b"[1]"):
+            raw = (b"POST /api/people_count HTTP/1.1\r\nHost: x\r\nContent-Length: %d\r\n\r\n" % len(body)) + body
+            status = self.request(raw)
+            self.assertTrue(status.startswith(b"HTTP/1.1 400"), (body, status))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from tests import _path  # noqa: F401
+from benchmark import SyntheticScene
+
+
+class SyntheticSceneTest(unittest.TestCase):
+    def test_full_scene_raises_instead_of_hanging(self):
+        with self.assertRaises(ValueError):
+            SyntheticScene(200, 150, "random", density=50.0)
+
+    def test_crowded_scene_still_finds_free_points(self):
+        scene = SyntheticScene(320, 240, "random", fires=0, exits=3, dots=5, density=1.5, seed=1)
+        for x, y in scene.exits + scene.dots:
+            self.assertFalse(scene.wall_mask[y - 4:y + 5, x - 4:x + 5].any())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from tests import _path  # noqa: F401
+from calibration import Calibration
+from map import GridMap
+
+WIDTH, HEIGHT, GRID = 320, 240, 20
+DOTS = [(250, 200), (40, 40)]
+EXITS = [(10, 110), (290, 10)]
+
+
+def board():
+    frame = np.full((HEIGHT, WIDTH, 3), 20, dtype=np.uint8)
+    cv2.rectangle(frame, (100, 0), (110, 180), (255, 255, 255), -1)
+    cv2.rectangle(frame, (200, 60), (210, 240), (255, 255, 255), -1)
+    return frame
+
+
+class CalibrationTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "calibration.npz")
+
+    def grid_map(self, calib, path_mode):
+        g = GridMap(WIDTH, HEIGHT, GRID, path_mode=path_mode)
+        g.update_obstacles_from_mask(calib.wall_mask)
+        for ex, ey in calib.exits:
+            g.add_exit(ex, ey, 20, 20)
+        return g
+
+    def test_save_load_round_trip(self):
+        calib = Calibration.capture(board(), DOTS, EXITS, WIDTH, HEIGHT, GRID, path_mode="hazard")
+        calib.save(self.path)
+        loaded = Calibration.load(self.path)
+
+        self.assertTrue(loaded.matches(WIDTH, HEIGHT, GRID))
+        self.assertFalse(loaded.matches(WIDTH, HEIGHT, 10))
+        self.assertEqual((loaded.dots, loaded.exits), (DOTS, EXITS))
+        np.testing.assert_array_equal(loaded.wall_mask, calib.wall_mask)
+        self.assertIsNone(loaded.corners)
+        self.assertEqual(sorted(loaded.field), sorted(calib.field))
+        for name, value in calib.field.items():
+            np.testing.assert_array_equal(loaded.field[name], value, err_msg=name)
+
+    def test_missing_file_is_none(self):
+        self.assertIsNone(Calibration.load(self.path))
+
+    def test_restored_field_skips_rebuild(self):
+        for mode in ("flow", "hazard"):
+            calib = Calibration.capture(board(), DOTS, EXITS, WIDTH, HEIGHT, GRID, path_mode=mode)
+            calib.save(self.path)
+            calib = Calibration.load(self.path)
+            expected = self.grid_map(calib, mode)
+
+            g = self.grid_map(calib, mode)
+            self.assertTrue(g.restore_field(calib.field))
+            rebuilds = []
+            g._full_rebuild = rebuilds.append
+            for dx, dy in DOTS:
+                path = g.get_shortest_path(dx, dy)
+                self.assertTrue(path, mode)
+                self.assertEqual(path, expected.get_shortest_path(dx, dy), mode)
+            self.assertEqual(rebuilds, [], mode)
+
+            other = GridMap(WIDTH, HEIGHT, GRID, path_mode="hpa" if mode == "flow" else "flow")
+            self.assertFalse(other.restore_field(calib.field))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from camera import Camera
+
+
+class FakeCapture:
+    """read()가 gate가 열릴 때까지 멈추는 가짜 스트림"""
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.gate = threading.Event()
+        self.reading = threading.Event()
+        self.released = False
+        self.released_while_reading = False
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reading.set()
+        self.gate.wait(5)
+        self.reading.clear()
+        if not self.ok:
+            return False, None
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released_while_reading = self.reading.is_set()
+        self.released = True
+
+
+class SequenceCapture:
+    """값이 1, 2, ..., count인 프레임을 바로 내주고 그 뒤에는 release 될 때까지 멈추는 스트림"""
+    def __init__(self, count):
+        self.count = count
+        self.sent = 0
+        self.stop = threading.Event()
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.sent >= self.count:
+            self.stop.wait(5)
+            return False, None
+        self.sent += 1
+        return True, np.full((4, 4, 3), self.sent, dtype=np.uint8)
+
+    def release(self):
+        self.stop.set()
+
+
+class FakeCamera(Camera):
+    def __init__(self, cap, **kwargs):
+        self._fake = cap
+        super().__init__("fake", **kwargs)
+
+    def _open(self, source):
+        return self._fake
+
+
+class ReleaseTest(unittest.TestCase):
+    def test_blocked_read_is_not_released_concurrently(self):
+        cap = FakeCapture()
+        cam = FakeCamera(cap, threaded=True)
+        cap.reading.wait(1)
+        cam.release()  # read()가 아직 멈춰 있음
+        self.assertFalse(cap.released)
+        cap.gate.set()
+        for _ in range(100):
+            if cap.released:
+                break
+            time.sleep(0.01)
+        self.assertTrue(cap.released)
+        self.assertFalse(cap.released_while_reading)
+
+    def test_reconnect_backoff_is_interruptible(self):
+        cap = FakeCapture(ok=False)
+        cap.gate.set()
+        cam = FakeCamera(cap, threaded=True)
+        cam.RECONNECT_MIN_DELAY = 30.0
+        time.sleep(0.1)  # 재접속 대기에 들어감
+        thread = cam._thread
+        start = time.time()
+        cam.release()
+        self.assertLess(time.time() - start, 1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(cap.released)
+
+
+class LatestFrameTest(unittest.TestCase):
+    def test_returns_latest_frame_and_counts_drops(self):
+        cap = SequenceCapture(5)
+        cam = FakeCamera(cap, threaded=True)
+        self.addCleanup(cam.release)
+        self.addCleanup(cap.stop.set)  # release 전에 멈춘 read()를 풀어 줌
+        for _ in range(100):
+            if cam.frames_captured == 5:
+                break
+            time.sleep(0.01)
+
+        ret, frame = cam.get_frame(timeout=1.0)
+        self.assertTrue(ret)
+        self.assertEqual(frame[0, 0, 0], 5)
+        self.assertEqual(cam.frame_id, 5)
+        self.assertEqual(cam.frames_dropped, 4)
+        # 새 프레임이 없으면 같은 프레임을 다시 주지 않음
+        self.assertEqual(cam.get_frame(timeout=0.05), (False, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
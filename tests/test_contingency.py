@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from contingency import ContingencyTable, build_table, fingerprint
+from map import GridMap
+from navigator import Navigator
+
+WIDTH, HEIGHT, GRID = 200, 160, 20
+EXITS = [(0, 60), (180, 0)]
+DOTS = [(110, 130), (30, 10), (500, 500)]
+
+
+class ContingencyTableTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.base = np.zeros((HEIGHT // GRID, WIDTH // GRID), dtype=np.uint8)
+        cls.base[2:6, 4] = 1
+        key = fingerprint(cls.base, EXITS, DOTS, GRID, "flow", 2)
+        build_table(os.path.join(cls.tmp.name, key), WIDTH, HEIGHT, GRID, "flow",
+                    cls.base, EXITS, DOTS, 2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def grid_map(self, fires=()):
+        g = GridMap(WIDTH, HEIGHT, GRID, path_mode="flow")
+        np.copyto(g.grid, self.base)
+        for x, y, w, h in fires:
+            g.set_obstacle_rect(x, y, w, h, fire=True)
+        for ex, ey in EXITS:
+            g.add_exit(ex, ey, 20, 20)
+        return g
+
+    def table(self, g):
+        table = ContingencyTable(self.tmp.name, EXITS, DOTS, max_region=2)
+        self.assertTrue(table.ensure(g, self.base))  # 파일이 있으므로 바로 불러옴
+        return table
+
+    def live(self, g):
+        navigator = Navigator()
+        routes = []
+        for dx, dy in DOTS:
+            if not (0 <= dx < WIDTH and 0 <= dy < HEIGHT):
+                routes.append(("STOP", None))
+                continue
+            routes.append(navigator.direction_along((dx, dy), g.get_shortest_path(dx, dy)))
+        return routes
+
+    def test_hit_matches_live_search(self):
+        for fires in ([], [(120, 40, 0, 0)], [(40, 100, 20, 0)], [(60, 120, 20, 20)]):
+            g = self.grid_map(fires)
+            routes = self.table(g).lookup(g)
+            self.assertIsNotNone(routes, fires)
+            self.assertEqual(routes, self.live(g), fires)
+
+    def test_miss(self):
+        cases = {
+            "two fires": [(120, 40, 0, 0), (20, 140, 0, 0)],
+            "larger than MAX_REGION": [(20, 20, 40, 0)],
+        }
+        for name, fires in cases.items():
+            g = self.grid_map(fires)
+            self.assertIsNone(self.table(g).lookup(g), name)
+
+        g = self.grid_map()
+        table = self.table(g)
+        g.grid[0, 0] = 1  # 표를 만든 뒤 벽이 바뀜
+        self.assertIsNone(table.lookup(g))
+
+
+if __name__ == "__main__":
+    unittest.main()
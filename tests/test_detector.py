@@ -0,0 +1,98 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from tests import _path  # noqa: F401
+from detector import Detector
+
+
+def scene(seed=0):
+    frame = np.full((240, 320, 3), 90, dtype=np.uint8)
+    cv2.rectangle(frame, (40, 40), (280, 50), (255, 255, 255), -1)
+    cv2.rectangle(frame, (200, 120), (240, 160), (0, 200, 0), -1)
+    noise = np.random.default_rng(seed).integers(0, 6, frame.shape, dtype=np.uint8)
+    return cv2.add(frame, noise)
+
+
+def board_scene(seed):
+    """벽, 불꽃, 빨간 양초, 녹색 탈출구가 임의 위치에 있는 장면"""
+    rng = np.random.default_rng(seed)
+    frame = cv2.add(np.full((240, 320, 3), 30, dtype=np.uint8),
+                    rng.integers(0, 20, (240, 320, 3), dtype=np.uint8))
+    for _ in range(3):
+        x, y = (int(v) for v in rng.integers(0, 280, 2))
+        cv2.rectangle(frame, (x, y % 200), (x + 40, y % 200 + 6), (250, 250, 250), -1)
+    x, y = (int(v) for v in rng.integers(10, 200, 2))
+    cv2.circle(frame, (x, y), 6, (60, 120, 255), -1)       # 불꽃
+    x, y = (int(v) for v in rng.integers(10, 200, 2))
+    cv2.rectangle(frame, (x, y), (x + 8, y + 20), (20, 20, 200), -1)  # 양초
+    x, y = (int(v) for v in rng.integers(10, 200, 2))
+    cv2.rectangle(frame, (x, y), (x + 25, y + 25), (40, 200, 40), -1)  # 탈출구
+    return frame
+
+
+class AnalyzeTest(unittest.TestCase):
+    def test_matches_separate_detectors(self):
+        detector = Detector(buffer_sets=2)
+        for seed in range(5):
+            frame = board_scene(seed)
+            result = detector.analyze(frame)
+            fire_boxes, fire_mask = detector.detect_fire(frame)
+            exit_boxes, exit_mask = detector.detect_exit(frame)
+            np.testing.assert_array_equal(result.wall_mask, detector.detect_walls_in_map(frame))
+            np.testing.assert_array_equal(result.fire_mask, fire_mask)
+            np.testing.assert_array_equal(result.exit_mask, exit_mask)
+            self.assertEqual(sorted(result.fire_boxes), sorted(fire_boxes))
+            self.assertEqual(sorted(result.exit_boxes), sorted(exit_boxes))
+            self.assertTrue(fire_boxes and exit_boxes, seed)
+
+
+class BoardWarpTest(unittest.TestCase):
+    CORNERS = np.array([[30, 20], [290, 35], [300, 220], [15, 210]], dtype=np.float32).reshape(-1, 1, 2)
+
+    def test_remap_matches_warp_perspective(self):
+        frame = cv2.GaussianBlur(board_scene(1), (7, 7), 0)
+        detector = Detector()
+        warped = detector.warp_perspective(frame, self.CORNERS, 160, 120)
+        dst = np.array([[0, 0], [159, 0], [159, 119], [0, 119]], dtype=np.float32)
+        M = cv2.getPerspectiveTransform(self.CORNERS.reshape(4, 2), dst)
+        expected = cv2.warpPerspective(frame, M, (160, 120))
+        diff = cv2.absdiff(warped, expected)
+        self.assertLessEqual(int(diff[2:-2, 2:-2].max()), 2)
+
+    def test_corners_locked_between_checks(self):
+        detector = Detector()
+        detector.CORNER_CHECK_INTERVAL = 3
+        calls = []
+        found = [self.CORNERS, self.CORNERS + 1.0, self.CORNERS + 10.0]
+
+        def detect_corners(frame):
+            calls.append(len(calls))
+            return found[min(len(calls) - 1, 2)], None
+        detector.detect_corners = detect_corners
+
+        frame = board_scene(2)
+        locked = []
+        for _ in range(9):
+            self.assertIsNotNone(detector.warp_board(frame, 160, 120))
+            locked.append(detector.locked_corners)
+        self.assertEqual(len(calls), 3)  # 첫 프레임 + 4프레임마다
+        self.assertIs(locked[4], self.CORNERS)       # 1px 흔들림은 무시
+        self.assertIs(locked[8], found[2])           # 크게 움직이면 다시 고정
+
+
+class ChangeGatingTest(unittest.TestCase):
+    def test_tiny_flame_detected_on_first_frame(self):
+        detector = Detector()
+        detector.enable_change_gating(20)
+        for i in range(10):
+            frame = scene(i)
+            if i >= 5:
+                frame[100:104, 100:104] = (0, 0, 255)  # 4x4 px 불꽃
+            boxes = detector.analyze(frame).fire_boxes
+            self.assertEqual(bool(boxes), i >= 5, f"frame {i}: {boxes}")
+
+
+if __name__ == "__main__":
+    unittest.main()
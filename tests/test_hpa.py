@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from map import GridMap
+
+
+def make_maps(grid, exits, cluster_size=5):
+    rows, cols = grid.shape
+    maps = {}
+    for mode in ("flow", "hpa"):
+        g = GridMap(cols * 20, rows * 20, 20, path_mode=mode)
+        g.CLUSTER_SIZE = cluster_size
+        np.copyto(g.grid, grid)
+        for gx, gy in exits:
+            g.add_exit(gx * 20, gy * 20, 1, 1)
+        g.sync()
+        maps[mode] = g
+    return maps
+
+
+class ClusterGraphTest(unittest.TestCase):
+    def test_exit_across_cluster_border_is_direct(self):
+        maps = make_maps(np.zeros((20, 20), dtype=np.uint8), [(10, 5)], cluster_size=10)
+        self.assertEqual(maps["hpa"].hpa.find_path((9, 5)), [(9, 5), (10, 5)])
+
+    def test_paths_valid_where_bfs_reaches(self):
+        rng = np.random.default_rng(3)
+        grid = (rng.random((24, 32)) < 0.25).astype(np.uint8)
+        exits = [(0, 0), (31, 23), (16, 12)]
+        for gx, gy in exits:
+            grid[gy, gx] = 0
+        maps = make_maps(grid, exits)
+        flow, hpa = maps["flow"], maps["hpa"].hpa
+        exit_cells = set(maps["hpa"].exits)
+
+        for gy in range(grid.shape[0]):
+            for gx in range(grid.shape[1]):
+                if grid[gy, gx]:
+                    continue
+                path = hpa.find_path((gx, gy))
+                reachable = flow.dist_field[gy, gx] >= 0
+                self.assertEqual(bool(path), bool(reachable), (gx, gy))
+                if not path:
+                    continue
+                self.assertEqual(path[0], (gx, gy))
+                self.assertIn(path[-1], exit_cells)
+                for (ax, ay), (bx, by) in zip(path, path[1:]):
+                    self.assertEqual(abs(ax - bx) + abs(ay - by), 1)
+                    self.assertEqual(grid[by, bx], 0)
+                self.assertGreaterEqual(len(path) - 1, flow.dist_field[gy, gx])
+
+
+if __name__ == "__main__":
+    unittest.main()
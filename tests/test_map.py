@@ -0,0 +1,137 @@
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from map import GridMap
+from benchmark import legacy_astar
+
+
+def random_map(seed, rows=15, cols=20, density=0.25, exits=((0, 0), (19, 14)), path_mode="flow"):
+    rng = np.random.default_rng(seed)
+    g = GridMap(cols * 20, rows * 20, 20, path_mode=path_mode)
+    g.grid[:] = rng.random((rows, cols)) < density
+    for gx, gy in exits:
+        g.grid[gy, gx] = 0
+        g.add_exit(gx * 20, gy * 20, 1, 1)
+    return g
+
+
+def open_cells(g):
+    return [(gx, gy) for gy, gx in zip(*np.nonzero(g.grid == 0))]
+
+
+class FlowFieldTest(unittest.TestCase):
+    def test_path_length_matches_astar(self):
+        for seed in range(3):
+            g = random_map(seed)
+            for gx, gy in open_cells(g):
+                x, y = g._to_pixel(gx, gy)
+                flow = g.get_shortest_path(x, y)
+                astar = [p for p in (g._astar((gx, gy), e) for e in g.exits) if p]
+                expected = min(map(len, astar)) if astar else 0
+                self.assertEqual(len(flow), expected, (seed, gx, gy))
+                if flow:
+                    self.assertIn(g._to_grid(*flow[-1]), g.exits)
+
+
+class RepairTest(unittest.TestCase):
+    def test_repair_matches_full_rebuild(self):
+        rng = np.random.default_rng(7)
+        g = random_map(7)
+        g.sync()
+        exits = {gy * g.cols + gx for gx, gy in g.exits}
+        for step in range(30):
+            cells = rng.choice(g.grid.size, size=4, replace=False)
+            flat = g.grid.reshape(-1)
+            flat[cells] ^= 1
+            flat[list(exits)] = 0
+            rebuilds = []
+            g._full_rebuild = rebuilds.append
+            g.sync()
+            del g._full_rebuild
+            self.assertEqual(rebuilds, [])
+
+            fresh = GridMap(g.width, g.height, g.grid_size)
+            np.copyto(fresh.grid, g.grid)
+            fresh.exits = list(g.exits)
+            fresh.sync()
+            np.testing.assert_array_equal(g.dist_field, fresh.dist_field, err_msg=str(step))
+
+            dist = g.dist_field.reshape(-1)
+            hop = g.next_hop.reshape(-1)
+            for idx in np.flatnonzero(dist > 0):
+                self.assertEqual(dist[hop[idx]], dist[idx] - 1)
+                self.assertIn(int(hop[idx]), set(g._neighbors(int(idx))))
+
+
+class OccupancyTest(unittest.TestCase):
+    def test_ratios_and_threshold(self):
+        g = GridMap(100, 60, 20)
+        mask = np.zeros((60, 100), dtype=np.uint8)
+        mask[0:20, 0:10] = 255      # (0, 0) 칸의 절반
+        mask[25, 20:40] = 255       # (1, 1) 칸을 지나는 1px 벽
+        ratio = g.update_obstacles_from_mask(mask)
+        self.assertAlmostEqual(float(ratio[0, 0]), 0.5, places=5)
+        self.assertAlmostEqual(float(ratio[1, 1]), 0.05, places=5)
+        self.assertEqual(list(zip(*np.nonzero(g.grid))), [(0, 0), (1, 1)])
+
+        g.reset()
+        g.update_obstacles_from_mask(mask, threshold=0.25)
+        self.assertEqual(list(zip(*np.nonzero(g.grid))), [(0, 0)])
+
+    def test_mask_of_other_size_is_scaled(self):
+        g = GridMap(100, 60, 20)
+        mask = np.zeros((30, 50), dtype=np.uint8)  # 절반 크기
+        mask[10:20, 20:30] = 255                    # (2, 1) 칸 전체
+        ratio = g.mask_occupancy(mask)
+        self.assertAlmostEqual(float(ratio[1, 2]), 1.0, places=5)
+        self.assertAlmostEqual(float(ratio.sum()), 1.0, places=5)
+
+
+class AstarTest(unittest.TestCase):
+    def test_same_paths_as_legacy(self):
+        for seed in range(3):
+            g = random_map(seed, density=0.3)
+            cells = open_cells(g)
+            for start in cells[::7]:
+                for end in cells[::11]:
+                    expected = [g._to_pixel(gx, gy) for gx, gy in legacy_astar(g.grid, start, end)]
+                    self.assertEqual(g._astar(start, end), expected, (seed, start, end))
+
+
+class HazardTest(unittest.TestCase):
+    def plan(self, path_mode):
+        g = GridMap(400, 300, 20, path_mode=path_mode)
+        g.set_obstacle_rect(200, 120, 0, 40, fire=True)   # (10, 6) ~ (10, 8)
+        g.add_exit(19 * 20, 7 * 20, 1, 1)
+        return g, [g._to_grid(x, y) for x, y in g.get_shortest_path(10, 7 * 20 + 10)]
+
+    def near_fire(self, g, cells):
+        fire = set(zip(*np.nonzero(g.fire)))
+        return [(gx, gy) for gx, gy in cells
+                if any((gy + dy, gx + dx) in fire for dy in (-1, 0, 1) for dx in (-1, 0, 1))]
+
+    def test_path_keeps_away_from_fire(self):
+        g, flow = self.plan("flow")
+        self.assertTrue(self.near_fire(g, flow))
+
+        g, hazard = self.plan("hazard")
+        self.assertEqual(hazard[-1], (19, 7))
+        self.assertEqual(self.near_fire(g, hazard), [])
+        for (ax, ay), (bx, by) in zip(hazard, hazard[1:]):
+            self.assertEqual(abs(ax - bx) + abs(ay - by), 1)
+            self.assertEqual(g.grid[by, bx], 0)
+
+    def test_cost_field_is_highest_next_to_fire(self):
+        g = GridMap(400, 300, 20, path_mode="hazard")
+        g.set_obstacle_rect(200, 120, 0, 0, fire=True)
+        cost = g.build_cost_field()
+        self.assertTrue(np.isinf(cost[6, 10]))
+        self.assertGreater(cost[6, 9], cost[6, 7])
+        self.assertGreater(cost[6, 7], cost[6, 0])
+        self.assertAlmostEqual(float(cost[6, 9]), 1.0 + g.FIRE_PENALTY, delta=0.5)  # 근사 거리 변환
+
+
+if __name__ == "__main__":
+    unittest.main()
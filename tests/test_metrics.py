@@ -0,0 +1,45 @@
+import unittest
+
+from tests import _path  # noqa: F401
+from metrics import Metrics
+
+
+def render(m):
+    return m.prometheus().splitlines()
+
+
+class PrometheusTest(unittest.TestCase):
+    def setUp(self):
+        self.m = Metrics(enabled=True)
+
+    def test_counters_end_with_total(self):
+        self.m.inc("astar_expansions", 5)
+        self.m.inc("path_cache", result="hit")
+        self.m.tick("frames")
+        lines = render(self.m)
+        self.assertIn("# TYPE evac_astar_expansions_total counter", lines)
+        self.assertIn("evac_astar_expansions_total 5", lines)
+        self.assertIn('evac_path_cache_total{result="hit"} 1', lines)
+        self.assertIn("evac_frames_total 1", lines)
+        self.assertNotIn("evac_frames_total_total 1", lines)
+
+    def test_summary_and_gauges(self):
+        self.m.observe("stage", 0.002, stage="plan")
+        self.m.gauge("scheduler_active", 1)
+        self.m.gauge_fn("queue_depth", lambda: {"detect": 2}, label="stage")
+        lines = render(self.m)
+        self.assertIn("# TYPE evac_stage_seconds summary", lines)
+        self.assertIn('evac_stage_seconds_count{stage="plan"} 1', lines)
+        self.assertTrue(any(l.startswith('evac_stage_seconds{stage="plan",quantile="0.5"}') for l in lines), lines)
+        self.assertIn("evac_scheduler_active 1", lines)
+        self.assertIn('evac_queue_depth{stage="detect"} 2', lines)
+
+    def test_disabled_collects_nothing(self):
+        m = Metrics()
+        m.inc("astar_expansions")
+        m.observe("stage", 0.1, stage="plan")
+        self.assertEqual(m.prometheus(), "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from config import DEBUG_STREAM
+from overlay import Preview
+from server import EvacuationServer
+
+
+class HeadlessPreviewTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EvacuationServer(backend="asyncio")
+        self.rendered = []
+
+    def render(self, packet):
+        self.rendered.append(packet)
+        return np.zeros((40, 60, 3), dtype=np.uint8)
+
+    def test_nothing_rendered_without_viewers(self):
+        preview = Preview(self.server, window=False, render=self.render)
+        for i in range(10):
+            self.assertTrue(preview.update(i, None))
+        self.assertEqual(self.rendered, [])
+        self.assertIsNone(self.server.debug.jpeg)
+
+    @unittest.skipUnless(DEBUG_STREAM, "DEBUG_STREAM 꺼짐")
+    def test_stream_rendering_is_throttled(self):
+        preview = Preview(self.server, window=False, render=self.render)
+        self.server.debug.viewers.add(1)
+        for i in range(10):
+            preview.update(i, None)
+        # 연달아 들어온 결과는 DEBUG_STREAM_FPS 간격 안이라 첫 것만 그림
+        self.assertEqual(self.rendered, [0])
+        self.assertEqual(self.server.debug.version, 1)
+        self.assertTrue(self.server.debug.jpeg.startswith(b"\xff\xd8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
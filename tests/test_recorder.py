@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from tests import _path  # noqa: F401
+from camera import Camera
+from recorder import FRAMES_FILE, FrameRecorder, ReplaySource, is_recording
+
+
+def frames(count, shape=(6, 8, 3)):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, shape, dtype=np.uint8) for _ in range(count)]
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "rec")
+
+    def record(self, recorded, start=100.0):
+        with FrameRecorder(self.path) as rec:
+            for i, frame in enumerate(recorded):
+                rec.write(frame, start + i * 0.25)
+
+    def test_frames_and_timestamps_round_trip(self):
+        recorded = frames(4)
+        self.record(recorded)
+        self.assertTrue(is_recording(self.path))
+
+        src = ReplaySource(self.path)
+        self.assertEqual(src.get(cv2.CAP_PROP_FRAME_COUNT), 4)
+        self.assertAlmostEqual(src.get(cv2.CAP_PROP_FPS), 4.0)
+        for i, expected in enumerate(recorded):
+            ret, frame = src.read()
+            self.assertTrue(ret)
+            np.testing.assert_array_equal(frame, expected)
+            self.assertEqual(src.timestamp, 100.0 + i * 0.25)
+        self.assertEqual(src.read(), (False, None))
+
+    def test_truncated_recording_plays_whole_frames(self):
+        recorded = frames(3)
+        self.record(recorded)
+        raw = os.path.join(self.path, FRAMES_FILE)
+        with open(raw, "r+b") as f:
+            f.truncate(os.path.getsize(raw) - 10)  # 마지막 프레임이 잘림
+        self.assertEqual(ReplaySource(self.path).count, 2)
+
+    def test_camera_uses_recorded_timestamps(self):
+        recorded = frames(3)
+        self.record(recorded, start=50.0)
+        cam = Camera(self.path)
+        for i, expected in enumerate(recorded):
+            ret, frame = cam.get_frame()
+            np.testing.assert_array_equal(frame, expected)
+            self.assertEqual((cam.frame_id, cam.frame_timestamp), (i + 1, 50.0 + i * 0.25))
+        self.assertFalse(cam.get_frame()[0])
+        cam.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
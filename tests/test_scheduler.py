@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from pipeline import FramePacket
+from scheduler import ActivityScheduler
+
+
+class WallVersionTest(unittest.TestCase):
+    def test_new_mask_gets_new_version(self):
+        scheduler = ActivityScheduler()
+        versions = []
+        for value in (0, 255, 255):
+            # 직전 마스크를 버려도 (같은 id가 다시 쓰여도) 번호는 배열마다 달라야 함
+            versions.append(scheduler.wall_version(np.full((4, 4), value, dtype=np.uint8)))
+        self.assertEqual(versions, [1, 2, 3])
+
+    def test_same_mask_keeps_version(self):
+        scheduler = ActivityScheduler()
+        mask = np.zeros((4, 4), dtype=np.uint8)
+        self.assertEqual(scheduler.wall_version(mask), scheduler.wall_version(mask))
+
+
+class WakeTest(unittest.TestCase):
+    def idle_scheduler(self, frame):
+        scheduler = ActivityScheduler(idle_fps=2, cooldown=1.0)
+        for i in range(40):
+            scheduler.admit(frame, i * 0.1)
+        self.assertFalse(scheduler.active)
+        return scheduler
+
+    def test_tiny_flame_wakes_idle_scheduler(self):
+        frame = np.full((240, 320, 3), 90, dtype=np.uint8)
+        scheduler = self.idle_scheduler(frame)
+        self.assertFalse(scheduler.admit(frame, 4.05))
+        flame = frame.copy()
+        flame[100:104, 100:104] = (0, 0, 255)
+        self.assertTrue(scheduler.admit(flame, 4.1))
+        self.assertTrue(scheduler.active)
+
+    def test_fire_box_wakes_idle_scheduler(self):
+        scheduler = self.idle_scheduler(np.zeros((240, 320, 3), dtype=np.uint8))
+        packet = FramePacket(1, 4.0, None)
+        packet.raw_fire_boxes = [(10, 10, 4, 4)]
+        scheduler.report(packet)
+        self.assertTrue(scheduler.active)
+
+
+class DueTest(unittest.TestCase):
+    def test_idle_stage_runs_when_inputs_change(self):
+        scheduler = ActivityScheduler(stage_intervals={"plan": 5.0})
+        scheduler.active = False
+        self.assertTrue(scheduler.due("plan", 0.0, (1,)))
+        self.assertFalse(scheduler.due("plan", 1.0, (1,)))
+        self.assertTrue(scheduler.due("plan", 2.0, (2,)))
+        self.assertTrue(scheduler.due("plan", 7.5, (2,)))
+
+
+if __name__ == "__main__":
+    unittest.main()
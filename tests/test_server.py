@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+import unittest
+
+from tests import _path  # noqa: F401
+from server import EvacuationServer, Subscriber
+
+
+def make_server():
+    server = EvacuationServer(backend="asyncio")
+    server.LOG_PEOPLE_EVENTS = False
+    return server
+
+
+class PeopleBatchValidationTest(unittest.TestCase):
+    def batch(self, **fields):
+        data = {"sensor_id": "door0", "boot": 7, "events": [{"seq": 1, "type": "IN"}]}
+        data.update(fields)
+        return make_server().people_batch(data)
+
+    def test_valid_batch(self):
+        code, result = self.batch()
+        self.assertEqual((code, result["accepted"]), (200, 1))
+
+    def test_unhashable_boot_is_rejected(self):
+        for boot in ([1], {"a": 1}):
+            self.assertEqual(self.batch(boot=boot)[0], 400)
+
+    def test_bool_boot_is_rejected(self):
+        self.assertEqual(self.batch(boot=True)[0], 400)
+
+    def test_non_string_sensor_id_is_rejected(self):
+        for sensor_id in (3, ["door0"], {"id": 1}):
+            self.assertEqual(self.batch(sensor_id=sensor_id)[0], 400)
+
+    def test_per_event_boot_and_sensor_are_checked(self):
+        self.assertEqual(self.batch(events=[{"seq": 1, "type": "IN", "boot": [1]}])[0], 400)
+        self.assertEqual(self.batch(events=[{"seq": 1, "type": "IN", "sensor_id": {}}])[0], 400)
+
+    def test_bool_seq_is_rejected(self):
+        code, result = self.batch(events=[{"seq": True, "type": "IN"}])
+        self.assertEqual((code, result["accepted"], result["rejected"]), (200, 0, 1))
+
+
+class StatusSnapshotTest(unittest.TestCase):
+    def test_etag_and_not_modified(self):
+        server = make_server()
+        server.update_data(False, {0: "UP", 1: "LEFT"}, frame_id=3)
+        code, body, etag = server.status_response()
+        self.assertEqual((code, etag), (200, '"1"'))
+        self.assertEqual(json.loads(body)["directions"], {"0": "UP", "1": "LEFT"})
+        self.assertEqual(server.status_response(if_none_match=etag), (304, b"", etag))
+
+        # 같은 내용이면 버전이 그대로
+        server.update_data(False, {0: "UP", 1: "LEFT"}, frame_id=4)
+        self.assertEqual(server.status_response(if_none_match=etag)[0], 304)
+
+    def test_direction_version_changes_only_for_that_dot(self):
+        server = make_server()
+        server.update_data(False, {0: "UP", 1: "LEFT"})
+        etag0 = server.direction_response(0)[2]
+        server.update_data(False, {0: "UP", 1: "DOWN"})
+        self.assertEqual(server.direction_response(0, if_none_match=etag0)[0], 304)
+        code, body, _ = server.direction_response(1)
+        self.assertEqual((code, json.loads(body)["direction"]), (200, "DOWN"))
+
+    def test_long_poll_wakes_on_change(self):
+        server = make_server()
+        server.update_data(False, {0: "UP"})
+        threading.Timer(0.1, server.update_data, (True, {0: "STOP"})).start()
+        start = time.time()
+        code, body, etag = server.status_response(since=1)
+        self.assertLess(time.time() - start, 2.0)
+        self.assertEqual((code, etag, json.loads(body)["fire_detected"]), (200, '"2"', True))
+
+    def test_long_poll_times_out_with_not_modified(self):
+        server = make_server()
+        server.LONG_POLL_TIMEOUT = 0.05
+        server.update_data(False, {0: "UP"})
+        self.assertEqual(server.status_response(since=1), (304, b"", '"1"'))
+
+
+class EventStreamTest(unittest.TestCase):
+    def test_diff_has_only_changed_dots(self):
+        server = make_server()
+        server.update_data(False, {0: "UP", 1: "LEFT"})
+        sub = server.subscribe()
+        server.update_data(False, {0: "UP", 1: "DOWN"})
+        event = sub.get(timeout=1)
+        self.assertEqual((event["version"], event["directions"]), (2, {1: "DOWN"}))
+        self.assertNotIn("fire_detected", event)
+
+    def test_full_queue_resyncs_with_snapshot(self):
+        server = make_server()
+        server.SUBSCRIBER_QUEUE_SIZE = 2
+        server.STREAM_KEEPALIVE = 0.05
+        stream = server.event_stream()
+        self.assertIn(b"event: snapshot", next(stream))
+        sub = server._subscribers[0]
+
+        for i in range(5):  # 읽지 않는 클라이언트
+            server.update_data(False, {0: str(i)})
+        self.assertEqual(list(sub.queue.queue), [Subscriber.RESYNC])
+        self.assertGreater(sub.dropped, 0)
+
+        chunk = next(stream)
+        self.assertIn(b"event: snapshot", chunk)
+        self.assertIn(b'"version":5', chunk)
+        self.assertEqual(next(stream), b": keepalive\n\n")
+        stream.close()
+        self.assertEqual(server._subscribers, ())
+
+
+if __name__ == "__main__":
+    unittest.main()
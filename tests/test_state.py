@@ -0,0 +1,31 @@
+import unittest
+
+from tests import _path  # noqa: F401
+from state import PeopleLedger
+
+
+def batch(boot, seqs, sensor="door0"):
+    return [(sensor, boot, seq, "IN", seq * 10) for seq in seqs]
+
+
+class PeopleLedgerTest(unittest.TestCase):
+    def test_retries_interleaved_across_reboot(self):
+        ledger = PeopleLedger()
+        self.assertEqual(len(ledger.apply(batch(1, [1, 2, 3]))[0]), 3)
+        # 재부팅 후 첫 묶음
+        self.assertEqual(len(ledger.apply(batch(2, [1, 2]))[0]), 2)
+        # 이전 boot의 재전송이 늦게 도착
+        self.assertEqual(ledger.apply(batch(1, [1, 2, 3])), ([], 3))
+        # 새 boot 묶음의 재전송도 다시 세지 않음
+        self.assertEqual(ledger.apply(batch(2, [1, 2])), ([], 2))
+        self.assertEqual(ledger.doors["door0"]["in"], 5)
+
+    def test_old_boots_are_evicted(self):
+        ledger = PeopleLedger(boots=2)
+        for boot in (1, 2, 3):
+            ledger.apply(batch(boot, [1]))
+        self.assertEqual(sorted(ledger._seen), [("door0", 2), ("door0", 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from tests import _path  # noqa: F401
+from tracker import FireTracker
+
+FIRE = (100, 100, 20, 20)
+
+
+class FireTrackerTest(unittest.TestCase):
+    def test_confirmed_after_hits(self):
+        tracker = FireTracker()
+        self.assertEqual(tracker.update([FIRE]), [])
+        self.assertEqual(tracker.update([(102, 101, 20, 20)]), [])
+        self.assertEqual(tracker.update([FIRE]), [(100, 100, 22, 21)])
+        self.assertTrue(tracker.changed)
+
+    def test_single_frame_noise_is_ignored(self):
+        tracker = FireTracker()
+        for boxes in ([FIRE], [], [], [], [FIRE], []):
+            self.assertEqual(tracker.update(boxes), [])
+
+    def test_flicker_does_not_release_until_expired(self):
+        tracker = FireTracker()
+        for _ in range(tracker.CONFIRM_HITS):
+            tracker.update([FIRE])
+        for _ in range(tracker.EXPIRE_MISSES):
+            self.assertEqual(tracker.update([]), [FIRE])
+        self.assertFalse(tracker.changed)
+        self.assertEqual(tracker.update([]), [])
+        self.assertTrue(tracker.changed)
+
+    def test_confirmed_box_only_grows_past_margin(self):
+        tracker = FireTracker()
+        for _ in range(tracker.CONFIRM_HITS):
+            tracker.update([FIRE])
+        self.assertEqual(tracker.update([(98, 98, 12, 12)]), [FIRE])   # 작아져도 유지
+        self.assertEqual(tracker.update([(100, 100, 24, 24)]), [FIRE])  # 여유 안쪽
+        self.assertEqual(tracker.update([(100, 100, 40, 20)]), [(100, 100, 40, 20)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from tests import _path  # noqa: F401
+from map import GridMap
+from zones import SharedFrames, pool_walls
+
+
+class PoolWallsTest(unittest.TestCase):
+    def test_previous_frame_walls_are_cleared(self):
+        pool = GridMap(100, 100, 20)
+        first = np.zeros((100, 100), dtype=np.uint8)
+        first[20:40, 20:40] = 255
+        second = np.zeros((100, 100), dtype=np.uint8)
+        second[60:80, 40:60] = 255
+
+        pool_walls(pool, first)
+        cells = pool_walls(pool, second)
+
+        self.assertEqual(list(zip(*np.nonzero(cells))), [(3, 2)])
+
+
+class SharedFramesTest(unittest.TestCase):
+    def setUp(self):
+        self.frames = SharedFrames((4, 4, 3), 2)
+        self.addCleanup(self.frames.close)
+
+    def test_read_returns_copy(self):
+        slot, seq = self.frames.write(np.full((4, 4, 3), 7, dtype=np.uint8))
+        frame = self.frames.read(slot, seq)
+        self.frames.write(np.zeros((4, 4, 3), dtype=np.uint8))
+        self.frames.write(np.zeros((4, 4, 3), dtype=np.uint8))
+        self.assertTrue((frame == 7).all())
+
+    def test_overwritten_slot_is_rejected(self):
+        slot, seq = self.frames.write(np.full((4, 4, 3), 1, dtype=np.uint8))
+        self.frames.write(np.full((4, 4, 3), 2, dtype=np.uint8))
+        self.frames.write(np.full((4, 4, 3), 3, dtype=np.uint8))
+        self.assertIsNone(self.frames.read(slot, seq))
+
+
+if __name__ == "__main__":
+    unittest.main()